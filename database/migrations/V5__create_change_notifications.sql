@@ -0,0 +1,89 @@
+-- =====================================================
+-- Migration V5: Row Change Notifications
+-- Description: Publish row changes over LISTEN/NOTIFY for cache invalidation
+-- Author: Enterprise Architecture Team
+-- Date: 2025-11-20
+-- =====================================================
+
+-- =====================================================
+-- CHANGE NOTIFICATION FUNCTION
+-- =====================================================
+
+-- Sends {"table", "op", "old", "new"} on the cache_invalidation channel,
+-- where old/new hold the key columns named in the trigger arguments plus
+-- the row version. Runs for every writer (API, triggers, psql, batch jobs);
+-- notifications are delivered on commit and dropped on rollback.
+CREATE OR REPLACE FUNCTION notify_cache_change()
+RETURNS TRIGGER AS $$
+DECLARE
+    old_row JSONB;
+    new_row JSONB;
+    old_keys JSONB;
+    new_keys JSONB;
+    key_column TEXT;
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        old_row = to_jsonb(OLD);
+        old_keys = jsonb_build_object('version', old_row -> 'version');
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        new_row = to_jsonb(NEW);
+        new_keys = jsonb_build_object('version', new_row -> 'version');
+    END IF;
+
+    FOREACH key_column IN ARRAY TG_ARGV LOOP
+        IF old_row IS NOT NULL THEN
+            old_keys = old_keys || jsonb_build_object(key_column, old_row -> key_column);
+        END IF;
+        IF new_row IS NOT NULL THEN
+            new_keys = new_keys || jsonb_build_object(key_column, new_row -> key_column);
+        END IF;
+    END LOOP;
+
+    PERFORM pg_notify(
+        'cache_invalidation',
+        jsonb_build_object(
+            'table', TG_TABLE_NAME,
+            'op', TG_OP,
+            'old', old_keys,
+            'new', new_keys
+        )::TEXT
+    );
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- =====================================================
+-- CREATE TRIGGERS
+-- =====================================================
+
+CREATE TRIGGER tr_employees_notify_cache
+    AFTER INSERT OR UPDATE OR DELETE ON employees
+    FOR EACH ROW
+    EXECUTE FUNCTION notify_cache_change('emp_no');
+
+CREATE TRIGGER tr_departments_notify_cache
+    AFTER INSERT OR UPDATE OR DELETE ON departments
+    FOR EACH ROW
+    EXECUTE FUNCTION notify_cache_change('dept_no');
+
+CREATE TRIGGER tr_dept_emp_notify_cache
+    AFTER INSERT OR UPDATE OR DELETE ON dept_emp
+    FOR EACH ROW
+    EXECUTE FUNCTION notify_cache_change('emp_no', 'dept_no');
+
+CREATE TRIGGER tr_salaries_notify_cache
+    AFTER INSERT OR UPDATE OR DELETE ON salaries
+    FOR EACH ROW
+    EXECUTE FUNCTION notify_cache_change('id', 'emp_no');
+
+CREATE TRIGGER tr_titles_notify_cache
+    AFTER INSERT OR UPDATE OR DELETE ON titles
+    FOR EACH ROW
+    EXECUTE FUNCTION notify_cache_change('emp_no');
+
+-- =====================================================
+-- COMMENTS
+-- =====================================================
+COMMENT ON FUNCTION notify_cache_change() IS 'Publishes row key changes on the cache_invalidation channel';
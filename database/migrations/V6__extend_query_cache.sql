@@ -0,0 +1,47 @@
+-- =====================================================
+-- Migration V6: Query Result Cache
+-- Description: Store query results in query_cache for the API's query cache
+-- Author: Enterprise Architecture Team
+-- Date: 2025-11-24
+-- =====================================================
+
+-- =====================================================
+-- QUERY_CACHE COLUMNS
+-- =====================================================
+
+-- result_data holds the encoded rows (see app/utils/codecs.py). Results are
+-- valid until expires_at, and only while the cache namespace they belong to
+-- is still at the recorded generation.
+ALTER TABLE query_cache ADD COLUMN IF NOT EXISTS result_data BYTEA;
+ALTER TABLE query_cache ADD COLUMN IF NOT EXISTS namespace VARCHAR(100);
+ALTER TABLE query_cache ADD COLUMN IF NOT EXISTS generation BIGINT NOT NULL DEFAULT 0;
+
+CREATE INDEX IF NOT EXISTS idx_query_cache_namespace ON query_cache(namespace);
+
+-- =====================================================
+-- CLEANUP FUNCTION
+-- =====================================================
+
+-- Keep the usage statistics (cache_hits, execution_time) of queries that are
+-- still being read; only drop entries that expired and went unused for a week
+CREATE OR REPLACE FUNCTION cleanup_expired_cache()
+RETURNS INTEGER AS $$
+DECLARE
+    deleted_count INTEGER;
+BEGIN
+    DELETE FROM query_cache
+    WHERE expires_at < CURRENT_TIMESTAMP
+      AND last_accessed < CURRENT_TIMESTAMP - INTERVAL '7 days';
+
+    GET DIAGNOSTICS deleted_count = ROW_COUNT;
+    RETURN deleted_count;
+END;
+$$ LANGUAGE plpgsql;
+
+-- =====================================================
+-- COMMENTS
+-- =====================================================
+COMMENT ON COLUMN query_cache.result_data IS 'Encoded result rows';
+COMMENT ON COLUMN query_cache.namespace IS 'Cache namespace invalidating the result';
+COMMENT ON COLUMN query_cache.generation IS 'Namespace generation the result was computed at';
+COMMENT ON FUNCTION cleanup_expired_cache() IS 'Removes expired cache entries unused for a week';
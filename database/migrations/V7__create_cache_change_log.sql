@@ -0,0 +1,76 @@
+-- =====================================================
+-- Migration V7: Cache Change Log
+-- Description: Keep the row changes sent to the change feed so they can be replayed
+-- Author: Enterprise Architecture Team
+-- Date: 2025-11-28
+-- =====================================================
+
+-- =====================================================
+-- CACHE_CHANGE_LOG TABLE
+-- =====================================================
+
+-- Outbox of the notifications sent by notify_cache_change(). A change feed
+-- listener that (re)connects replays the changes of every transaction from
+-- its last checkpoint (a snapshot xmin) on, instead of invalidating the
+-- whole cache. The listener deletes rows older than its retention.
+CREATE TABLE IF NOT EXISTS cache_change_log (
+    id BIGSERIAL PRIMARY KEY,
+    txid XID8 NOT NULL DEFAULT pg_current_xact_id(),
+    change JSONB NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_cache_change_log_txid ON cache_change_log(txid);
+CREATE INDEX IF NOT EXISTS idx_cache_change_log_created_at ON cache_change_log(created_at);
+
+-- =====================================================
+-- CHANGE NOTIFICATION FUNCTION
+-- =====================================================
+
+-- Same payload as in V5, now also logged in cache_change_log
+CREATE OR REPLACE FUNCTION notify_cache_change()
+RETURNS TRIGGER AS $$
+DECLARE
+    old_row JSONB;
+    new_row JSONB;
+    old_keys JSONB;
+    new_keys JSONB;
+    key_column TEXT;
+    change JSONB;
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        old_row = to_jsonb(OLD);
+        old_keys = jsonb_build_object('version', old_row -> 'version');
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        new_row = to_jsonb(NEW);
+        new_keys = jsonb_build_object('version', new_row -> 'version');
+    END IF;
+
+    FOREACH key_column IN ARRAY TG_ARGV LOOP
+        IF old_row IS NOT NULL THEN
+            old_keys = old_keys || jsonb_build_object(key_column, old_row -> key_column);
+        END IF;
+        IF new_row IS NOT NULL THEN
+            new_keys = new_keys || jsonb_build_object(key_column, new_row -> key_column);
+        END IF;
+    END LOOP;
+
+    change = jsonb_build_object(
+        'table', TG_TABLE_NAME,
+        'op', TG_OP,
+        'old', old_keys,
+        'new', new_keys
+    );
+    INSERT INTO cache_change_log (change) VALUES (change);
+    PERFORM pg_notify('cache_invalidation', change::TEXT);
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- =====================================================
+-- COMMENTS
+-- =====================================================
+COMMENT ON TABLE cache_change_log IS 'Row changes sent on the cache_invalidation channel, for replay';
+COMMENT ON COLUMN cache_change_log.txid IS 'Transaction that made the change';
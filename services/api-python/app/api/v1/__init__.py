@@ -2,14 +2,27 @@
 API v1 Router
 """
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
 from app.api.v1.endpoints import employees, departments, salaries, analytics, health, auth
+from app.core.config import settings
+from app.core.database import query_timeout
 
 api_router = APIRouter()
 
+crud_timeout = [Depends(query_timeout(settings.QUERY_TIMEOUT_CRUD))]
+analytics_timeout = [Depends(query_timeout(settings.QUERY_TIMEOUT_ANALYTICS))]
+
 api_router.include_router(health.router, prefix="/health", tags=["Health"])
 api_router.include_router(auth.router, prefix="/auth", tags=["Authentication"])
-api_router.include_router(employees.router, prefix="/employees", tags=["Employees"])
-api_router.include_router(departments.router, prefix="/departments", tags=["Departments"])
-api_router.include_router(salaries.router, prefix="/salaries", tags=["Salaries"])
-api_router.include_router(analytics.router, prefix="/analytics", tags=["Analytics"])
+api_router.include_router(
+    employees.router, prefix="/employees", tags=["Employees"], dependencies=crud_timeout
+)
+api_router.include_router(
+    departments.router, prefix="/departments", tags=["Departments"], dependencies=crud_timeout
+)
+api_router.include_router(
+    salaries.router, prefix="/salaries", tags=["Salaries"], dependencies=crud_timeout
+)
+api_router.include_router(
+    analytics.router, prefix="/analytics", tags=["Analytics"], dependencies=analytics_timeout
+)
@@ -6,11 +6,11 @@
 from datetime import date, datetime
 from typing import List, Optional, Dict, Any
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func, and_, or_, desc, case
 
-from app.core.database import get_db
+from app.core.database import cached_query, get_read_db
 from app.models.employee import Employee, EmploymentStatus
 from app.models.department import Department
 from app.models.salary import Salary
@@ -24,22 +24,34 @@
     TitleDistribution,
     AnalyticsSummary,
 )
-from app.utils.cache import cached, cache_manager
+from app.utils.cache_decorator import cached
 
 router = APIRouter()
 
 
 @router.get("/salary-statistics", response_model=SalaryStatistics)
-@cached(key_prefix="analytics_salary_stats", ttl=600)
+@cached(
+    key_prefix="analytics_salary_stats",
+    ttl=600,
+    stale_ttl=3000,
+    namespace="analytics",
+    lock=True,
+    swr=True,
+    response=True,
+    disk=True,
+    adaptive_ttl=True,
+)
 async def get_salary_statistics(
+    request: Request,
     dept_no: Optional[str] = Query(None),
     current_only: bool = Query(True),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     """
     Get comprehensive salary statistics.
 
     Args:
+        request: HTTP request
         dept_no: Filter by department
         current_only: Only include current salaries
         db: Database session
@@ -71,7 +83,7 @@ async def get_salary_statistics(
         func.stddev(Salary.salary).label("std_deviation"),
     ).select_from(query.subquery())
 
-    result = await db.execute(stats_query)
+    result = await cached_query(db, stats_query)
     stats = result.one()
 
     # Calculate median (approximation using percentile_cont)
@@ -80,9 +92,9 @@ async def get_salary_statistics(
     ).select_from(query.subquery())
 
     try:
-        median_result = await db.execute(median_query)
+        median_result = await cached_query(db, median_query)
         median_salary = median_result.scalar()
-    except:
+    except Exception:
         median_salary = None
 
     return SalaryStatistics(
@@ -97,15 +109,27 @@ async def get_salary_statistics(
 
 
 @router.get("/salary-distribution", response_model=List[SalaryDistribution])
-@cached(key_prefix="analytics_salary_dist", ttl=600)
+@cached(
+    key_prefix="analytics_salary_dist",
+    ttl=600,
+    stale_ttl=3000,
+    namespace="analytics",
+    lock=True,
+    swr=True,
+    response=True,
+    disk=True,
+    adaptive_ttl=True,
+)
 async def get_salary_distribution(
+    request: Request,
     current_only: bool = Query(True),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     """
     Get salary distribution by ranges.
 
     Args:
+        request: HTTP request
         current_only: Only include current salaries
         db: Database session
 
@@ -155,14 +179,26 @@ async def get_salary_distribution(
 
 
 @router.get("/department-performance", response_model=List[DepartmentPerformance])
-@cached(key_prefix="analytics_dept_perf", ttl=600)
+@cached(
+    key_prefix="analytics_dept_perf",
+    ttl=600,
+    stale_ttl=3000,
+    namespace="analytics",
+    lock=True,
+    swr=True,
+    response=True,
+    disk=True,
+    adaptive_ttl=True,
+)
 async def get_department_performance(
-    db: AsyncSession = Depends(get_db),
+    request: Request,
+    db: AsyncSession = Depends(get_read_db),
 ):
     """
     Get performance metrics for all departments.
 
     Args:
+        request: HTTP request
         db: Database session
 
     Returns:
@@ -250,15 +286,27 @@ async def get_department_performance(
 
 
 @router.get("/employee-trends", response_model=List[EmployeeTrends])
-@cached(key_prefix="analytics_emp_trends", ttl=600)
+@cached(
+    key_prefix="analytics_emp_trends",
+    ttl=600,
+    stale_ttl=3000,
+    namespace="analytics",
+    lock=True,
+    swr=True,
+    response=True,
+    disk=True,
+    adaptive_ttl=True,
+)
 async def get_employee_trends(
+    request: Request,
     months: int = Query(12, ge=1, le=60),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     """
     Get employee hiring and termination trends.
 
     Args:
+        request: HTTP request
         months: Number of months to analyze
         db: Database session
 
@@ -327,15 +375,27 @@ async def get_employee_trends(
 
 
 @router.get("/gender-diversity", response_model=List[GenderDiversity])
-@cached(key_prefix="analytics_gender_div", ttl=600)
+@cached(
+    key_prefix="analytics_gender_div",
+    ttl=600,
+    stale_ttl=3000,
+    namespace="analytics",
+    lock=True,
+    swr=True,
+    response=True,
+    disk=True,
+    adaptive_ttl=True,
+)
 async def get_gender_diversity(
+    request: Request,
     dept_no: Optional[str] = Query(None),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     """
     Get gender diversity statistics.
 
     Args:
+        request: HTTP request
         dept_no: Filter by department
         db: Database session
 
@@ -401,15 +461,27 @@ async def get_gender_diversity(
 
 
 @router.get("/title-distribution", response_model=List[TitleDistribution])
-@cached(key_prefix="analytics_title_dist", ttl=600)
+@cached(
+    key_prefix="analytics_title_dist",
+    ttl=600,
+    stale_ttl=3000,
+    namespace="analytics",
+    lock=True,
+    swr=True,
+    response=True,
+    disk=True,
+    adaptive_ttl=True,
+)
 async def get_title_distribution(
+    request: Request,
     dept_no: Optional[str] = Query(None),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     """
     Get distribution of job titles.
 
     Args:
+        request: HTTP request
         dept_no: Filter by department
         db: Database session
 
@@ -478,14 +550,26 @@ async def get_title_distribution(
 
 
 @router.get("/summary")
-@cached(key_prefix="analytics_summary", ttl=600)
+@cached(
+    key_prefix="analytics_summary",
+    ttl=600,
+    stale_ttl=3000,
+    namespace="analytics",
+    lock=True,
+    swr=True,
+    response=True,
+    disk=True,
+    adaptive_ttl=True,
+)
 async def get_analytics_summary(
-    db: AsyncSession = Depends(get_db),
+    request: Request,
+    db: AsyncSession = Depends(get_read_db),
 ):
     """
     Get overall analytics summary.
 
     Args:
+        request: HTTP request
         db: Database session
 
     Returns:
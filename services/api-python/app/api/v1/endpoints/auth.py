@@ -22,7 +22,6 @@
     get_current_user,
 )
 from app.models.user import User, Role
-from app.utils.cache import cache_manager
 
 router = APIRouter()
 
@@ -309,9 +308,6 @@ async def logout(
     # 2. Track user sessions and invalidate them
     # For now, we just return success and let the client discard the token
 
-    # Invalidate user's cache
-    await cache_manager.delete_pattern(f"user:{current_user.id}:*")
-
     return None
 
 
@@ -386,9 +382,6 @@ async def update_current_user(
     await db.commit()
     await db.refresh(current_user)
 
-    # Invalidate cache
-    await cache_manager.delete_pattern(f"user:{current_user.id}:*")
-
     return UserResponse(
         id=current_user.id,
         username=current_user.username,
@@ -426,7 +419,4 @@ async def change_password(
     current_user.password_hash = hash_password(password_data.new_password)
     await db.commit()
 
-    # Invalidate all caches for this user
-    await cache_manager.delete_pattern(f"user:{current_user.id}:*")
-
     return None
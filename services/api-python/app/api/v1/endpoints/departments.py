@@ -3,12 +3,13 @@
 Complete CRUD operations for departments
 """
 
+from operator import attrgetter
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func, and_, or_
 
-from app.core.database import get_db
+from app.core.database import check_query_cost, get_db, get_read_db
 from app.models.department import Department
 from app.models.dept_emp import DeptEmp
 from app.schemas.employee import PaginatedResponse
@@ -18,23 +19,37 @@
     DepartmentResponse,
     DepartmentStatistics,
 )
-from app.utils.cache import cached, cache_manager
+from app.utils.cache import cache_manager
+from app.utils.cache_decorator import cached
+from app.utils.conditional import entity_etag
 
 router = APIRouter()
 
 
 @router.get("/", response_model=PaginatedResponse)
+@cached(
+    key_prefix="departments",
+    ttl=300,
+    tags=["departments"],
+    response=True,
+    adaptive_ttl=True,
+)
 async def list_departments(
+    request: Request,
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
     search: str = Query(None),
     is_active: Optional[bool] = Query(None),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     """
     List departments with pagination and filtering.
 
+    Departments are reference data: every page is cached under the
+    "departments" tag, which any department change invalidates.
+
     Args:
+        request: HTTP request
         page: Page number
         page_size: Items per page
         search: Search in department name
@@ -57,16 +72,20 @@ async def list_departments(
     if is_active is not None:
         query = query.where(Department.is_active == is_active)
 
+    # Apply pagination
+    page_query = query.offset((page - 1) * page_size).limit(page_size)
+
     # Get total count
     count_query = select(func.count()).select_from(query.subquery())
+
+    # Refuse filter combinations too expensive to run
+    await check_query_cost(db, count_query, page_query)
+
     result = await db.execute(count_query)
     total = result.scalar()
 
-    # Apply pagination
-    query = query.offset((page - 1) * page_size).limit(page_size)
-
     # Execute query
-    result = await db.execute(query)
+    result = await db.execute(page_query)
     departments = result.scalars().all()
 
     return PaginatedResponse.create(
@@ -78,15 +97,27 @@ async def list_departments(
 
 
 @router.get("/{dept_no}", response_model=DepartmentResponse)
-@cached(key_prefix="department", ttl=300)
+@cached(
+    key_prefix="department",
+    ttl=300,
+    tags=["department:{dept_no}"],
+    response=True,
+    negative_ttl=30,
+    etag=entity_etag,
+    last_modified=attrgetter("updated_at"),
+    version=attrgetter("version"),
+    adaptive_ttl=True,
+)
 async def get_department(
+    request: Request,
     dept_no: str,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     """
     Get department by ID.
 
     Args:
+        request: HTTP request
         dept_no: Department number
         db: Database session
 
@@ -141,8 +172,12 @@ async def create_department(
     await db.commit()
     await db.refresh(department)
 
-    # Invalidate cache
-    await cache_manager.delete_pattern("department:*")
+    # Drop a cached 404 for the new ID, the lists and aggregates that include it
+    await cache_manager.invalidate(
+        tags=[f"department:{department.dept_no}", "departments"],
+        namespaces=["analytics"],
+        versions={f"department:{department.dept_no}": department.version},
+    )
 
     return DepartmentResponse.model_validate(department)
 
@@ -182,12 +217,17 @@ async def update_department(
 
     await db.commit()
     await db.refresh(department)
+    updated = DepartmentResponse.model_validate(department)
+
+    # Write the new version through, then drop entries derived from the old one
+    await get_department.write_through(updated, dept_no=dept_no)
+    await cache_manager.invalidate(
+        tags=[f"department:{dept_no}", "departments"],
+        namespaces=["analytics"],
+        versions={f"department:{dept_no}": department.version},
+    )
 
-    # Invalidate cache
-    await cache_manager.delete(f"department:{dept_no}")
-    await cache_manager.delete_pattern("department:*")
-
-    return DepartmentResponse.model_validate(department)
+    return updated
 
 
 @router.delete("/{dept_no}", status_code=status.HTTP_204_NO_CONTENT)
@@ -217,10 +257,14 @@ async def delete_department(
     # Soft delete
     department.is_deleted = True
     await db.commit()
+    await db.refresh(department)
 
-    # Invalidate cache
-    await cache_manager.delete(f"department:{dept_no}")
-    await cache_manager.delete_pattern("department:*")
+    # Invalidate cache; fills that read the row before the delete are older
+    await cache_manager.invalidate(
+        tags=[f"department:{dept_no}", "departments"],
+        namespaces=["analytics"],
+        versions={f"department:{dept_no}": department.version},
+    )
 
     return None
 
@@ -231,7 +275,7 @@ async def get_department_employees(
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
     current_only: bool = Query(True),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     """
     Get employees in a department.
@@ -278,16 +322,20 @@ async def get_department_employees(
         from datetime import date
         query = query.where(DeptEmp.to_date == date(9999, 12, 31))
 
+    # Apply pagination
+    page_query = query.offset((page - 1) * page_size).limit(page_size)
+
     # Get total count
     count_query = select(func.count()).select_from(query.subquery())
+
+    # Refuse pages too deep to reach cheaply
+    await check_query_cost(db, count_query, page_query)
+
     result = await db.execute(count_query)
     total = result.scalar()
 
-    # Apply pagination
-    query = query.offset((page - 1) * page_size).limit(page_size)
-
     # Execute query
-    result = await db.execute(query)
+    result = await db.execute(page_query)
     employees = result.scalars().all()
 
     from app.schemas.employee import EmployeeResponse
@@ -301,15 +349,27 @@ async def get_department_employees(
 
 
 @router.get("/{dept_no}/statistics", response_model=DepartmentStatistics)
-@cached(key_prefix="department_stats", ttl=600)
+@cached(
+    key_prefix="department_stats",
+    ttl=600,
+    stale_ttl=3000,
+    namespace="analytics",
+    lock=True,
+    swr=True,
+    response=True,
+    disk=True,
+    adaptive_ttl=True,
+)
 async def get_department_statistics(
+    request: Request,
     dept_no: str,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     """
     Get department statistics.
 
     Args:
+        request: HTTP request
         dept_no: Department number
         db: Database session
 
@@ -3,12 +3,15 @@
 Complete CRUD operations for employees
 """
 
+from datetime import date
+from operator import attrgetter
 from typing import List
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.encoders import jsonable_encoder
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, and_, or_
+from sqlalchemy import ARRAY, Integer, any_, bindparam, select, func, and_, or_
 
-from app.core.database import get_db
+from app.core.database import check_query_cost, get_db, get_read_db
 from app.models.employee import Employee
 from app.schemas.employee import (
     EmployeeCreate,
@@ -18,23 +21,30 @@
     PaginationParams,
     PaginatedResponse,
 )
-from app.utils.cache import cached, cache_manager
+from app.services.membership import EMPLOYEE_FILTER
+from app.utils.cache import cache_manager
+from app.utils.cache_decorator import cached, reject_unknown
+from app.utils.conditional import entity_etag, is_not_modified, not_modified, watermark_etag
 
 router = APIRouter()
 
 
 @router.get("/", response_model=PaginatedResponse)
 async def list_employees(
+    request: Request,
+    response: Response,
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
     search: str = Query(None),
     status: str = Query(None),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     """
     List employees with pagination and filtering.
 
     Args:
+        request: HTTP request
+        response: Response whose headers carry the ETag
         page: Page number
         page_size: Items per page
         search: Search in name, email
@@ -58,16 +68,27 @@ async def list_employees(
     if status:
         query = query.where(Employee.status == status)
 
-    # Get total count
-    count_query = select(func.count()).select_from(query.subquery())
+    # Apply pagination
+    page_query = query.offset((page - 1) * page_size).limit(page_size)
+
+    # Get total count and change watermark in one query
+    filtered = query.subquery()
+    count_query = select(func.count(), func.max(filtered.c.updated_at))
+
+    # Refuse filter combinations too expensive to run
+    await check_query_cost(db, count_query, page_query)
+
     result = await db.execute(count_query)
-    total = result.scalar()
+    total, last_updated = result.one()
 
-    # Apply pagination
-    query = query.offset((page - 1) * page_size).limit(page_size)
+    # Unchanged since the client's copy: skip loading the page
+    etag = watermark_etag(total, last_updated, date.today(), page, page_size, search, status)
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
 
     # Execute query
-    result = await db.execute(query)
+    result = await db.execute(page_query)
     employees = result.scalars().all()
 
     return PaginatedResponse.create(
@@ -78,16 +99,74 @@ async def list_employees(
     )
 
 
+@router.get("/batch", response_model=List[EmployeeResponse])
+async def get_employees_batch(
+    emp_no: List[int] = Query(..., min_length=1, max_length=100),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """
+    Get several employees by ID.
+
+    Shares its cache entries with get_employee: cached employees are
+    fetched in one round trip, and only the misses are loaded from the
+    database with a single query and written through in one round trip.
+
+    Args:
+        emp_no: Employee numbers (repeat the parameter)
+        db: Database session
+
+    Returns:
+        Employees that exist, in the requested order
+    """
+    numbers = list(dict.fromkeys(emp_no))
+    found = await get_employee.get_many({"emp_no": number} for number in numbers)
+    # Cached 404s are known not to exist
+    records = {numbers[index]: record for index, record in found.items() if record is not None}
+
+    missing = [
+        number
+        for index, number in enumerate(numbers)
+        if index not in found and cache_manager.might_contain(EMPLOYEE_FILTER, number)
+    ]
+    if missing:
+        query = select(Employee).where(
+            and_(
+                Employee.emp_no == any_(bindparam("emp_nos", missing, type_=ARRAY(Integer))),
+                Employee.is_deleted == False,
+            )
+        )
+        result = await db.execute(query)
+        loaded = [EmployeeResponse.model_validate(employee) for employee in result.scalars().all()]
+        await get_employee.write_through_many(
+            (employee, {"emp_no": employee.emp_no}) for employee in loaded
+        )
+        records.update((employee.emp_no, jsonable_encoder(employee)) for employee in loaded)
+
+    return [records[number] for number in numbers if number in records]
+
+
 @router.get("/{emp_no}", response_model=EmployeeResponse)
-@cached(key_prefix="employee", ttl=300)
+@reject_unknown(EMPLOYEE_FILTER, "emp_no", "Employee {emp_no} not found")
+@cached(
+    key_prefix="employee",
+    ttl=300,
+    tags=["employee:{emp_no}"],
+    response=True,
+    negative_ttl=30,
+    # age and years_of_service change with the date, not the row
+    etag=lambda employee: entity_etag(employee, date.today()),
+    version=attrgetter("version"),
+)
 async def get_employee(
+    request: Request,
     emp_no: int,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     """
     Get employee by ID.
 
     Args:
+        request: HTTP request
         emp_no: Employee number
         db: Database session
 
@@ -131,8 +210,13 @@ async def create_employee(
     await db.commit()
     await db.refresh(employee)
 
-    # Invalidate cache
-    await cache_manager.delete_pattern("employee:*")
+    # Drop a cached 404 for the new ID and aggregates that include it
+    await cache_manager.add_to_filter(EMPLOYEE_FILTER, employee.emp_no)
+    await cache_manager.invalidate(
+        tags=[f"employee:{employee.emp_no}"],
+        namespaces=["analytics"],
+        versions={f"employee:{employee.emp_no}": employee.version},
+    )
 
     return EmployeeResponse.model_validate(employee)
 
@@ -172,12 +256,17 @@ async def update_employee(
 
     await db.commit()
     await db.refresh(employee)
+    updated = EmployeeResponse.model_validate(employee)
+
+    # Write the new version through, then drop entries derived from the old one
+    await get_employee.write_through(updated, emp_no=emp_no)
+    await cache_manager.invalidate(
+        tags=[f"employee:{emp_no}"],
+        namespaces=["analytics"],
+        versions={f"employee:{emp_no}": employee.version},
+    )
 
-    # Invalidate cache
-    await cache_manager.delete(f"employee:{emp_no}")
-    await cache_manager.delete_pattern("employee:*")
-
-    return EmployeeResponse.model_validate(employee)
+    return updated
 
 
 @router.delete("/{emp_no}", status_code=status.HTTP_204_NO_CONTENT)
@@ -207,9 +296,13 @@ async def delete_employee(
     # Soft delete
     employee.is_deleted = True
     await db.commit()
+    await db.refresh(employee)
 
-    # Invalidate cache
-    await cache_manager.delete(f"employee:{emp_no}")
-    await cache_manager.delete_pattern("employee:*")
+    # Invalidate cache; fills that read the row before the delete are older
+    await cache_manager.invalidate(
+        tags=[f"employee:{emp_no}"],
+        namespaces=["analytics"],
+        versions={f"employee:{emp_no}": employee.version},
+    )
 
     return None
@@ -2,13 +2,22 @@
 Health Check Endpoints
 """
 
-from fastapi import APIRouter, status
+from fastapi import APIRouter, Query, status
 from app.core.database import DatabaseHealthCheck
+from app.services.cache_warmup import warmup_complete
 from app.utils.cache import cache_manager
+from app.utils.cache_metrics import prefix_stats
 
 router = APIRouter()
 
 
+def _cache_status() -> str:
+    """Cache state: disabled, degraded (Redis bypassed) or healthy."""
+    if not cache_manager.enabled or cache_manager.redis is None:
+        return "disabled"
+    return "degraded" if cache_manager.breaker.is_open else "healthy"
+
+
 @router.get("/", status_code=status.HTTP_200_OK)
 async def health_check():
     """Basic health check."""
@@ -22,9 +31,11 @@ async def health_check():
 async def detailed_health_check():
     """Detailed health check with dependencies."""
     db_health = await DatabaseHealthCheck.check()
+    db_health["pools"] = DatabaseHealthCheck.pools()
     cache_health = {
-        "status": "healthy" if cache_manager.enabled and cache_manager.redis else "disabled",
+        "status": _cache_status(),
         "enabled": cache_manager.enabled,
+        "bypassed": cache_manager.breaker.is_open,
     }
 
     overall_status = "healthy" if db_health["status"] == "healthy" else "unhealthy"
@@ -37,6 +48,44 @@ async def detailed_health_check():
     }
 
 
+@router.get("/cache", status_code=status.HTTP_200_OK)
+async def cache_health_check(limit: int = Query(5, ge=1, le=50)):
+    """
+    Cache effectiveness by key prefix for this worker.
+
+    Hot prefixes are the most read; cold prefixes are those written most
+    often relative to how often they are read. stored_bytes is what Redis
+    holds for prefixes with a byte budget, and null for the others.
+    """
+    stats = prefix_stats()
+    stored = await cache_manager.stored_bytes()
+    prefixes = [
+        {"prefix": prefix, **values, "stored_bytes": stored.get(prefix)}
+        for prefix, values in stats.items()
+    ]
+
+    hot = sorted(prefixes, key=lambda p: p["hits"] + p["misses"], reverse=True)
+    cold = sorted(
+        (p for p in prefixes if p["sets"]),
+        key=lambda p: (p["hits"] / p["sets"], -p["bytes_written"]),
+    )
+
+    l1 = None
+    if cache_manager.local is not None:
+        l1 = {
+            "entries": len(cache_manager.local),
+            "bytes": cache_manager.local.current_bytes,
+            "evictions": cache_manager.local.evictions,
+        }
+
+    return {
+        "status": _cache_status(),
+        "l1": l1,
+        "hot": hot[:limit],
+        "cold": cold[:limit],
+    }
+
+
 @router.get("/ready", status_code=status.HTTP_200_OK)
 async def readiness_check():
     """Readiness probe for Kubernetes."""
@@ -45,6 +94,9 @@ async def readiness_check():
     if db_health["status"] != "healthy":
         return {"status": "not_ready", "reason": "database_unavailable"}
 
+    if not warmup_complete():
+        return {"status": "not_ready", "reason": "cache_warming"}
+
     return {"status": "ready"}
 
 
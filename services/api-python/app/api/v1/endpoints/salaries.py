@@ -4,13 +4,14 @@
 """
 
 from datetime import date
+from operator import attrgetter
 from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func, and_, or_, desc
 
-from app.core.database import get_db
+from app.core.database import check_query_cost, get_db, get_read_db
 from app.models.salary import Salary
 from app.models.employee import Employee
 from app.schemas.employee import PaginatedResponse
@@ -20,25 +21,31 @@
     SalaryResponse,
     SalaryWithEmployee,
 )
-from app.utils.cache import cached, cache_manager
+from app.utils.cache import cache_manager
+from app.utils.cache_decorator import cached
+from app.utils.conditional import entity_etag, is_not_modified, not_modified, watermark_etag
 
 router = APIRouter()
 
 
 @router.get("/", response_model=PaginatedResponse)
 async def list_salaries(
+    request: Request,
+    response: Response,
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
     emp_no: Optional[int] = Query(None),
     min_salary: Optional[Decimal] = Query(None),
     max_salary: Optional[Decimal] = Query(None),
     current_only: bool = Query(True),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     """
     List salaries with pagination and filtering.
 
     Args:
+        request: HTTP request
+        response: Response whose headers carry the ETag
         page: Page number
         page_size: Items per page
         emp_no: Filter by employee number
@@ -68,16 +75,29 @@ async def list_salaries(
     # Order by from_date descending
     query = query.order_by(desc(Salary.from_date))
 
-    # Get total count
-    count_query = select(func.count()).select_from(query.subquery())
+    # Apply pagination
+    page_query = query.offset((page - 1) * page_size).limit(page_size)
+
+    # Get total count and change watermark in one query
+    filtered = query.subquery()
+    count_query = select(func.count(), func.max(filtered.c.updated_at))
+
+    # Refuse filter combinations too expensive to run
+    await check_query_cost(db, count_query, page_query)
+
     result = await db.execute(count_query)
-    total = result.scalar()
+    total, last_updated = result.one()
 
-    # Apply pagination
-    query = query.offset((page - 1) * page_size).limit(page_size)
+    # Unchanged since the client's copy: skip loading the page
+    etag = watermark_etag(
+        total, last_updated, page, page_size, emp_no, min_salary, max_salary, current_only
+    )
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
 
     # Execute query
-    result = await db.execute(query)
+    result = await db.execute(page_query)
     salaries = result.scalars().all()
 
     return PaginatedResponse.create(
@@ -89,15 +109,27 @@ async def list_salaries(
 
 
 @router.get("/{salary_id}", response_model=SalaryResponse)
-@cached(key_prefix="salary", ttl=300)
+@cached(
+    key_prefix="salary",
+    ttl=300,
+    tags=["salary:{salary_id}"],
+    response=True,
+    negative_ttl=30,
+    etag=entity_etag,
+    last_modified=attrgetter("updated_at"),
+    version=attrgetter("version"),
+    adaptive_ttl=True,
+)
 async def get_salary(
+    request: Request,
     salary_id: int,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     """
     Get salary by ID.
 
     Args:
+        request: HTTP request
         salary_id: Salary ID
         db: Database session
 
@@ -187,9 +219,12 @@ async def create_salary(
     await db.commit()
     await db.refresh(salary)
 
-    # Invalidate cache
-    await cache_manager.delete_pattern("salary:*")
-    await cache_manager.delete_pattern(f"employee:{salary_data.emp_no}:*")
+    # Invalidate cache, including a cached 404 for the new ID
+    await cache_manager.invalidate(
+        tags=[f"salary:{salary.id}", f"employee:{salary_data.emp_no}"],
+        namespaces=["analytics"],
+        versions={f"salary:{salary.id}": salary.version},
+    )
 
     return SalaryResponse.model_validate(salary)
 
@@ -241,13 +276,17 @@ async def update_salary(
 
     await db.commit()
     await db.refresh(salary)
+    updated = SalaryResponse.model_validate(salary)
+
+    # Write the new version through, then drop entries derived from the old one
+    await get_salary.write_through(updated, salary_id=salary_id)
+    await cache_manager.invalidate(
+        tags=[f"salary:{salary_id}", f"employee:{salary.emp_no}"],
+        namespaces=["analytics"],
+        versions={f"salary:{salary_id}": salary.version},
+    )
 
-    # Invalidate cache
-    await cache_manager.delete(f"salary:{salary_id}")
-    await cache_manager.delete_pattern("salary:*")
-    await cache_manager.delete_pattern(f"employee:{salary.emp_no}:*")
-
-    return SalaryResponse.model_validate(salary)
+    return updated
 
 
 @router.delete("/{salary_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -277,28 +316,40 @@ async def delete_salary(
     # Soft delete
     salary.is_deleted = True
     await db.commit()
+    await db.refresh(salary)
 
-    # Invalidate cache
-    await cache_manager.delete(f"salary:{salary_id}")
-    await cache_manager.delete_pattern("salary:*")
-    await cache_manager.delete_pattern(f"employee:{salary.emp_no}:*")
+    # Invalidate cache; fills that read the row before the delete are older
+    await cache_manager.invalidate(
+        tags=[f"salary:{salary_id}", f"employee:{salary.emp_no}"],
+        namespaces=["analytics"],
+        versions={f"salary:{salary_id}": salary.version},
+    )
 
     return None
 
 
 # Employee-specific salary endpoints
 @router.get("/employee/{emp_no}", response_model=PaginatedResponse)
-@cached(key_prefix="employee_salaries", ttl=300)
+@cached(
+    key_prefix="employee_salaries",
+    ttl=300,
+    tags=["employee:{emp_no}"],
+    response=True,
+    admission=True,
+    adaptive_ttl=True,
+)
 async def get_employee_salaries(
+    request: Request,
     emp_no: int,
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     """
     Get salary history for an employee.
 
     Args:
+        request: HTTP request
         emp_no: Employee number
         page: Page number
         page_size: Items per page
@@ -348,15 +399,25 @@ async def get_employee_salaries(
 
 
 @router.get("/employee/{emp_no}/current", response_model=SalaryResponse)
-@cached(key_prefix="employee_current_salary", ttl=600)
+@cached(
+    key_prefix="employee_current_salary",
+    ttl=600,
+    tags=["employee:{emp_no}"],
+    response=True,
+    etag=entity_etag,
+    last_modified=attrgetter("updated_at"),
+    adaptive_ttl=True,
+)
 async def get_employee_current_salary(
+    request: Request,
     emp_no: int,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     """
     Get current salary for an employee.
 
     Args:
+        request: HTTP request
         emp_no: Employee number
         db: Database session
 
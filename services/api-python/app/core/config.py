@@ -3,7 +3,7 @@
 Centralized configuration management using Pydantic Settings
 """
 
-from typing import List, Optional
+from typing import Dict, List, Optional
 from pydantic import PostgresDsn, RedisDsn, field_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -49,6 +49,17 @@ class Settings(BaseSettings):
     DB_MAX_OVERFLOW: int = 20
     DB_POOL_TIMEOUT: int = 30
     DB_ECHO: bool = False
+    # Run get_read_db() reads on the primary as SERIALIZABLE READ ONLY DEFERRABLE:
+    # one snapshot per request without serialization failures, possibly after
+    # a short wait. Replica reads are READ ONLY (hot standbys reject SERIALIZABLE).
+    DB_READ_DEFERRABLE: bool = False
+
+    # Streaming replicas serving get_read_db(); see app/core/replicas.py
+    DATABASE_REPLICA_URLS: List[str] = []
+    DB_REPLICA_MAX_LAG: float = 5.0  # seconds behind the primary before reads stop
+    DB_REPLICA_CHECK_INTERVAL: float = 1.0  # seconds between lag samples
+    DB_READ_YOUR_WRITES_COOKIE: str = "db_lsn"
+    DB_READ_YOUR_WRITES_TTL: int = 60  # seconds the token cookie is kept after a write
 
     @field_validator("DATABASE_URL", mode="before")
     @classmethod
@@ -76,6 +87,97 @@ def assemble_db_connection(cls, v: Optional[str], info) -> str:
     REDIS_TTL: int = 3600
     CACHE_ENABLED: bool = True
 
+    # Redis URLs to shard the cache across with consistent hashing; when
+    # empty, REDIS_URL is the only node. Each node gets its own pool.
+    REDIS_NODES: List[str] = []
+    REDIS_MAX_CONNECTIONS: int = 20  # per node
+    CACHE_HASH_RING_REPLICAS: int = 160  # virtual nodes per Redis node
+
+    # Redis failure handling; see app/utils/circuit_breaker.py
+    CACHE_OPERATION_TIMEOUT: float = 0.25  # seconds per Redis command
+    CACHE_CONNECT_TIMEOUT: float = 1.0  # seconds
+    CACHE_BREAKER_FAILURE_THRESHOLD: int = 5  # failures within the window to bypass Redis
+    CACHE_BREAKER_WINDOW: float = 10.0  # seconds
+    CACHE_BREAKER_PROBE_INTERVAL: float = 5.0  # seconds between health probes while bypassed
+
+    # In-process (L1) cache in front of Redis
+    CACHE_L1_ENABLED: bool = True
+    CACHE_L1_MAX_ENTRIES: int = 10000
+    CACHE_L1_MAX_BYTES: int = 67108864  # 64MB
+    CACHE_INVALIDATION_CHANNEL: str = "cache:invalidation"
+
+    # Stampede protection for cached() recomputation
+    CACHE_LOCK_TTL: int = 30  # seconds
+    CACHE_LOCK_WAIT: float = 5.0  # seconds
+    CACHE_SWR_RETRY_INTERVAL: int = 30  # seconds between failed background refreshes
+
+    # Row versions committed through invalidate(versions=...) fence out fills
+    # that read the row before the write; keep them at least as long as the
+    # longest entry TTL, including adaptive ones
+    CACHE_VERSION_TTL: int = 21600  # seconds
+
+    # Bodies of cached responses at least this large are stored gzipped
+    CACHE_RESPONSE_GZIP_MIN_SIZE: int = 1000
+
+    # Encoding of cached values; see app/utils/codecs.py
+    CACHE_CODEC: str = "orjson"  # orjson or msgpack
+    CACHE_COMPRESSION: Optional[str] = "zstd"  # zstd, lz4, zlib or None
+    CACHE_COMPRESSION_MIN_SIZE: int = 1024  # bytes
+
+    # On-disk tier shared by a host's workers; see app/utils/disk_cache.py
+    CACHE_DISK_ENABLED: bool = False
+    CACHE_DISK_PATH: str = "/tmp/api-cache.sqlite3"
+    CACHE_DISK_MAX_BYTES: int = 268435456  # 256MB
+
+    # Bloom filter of existing emp_no values; rejects unknown IDs without I/O
+    CACHE_EMPLOYEE_FILTER_ENABLED: bool = False
+    CACHE_FILTER_ERROR_RATE: float = 0.01
+
+    # Postgres LISTEN/NOTIFY feed of row changes (migration V5)
+    CACHE_CHANGE_FEED_ENABLED: bool = True
+    CACHE_CHANGE_FEED_CHANNEL: str = "cache_invalidation"  # must match notify_cache_change()
+    CACHE_CHANGE_FEED_BATCH_WINDOW: float = 0.05  # seconds to coalesce notifications
+    CACHE_CHANGE_FEED_LOCK_TTL: int = 15  # seconds a dead leader worker holds the feed
+    CACHE_CHANGE_FEED_CHECKPOINT_INTERVAL: float = 5.0  # seconds between replay checkpoints
+    CACHE_CHANGE_FEED_RETENTION: int = 86400  # seconds changes are kept for replay (migration V7)
+    CACHE_CHANGE_FEED_REPLAY_LIMIT: int = 10000  # more missed changes invalidate everything
+
+    # Query result cache persisted in the query_cache table (migration V6)
+    QUERY_CACHE_ENABLED: bool = True
+    QUERY_CACHE_TTL: int = 3600  # seconds
+    QUERY_CACHE_FLUSH_INTERVAL: int = 60  # seconds between writes of results and hit counts
+
+    # Startup warm-up of hot entries; see app/services/cache_warmup.py
+    CACHE_WARMUP_ENABLED: bool = True
+    CACHE_WARMUP_TARGETS: List[str] = [
+        "analytics_summary",
+        "analytics_dept_perf",
+        "analytics_title_dist",
+        "departments",
+    ]
+    CACHE_WARMUP_TIMEOUT: float = 180.0  # seconds until readiness stops waiting
+    CACHE_WARMUP_LOCK_TTL: int = 120  # seconds; bounds a crashed worker's turn
+
+    # Admission of cached() results; see app/utils/frequency_sketch.py
+    CACHE_ADMISSION_ENABLED: bool = True
+    CACHE_ADMISSION_MIN_FREQUENCY: int = 2  # recent reads of a key before it is stored
+    CACHE_ADMISSION_SKETCH_WIDTH: int = 65536  # counters per sketch row
+
+    # TTLs of cached(adaptive_ttl=True) families follow how often their tags and
+    # namespaces are invalidated; see app/utils/adaptive_ttl.py
+    CACHE_ADAPTIVE_TTL_ENABLED: bool = True
+    CACHE_ADAPTIVE_TTL_MIN: int = 60  # seconds
+    CACHE_ADAPTIVE_TTL_MAX: int = 21600  # 6 hours
+    CACHE_ADAPTIVE_TTL_HALF_LIFE: int = 86400  # seconds over which invalidation counts halve
+    CACHE_ADAPTIVE_TTL_FACTOR: float = 0.5  # TTL as a fraction of the mean change interval
+
+    # Redis bytes per key prefix; over budget, the entries with the lowest
+    # recency-weighted value per byte are evicted first
+    CACHE_PREFIX_BUDGETS: Dict[str, int] = {
+        "employee_salaries": 67108864,  # 64MB
+        "query": 67108864,  # 64MB
+    }
+
     @field_validator("REDIS_URL", mode="before")
     @classmethod
     def assemble_redis_connection(cls, v: Optional[str], info) -> str:
@@ -121,8 +223,14 @@ def assemble_redis_connection(cls, v: Optional[str], info) -> str:
     # Query Limits
     MAX_PAGE_SIZE: int = 100
     DEFAULT_PAGE_SIZE: int = 20
-    QUERY_TIMEOUT: int = 30000  # milliseconds
-    MAX_QUERY_COMPLEXITY: int = 1000
+    QUERY_TIMEOUT: int = 30000  # milliseconds per request for all its statements
+    QUERY_TIMEOUT_CRUD: int = 5000  # employees, departments and salaries
+    QUERY_TIMEOUT_ANALYTICS: int = 120000
+    # Reject list queries built from request filters whose estimated cost
+    # (EXPLAIN total cost, in planner units) exceeds MAX_QUERY_COMPLEXITY
+    QUERY_COST_GATE_ENABLED: bool = False
+    MAX_QUERY_COMPLEXITY: int = 500000
+    QUERY_COST_CACHE_TTL: int = 3600  # seconds an estimate is reused per query shape
 
     # File Upload
     MAX_UPLOAD_SIZE: int = 10485760  # 10MB
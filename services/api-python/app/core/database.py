@@ -3,30 +3,179 @@
 Provides async database connections and session management
 """
 
-from typing import AsyncGenerator
+import asyncio
+import hashlib
+import time
+from collections import Counter
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, AsyncGenerator, Awaitable, Callable, Dict, Iterable, Optional, Tuple
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import event, text
+from sqlalchemy.engine import Connection, Engine, Result, make_url
+from sqlalchemy.engine.result import IteratorResult, SimpleResultMetaData
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.compiler import compiles
 from sqlalchemy.ext.asyncio import (
     AsyncSession,
     create_async_engine,
     async_sessionmaker,
 )
-from sqlalchemy.orm import declarative_base
+from sqlalchemy.orm import Session, declarative_base
 from sqlalchemy.pool import NullPool, QueuePool
+from sqlalchemy.sql import ClauseElement, Executable
 
 from app.core.config import settings
 from app.core.logging import logger
+from app.core.pool_metrics import instrument_engine, instrumented_pool, pool_stats
+from app.core.replicas import Replica, ReplicaRouter, parse_lsn
+from app.utils import codecs
+from app.utils.cache import cache_fill, cache_manager, filling_cache
+from app.utils.cache_metrics import CACHE_HITS
+
+
+def _pool_options(name: str) -> Dict[str, Any]:
+    """Return the pool arguments of an engine; sizes only apply to QueuePool."""
+    if settings.ENVIRONMENT != "production":
+        return {"poolclass": instrumented_pool(NullPool, name)}
+    return {
+        "poolclass": instrumented_pool(QueuePool, name),
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+    }
 
 
 # Create async engine
 engine = create_async_engine(
     str(settings.DATABASE_URL),
     echo=settings.DB_ECHO,
-    pool_size=settings.DB_POOL_SIZE,
-    max_overflow=settings.DB_MAX_OVERFLOW,
-    pool_timeout=settings.DB_POOL_TIMEOUT,
-    poolclass=QueuePool if settings.ENVIRONMENT == "production" else NullPool,
     pool_pre_ping=True,
     pool_recycle=3600,
+    **_pool_options("primary"),
 )
+instrument_engine(engine.sync_engine, "primary")
+
+
+@dataclass
+class Deadline:
+    """Time budget for the database statements of one request."""
+
+    # Seconds from started_at
+    timeout: float
+    started_at: float = field(default_factory=time.monotonic)
+
+    def remaining(self) -> float:
+        """Return the seconds left, negative once expired."""
+        return self.started_at + self.timeout - time.monotonic()
+
+
+_deadline: ContextVar[Optional[Deadline]] = ContextVar("deadline", default=None)
+
+# Milliseconds the budget may shrink before statement_timeout is set again
+# within a transaction; saves a round trip for most statements
+_STATEMENT_TIMEOUT_SLACK_MS = 1000
+
+# Sets statement_timeout until the end of the transaction, like SET LOCAL. The
+# value is bound rather than inlined so that asyncpg prepares one statement
+# instead of one per value, which would also evict the real queries from
+# its prepared statement cache.
+_SET_STATEMENT_TIMEOUT = "SELECT set_config('statement_timeout', $1, true)"
+
+# SQLSTATE of statements cancelled by statement_timeout or a cancel request
+_QUERY_CANCELED = "57014"
+
+
+def begin_deadline(timeout: float) -> Deadline:
+    """
+    Bound the database statements of the current request.
+
+    Args:
+        timeout: Seconds from now the statements may take in total
+    """
+    deadline = Deadline(timeout)
+    _deadline.set(deadline)
+    return deadline
+
+
+def current_budget() -> float:
+    """
+    Return the current request's budget in seconds, or QUERY_TIMEOUT's.
+
+    This is the route's whole budget (see query_timeout()), not what is left
+    of it, e.g. for work the request hands off to a background task.
+    """
+    deadline = _deadline.get()
+    return deadline.timeout if deadline is not None else settings.QUERY_TIMEOUT / 1000
+
+
+def query_timeout(milliseconds: int) -> Callable[[], Awaitable[None]]:
+    """
+    Dependency replacing QUERY_TIMEOUT for the routes using it.
+
+    The budget still counts from the request's arrival.
+
+    Usage:
+        router.include_router(
+            analytics.router, dependencies=[Depends(query_timeout(120000))]
+        )
+    """
+
+    async def apply_query_timeout() -> None:
+        deadline = _deadline.get()
+        if deadline is not None:
+            deadline.timeout = milliseconds / 1000
+
+    return apply_query_timeout
+
+
+def is_query_timeout(error: DBAPIError) -> bool:
+    """Whether a statement failed because it ran out of time or was cancelled."""
+    return getattr(error.orig, "sqlstate", None) == _QUERY_CANCELED
+
+
+def _apply_deadline(
+    conn: Connection,
+    cursor: Any,
+    statement: str,
+    parameters: Any,
+    context: Any,
+    executemany: bool,
+) -> None:
+    """Cap the statement about to run at the request's remaining budget."""
+    deadline = _deadline.get()
+    if deadline is None:
+        return
+
+    # At least 1 ms: 0 would disable the timeout
+    remaining = max(int(deadline.remaining() * 1000), 1)
+    applied = conn.info.get("statement_timeout")
+    if applied is not None and applied - remaining <= _STATEMENT_TIMEOUT_SLACK_MS:
+        return
+    # The cursor bypasses these events
+    cursor.execute(_SET_STATEMENT_TIMEOUT, (str(remaining),))
+    conn.info["statement_timeout"] = remaining
+
+
+def _forget_statement_timeout(conn: Connection) -> None:
+    conn.info.pop("statement_timeout", None)
+
+
+def _reset_statement_timeout(dbapi_connection: Any, record: Any, *args: Any) -> None:
+    record.info.pop("statement_timeout", None)
+
+
+def enforce_deadlines(sync_engine: Engine) -> None:
+    """Apply request deadlines to the statements of engine (a sync engine)."""
+    event.listen(sync_engine, "before_cursor_execute", _apply_deadline)
+    event.listen(sync_engine, "commit", _forget_statement_timeout)
+    event.listen(sync_engine, "rollback", _forget_statement_timeout)
+    event.listen(sync_engine, "reset", _reset_statement_timeout)
+
+
+enforce_deadlines(engine.sync_engine)
 
 # Create async session factory
 AsyncSessionLocal = async_sessionmaker(
@@ -41,6 +190,168 @@
 Base = declarative_base()
 
 
+# The primary's pool with transactions started as READ ONLY; the option is
+# reset when connections go back to the pool
+read_engine = engine.execution_options(
+    postgresql_readonly=True,
+    **(
+        {"isolation_level": "SERIALIZABLE", "postgresql_deferrable": True}
+        if settings.DB_READ_DEFERRABLE
+        else {}
+    ),
+)
+
+
+def _create_replica(url: str) -> Replica:
+    replica_url = make_url(url).set(drivername="postgresql+asyncpg")
+    name = f"{replica_url.host}:{replica_url.port or 5432}"
+    replica_engine = create_async_engine(
+        replica_url,
+        echo=settings.DB_ECHO,
+        pool_pre_ping=True,
+        pool_recycle=3600,
+        execution_options={"postgresql_readonly": True},
+        **_pool_options(name),
+    )
+    instrument_engine(replica_engine.sync_engine, name)
+    enforce_deadlines(replica_engine.sync_engine)
+    return Replica(name=name, engine=replica_engine)
+
+
+# Routes get_read_db() sessions; None reads from the primary only
+replica_router: Optional[ReplicaRouter] = (
+    ReplicaRouter(
+        read_engine,
+        [_create_replica(url) for url in settings.DATABASE_REPLICA_URLS],
+        max_lag=settings.DB_REPLICA_MAX_LAG,
+        interval=settings.DB_REPLICA_CHECK_INTERVAL,
+    )
+    if settings.DATABASE_REPLICA_URLS
+    else None
+)
+
+
+@dataclass
+class ReadConsistency:
+    """Commit positions the reads of one request must see."""
+
+    # From the client's read-your-writes token
+    min_lsn: int = 0
+    # Of the request's own writes; sent back as the new token
+    commit_lsn: int = 0
+
+
+_read_consistency: ContextVar[Optional[ReadConsistency]] = ContextVar(
+    "read_consistency", default=None
+)
+
+
+def begin_read_consistency(token: Optional[str]) -> ReadConsistency:
+    """
+    Start tracking read-your-writes for the current request.
+
+    Args:
+        token: LSN returned for the client's last write, if any; malformed
+            tokens are ignored
+    """
+    consistency = ReadConsistency()
+    if token:
+        try:
+            consistency.min_lsn = parse_lsn(token)
+        except ValueError:
+            logger.debug(f"Ignoring malformed read-your-writes token: {token!r}")
+    _read_consistency.set(consistency)
+    return consistency
+
+
+def _required_lsn() -> int:
+    """Return the commit position the current read must see."""
+    consistency = _read_consistency.get()
+    required = max(consistency.min_lsn, consistency.commit_lsn) if consistency else 0
+    fill = filling_cache.get()
+    if fill is not None:
+        required = max(required, fill)
+    return required
+
+
+class ReadSession(Session):
+    """
+    Session of get_read_db().
+
+    Its transactions are READ ONLY. The engine is picked when the first
+    statement runs, so reads made while computing a cached value (see
+    cache_fill()) can be held to the latest invalidated change, and is kept
+    for the rest of the session.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if replica_router is None:
+            return read_engine.sync_engine
+        bind = self.info.get("read_bind")
+        if bind is None:
+            bind = self.info["read_bind"] = replica_router.choose(_required_lsn()).sync_engine
+        return bind
+
+
+ReadSessionLocal = async_sessionmaker(
+    read_engine,
+    class_=AsyncSession,
+    sync_session_class=ReadSession,
+    expire_on_commit=False,
+    autoflush=False,
+)
+
+
+@event.listens_for(Session, "after_flush")
+def _mark_written(session: Session, flush_context: Any) -> None:
+    session.info["written"] = True
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _mark_bulk_written(state: Any) -> None:
+    if state.is_insert or state.is_update or state.is_delete:
+        state.session.info["written"] = True
+
+
+async def _note_commit(session: AsyncSession) -> None:
+    """Record the WAL position after a session's writes for read-your-writes."""
+    try:
+        result = await session.execute(text("SELECT pg_current_wal_lsn()::text"))
+        lsn = parse_lsn(result.scalar_one())
+    except Exception as e:
+        logger.warning(f"Could not read the WAL position after a write: {e}")
+        return
+    consistency = _read_consistency.get()
+    if consistency is not None:
+        consistency.commit_lsn = max(consistency.commit_lsn, lsn)
+
+
+# Above any WAL position, so that only the primary qualifies
+_UNKNOWN_LSN = 1 << 64
+
+
+async def fill_position() -> int:
+    """
+    Return the commit position a cache fill starting now must see.
+
+    That is a primary WAL position sampled after every invalidation this
+    worker made or was told of (see CacheManager.last_invalidation): the
+    change it invalidated was committed before it. Samples are shared with
+    replica_router.refresh(), so the primary is only queried for the first
+    fill after an invalidation or once the sample ages. Invalidations by
+    other workers are only seen with broadcasts enabled, otherwise the
+    sample may trail them by up to two DB_REPLICA_CHECK_INTERVALs. Without
+    any position, the fill reads from the primary.
+    """
+    if replica_router is None:
+        return 0
+    try:
+        return await replica_router.primary_lsn(since=cache_manager.last_invalidation)
+    except Exception as e:
+        logger.warning(f"Could not read the primary WAL position: {e}")
+        return _UNKNOWN_LSN
+
+
 async def init_db_connections() -> None:
     """Initialize database connections."""
     try:
@@ -52,10 +363,17 @@ async def init_db_connections() -> None:
         logger.error(f"Failed to initialize database connections: {e}")
         raise
 
+    if replica_router is not None:
+        # Replicas get reads once the first sample shows them caught up
+        replica_router.start()
+        logger.info(f"Routing reads to {len(replica_router.replicas)} read replicas")
+
 
 async def close_db_connections() -> None:
     """Close database connections."""
     try:
+        if replica_router is not None:
+            await replica_router.stop()
         await engine.dispose()
         logger.info("Database connections closed successfully")
     except Exception as e:
@@ -76,6 +394,8 @@ async def get_items(db: AsyncSession = Depends(get_db)):
         try:
             yield session
             await session.commit()
+            if replica_router is not None and session.info.get("written"):
+                await _note_commit(session)
         except Exception:
             await session.rollback()
             raise
@@ -83,6 +403,21 @@ async def get_items(db: AsyncSession = Depends(get_db)):
             await session.close()
 
 
+async def get_read_db() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Dependency that provides a read-only session for GET endpoints.
+
+    A pooled connection is only checked out by the first statement, so
+    requests answered from the cache never touch the database, and it is
+    released without a commit. With DATABASE_REPLICA_URLS set, the session
+    reads from a replica within DB_REPLICA_MAX_LAG of the primary that has
+    replayed the client's last write (see ReadYourWritesMiddleware), and
+    from the primary otherwise.
+    """
+    async with ReadSessionLocal() as session:
+        yield session
+
+
 async def execute_raw_query(query: str, params: dict = None) -> list:
     """
     Execute raw SQL query.
@@ -118,15 +453,13 @@ async def check() -> dict:
         """
         try:
             async with AsyncSessionLocal() as session:
-                result = await session.execute("SELECT 1")
+                result = await session.execute(text("SELECT 1"))
                 row = result.fetchone()
 
                 if row and row[0] == 1:
                     return {
                         "status": "healthy",
                         "database": "connected",
-                        "pool_size": engine.pool.size(),
-                        "checked_out": engine.pool.checked_out_connections,
                     }
                 else:
                     return {
@@ -140,3 +473,432 @@ async def check() -> dict:
                 "database": "connection_failed",
                 "error": str(e),
             }
+
+    @staticmethod
+    def pools() -> dict:
+        """
+        Usage of this worker's connection pools.
+
+        Returns:
+            dict: Statistics by pool ("primary" or the replica's host:port)
+        """
+        pools = {"primary": pool_stats(engine.sync_engine, "primary")}
+        if replica_router is not None:
+            for replica in replica_router.replicas:
+                pools[replica.name] = pool_stats(replica.engine.sync_engine, replica.name)
+        return pools
+
+
+# =====================================================
+# Query result cache
+# =====================================================
+
+# Valid results: unexpired and computed at the namespace's current generation
+_LOAD_CACHED_QUERY = text(
+    """
+    SELECT result_data, EXTRACT(EPOCH FROM expires_at - CURRENT_TIMESTAMP) AS ttl
+    FROM query_cache
+    WHERE query_hash = :query_hash
+      AND result_data IS NOT NULL
+      AND expires_at > CURRENT_TIMESTAMP
+      AND namespace IS NOT DISTINCT FROM :namespace
+      AND generation = :generation
+    """
+)
+
+# cache_hits and created_at carry over when a query is recomputed. A row
+# another worker already stored at the same generation is left as is.
+_SAVE_CACHED_QUERY = text(
+    """
+    INSERT INTO query_cache (
+        query_hash, query_text, result_hash, result_data, execution_time,
+        rows_returned, namespace, generation, expires_at, last_accessed, metadata
+    )
+    VALUES (
+        :query_hash, :query_text, :result_hash, :result_data, :execution_time,
+        :rows_returned, :namespace, :generation,
+        CURRENT_TIMESTAMP + make_interval(secs => :ttl), CURRENT_TIMESTAMP,
+        CAST(:metadata AS JSONB)
+    )
+    ON CONFLICT (query_hash) DO UPDATE SET
+        result_hash = EXCLUDED.result_hash,
+        result_data = EXCLUDED.result_data,
+        execution_time = EXCLUDED.execution_time,
+        rows_returned = EXCLUDED.rows_returned,
+        namespace = EXCLUDED.namespace,
+        generation = EXCLUDED.generation,
+        expires_at = EXCLUDED.expires_at,
+        last_accessed = EXCLUDED.last_accessed,
+        metadata = EXCLUDED.metadata
+    WHERE query_cache.result_data IS NULL
+       OR query_cache.expires_at <= CURRENT_TIMESTAMP
+       OR query_cache.namespace IS DISTINCT FROM EXCLUDED.namespace
+       OR query_cache.generation IS DISTINCT FROM EXCLUDED.generation
+    """
+)
+
+_FLUSH_QUERY_HITS = text(
+    """
+    UPDATE query_cache
+    SET cache_hits = cache_hits + hits.count, last_accessed = CURRENT_TIMESTAMP
+    FROM unnest(CAST(:hashes AS VARCHAR[]), CAST(:counts AS INTEGER[])) AS hits(query_hash, count)
+    WHERE query_cache.query_hash = hits.query_hash
+    """
+)
+
+_EXPIRE_CACHED_QUERIES = text(
+    """
+    UPDATE query_cache SET expires_at = CURRENT_TIMESTAMP
+    WHERE namespace = ANY(CAST(:namespaces AS VARCHAR[]))
+      AND expires_at > CURRENT_TIMESTAMP
+    """
+)
+
+# Cache hits by query hash not yet added to query_cache.cache_hits
+_query_hits: Counter = Counter()
+
+# Computed results by query hash not yet written to query_cache, as
+# (_SAVE_CACHED_QUERY parameters, expiry timestamp)
+_pending_results: Dict[str, Tuple[Dict[str, Any], float]] = {}
+
+_query_stats_task: Optional[asyncio.Task] = None
+
+
+def query_fingerprint(statement: Executable) -> Tuple[str, str, Dict[str, Any]]:
+    """Return (SHA-256 hash, SQL, parameters) of a statement compiled for PostgreSQL."""
+    compiled = statement.compile(dialect=engine.dialect)
+    sql = str(compiled)
+    params = jsonable_encoder(compiled.params)
+    digest = hashlib.sha256(
+        sql.encode("utf-8") + b"\n" + orjson.dumps(params, option=orjson.OPT_SORT_KEYS)
+    ).hexdigest()
+    return digest, sql, params
+
+
+def _persists(namespace: Optional[str], generation: int) -> bool:
+    """
+    Whether results at a namespace generation can be kept in query_cache.
+
+    Generation 0 means the counter is missing: never bumped, or lost by
+    Redis, so rows persisted under it may predate later writes. While Redis
+    is bypassed, writes cannot bump the generation either. Results of such
+    calls only go to Redis, if anywhere.
+    """
+    return namespace is None or (generation > 0 and cache_manager.available)
+
+
+# Codec of cached query results; unlike JSON it round-trips Decimal, date,
+# datetime and UUID values, so hits return what the query returned
+_QUERY_CODEC = "msgpack"
+
+
+def _as_result(entry: Dict[str, Any]) -> Result:
+    """Rebuild a Result from cached columns and rows."""
+    rows = (tuple(row) for row in entry["rows"])
+    return IteratorResult(SimpleResultMetaData(entry["columns"]), rows)
+
+
+async def cached_query(
+    session: AsyncSession,
+    statement: Executable,
+    ttl: Optional[int] = None,
+    namespace: Optional[str] = "analytics",
+) -> Result:
+    """
+    Execute a SELECT through the query result cache.
+
+    Results are looked up by a hash of the compiled SQL and parameters,
+    first in Redis and then in the query_cache table, so expensive queries
+    survive Redis flushes and restarts. Results are dropped when the
+    namespace is bumped (see CacheManager.invalidate()), and only kept in
+    Redis while its generation is unknown (see _persists()). Execution time
+    and row count are recorded per query.
+
+    The table is read through a read-only session, from a replica when
+    reads are routed (see get_read_db()). Results computed after missing
+    both tiers, like hits for cache_hits, are written to it by
+    flush_query_stats() in the background, so requests never write to the
+    primary.
+
+    Rows are stored as tuples of their column values with the msgpack
+    codec, so hits return the same types as the query itself. Use this for
+    aggregates rather than ORM entities.
+
+    Args:
+        session: Session to run the statement on when it is not cached
+        statement: SELECT statement
+        ttl: Seconds to keep the result, defaults to QUERY_CACHE_TTL
+        namespace: Cache namespace whose bumps invalidate the result
+
+    Returns:
+        A buffered Result supporting all(), one(), scalar(), mappings() etc.
+    """
+    if not settings.QUERY_CACHE_ENABLED:
+        return await session.execute(statement)
+
+    ttl = ttl or settings.QUERY_CACHE_TTL
+    digest, sql, params = query_fingerprint(statement)
+    generation = await cache_manager.namespace_generation(namespace) if namespace else 0
+    cache_key = f"query:{digest}@{namespace}.{generation}" if namespace else f"query:{digest}"
+
+    persists = _persists(namespace, generation)
+
+    data = await cache_manager.get_raw(cache_key)
+    if data is None and persists:
+        persisted = await _load_cached_query(digest, namespace, generation)
+        if persisted is not None:
+            data, remaining = persisted
+            CACHE_HITS.labels("query", "postgres").inc()
+            await cache_manager.set_raw(cache_key, data, ttl=max(1, min(ttl, remaining)))
+    if data is not None:
+        _query_hits[digest] += 1
+        return _as_result(codecs.decode(data))
+
+    start = time.perf_counter()
+    async with cache_fill():
+        result = await session.execute(statement)
+    entry = {"columns": list(result.keys()), "rows": [tuple(row) for row in result]}
+    execution_time = int((time.perf_counter() - start) * 1000)
+
+    try:
+        data = codecs.encode(entry, codec=_QUERY_CODEC)
+    except codecs.CodecError as e:
+        logger.warning(f"Query result {digest} is not cacheable: {e}")
+        return _as_result(entry)
+    await cache_manager.set_raw(cache_key, data, ttl=ttl)
+    if persists:
+        _queue_cached_query(
+            digest,
+            sql,
+            params,
+            data,
+            len(entry["rows"]),
+            execution_time,
+            namespace,
+            generation,
+            ttl,
+        )
+    return _as_result(entry)
+
+
+async def _load_cached_query(
+    digest: str, namespace: Optional[str], generation: int
+) -> Optional[Tuple[bytes, int]]:
+    """Return (encoded entry, seconds left) for a persisted result, or None."""
+    try:
+        async with ReadSessionLocal() as session:
+            row = (
+                await session.execute(
+                    _LOAD_CACHED_QUERY,
+                    {"query_hash": digest, "namespace": namespace, "generation": generation},
+                )
+            ).first()
+            if row is None:
+                return None
+            return row.result_data, int(row.ttl)
+    except Exception as e:
+        logger.error(f"Query cache lookup failed for {digest}: {e}")
+        return None
+
+
+def _queue_cached_query(
+    digest: str,
+    sql: str,
+    params: Dict[str, Any],
+    data: bytes,
+    rows_returned: int,
+    execution_time: int,
+    namespace: Optional[str],
+    generation: int,
+    ttl: int,
+) -> None:
+    """Queue an encoded result with its timing for the next flush_query_stats()."""
+    row = {
+        "query_hash": digest,
+        "query_text": sql,
+        "result_hash": hashlib.sha256(data).hexdigest(),
+        "result_data": data,
+        "execution_time": execution_time,
+        "rows_returned": rows_returned,
+        "namespace": namespace,
+        "generation": generation,
+        "metadata": orjson.dumps({"params": params}).decode("utf-8"),
+    }
+    _pending_results[digest] = (row, time.time() + ttl)
+
+
+async def expire_cached_queries(namespaces: Iterable[str]) -> None:
+    """Expire the persisted results of namespaces whose data changed."""
+    namespaces = list(namespaces)
+    if not settings.QUERY_CACHE_ENABLED or not namespaces:
+        return
+
+    try:
+        async with AsyncSessionLocal() as session:
+            await session.execute(_EXPIRE_CACHED_QUERIES, {"namespaces": namespaces})
+            await session.commit()
+    except Exception as e:
+        logger.error(f"Failed to expire cached queries for {namespaces}: {e}")
+
+
+async def flush_query_stats() -> None:
+    """
+    Write queued results and the hits counted since the last flush, and
+    drop unused entries.
+    """
+    results = dict(_pending_results)
+    _pending_results.clear()
+    hits = dict(_query_hits)
+    _query_hits.clear()
+    try:
+        async with AsyncSessionLocal() as session:
+            now = time.time()
+            rows = [
+                {**row, "ttl": expires - now} for row, expires in results.values() if expires > now
+            ]
+            if rows:
+                await session.execute(_SAVE_CACHED_QUERY, rows)
+            if hits:
+                await session.execute(
+                    _FLUSH_QUERY_HITS,
+                    {"hashes": list(hits), "counts": list(hits.values())},
+                )
+            await session.execute(text("SELECT cleanup_expired_cache()"))
+            await session.commit()
+    except Exception as e:
+        logger.error(f"Failed to flush query cache statistics: {e}")
+        # Write them with the next flush, unless computed again meanwhile
+        for digest, result in results.items():
+            _pending_results.setdefault(digest, result)
+        _query_hits.update(hits)
+
+
+async def _flush_query_stats_periodically() -> None:
+    while True:
+        await asyncio.sleep(settings.QUERY_CACHE_FLUSH_INTERVAL)
+        await flush_query_stats()
+
+
+async def start_query_cache() -> None:
+    """Start flushing query cache results and statistics in the background."""
+    global _query_stats_task
+    if settings.QUERY_CACHE_ENABLED:
+        _query_stats_task = asyncio.create_task(_flush_query_stats_periodically())
+
+
+async def stop_query_cache() -> None:
+    """Stop the background flush and write out pending results and statistics."""
+    global _query_stats_task
+    if _query_stats_task is None:
+        return
+
+    _query_stats_task.cancel()
+    try:
+        await _query_stats_task
+    except asyncio.CancelledError:
+        pass
+    _query_stats_task = None
+    await flush_query_stats()
+
+
+# =====================================================
+# Query cost gate
+# =====================================================
+
+
+class QueryTooExpensive(Exception):
+    """A query's estimated cost exceeds MAX_QUERY_COMPLEXITY."""
+
+    def __init__(self, cost: float, limit: int):
+        super().__init__(f"Estimated query cost {cost:.0f} exceeds {limit}")
+        self.cost = cost
+        self.limit = limit
+
+
+class _Explain(Executable, ClauseElement):
+    """EXPLAIN (FORMAT JSON) of a statement, with its bound parameters."""
+
+    inherit_cache = False
+
+    def __init__(self, statement: Executable):
+        self.statement = statement
+
+
+@compiles(_Explain)
+def _compile_explain(element: _Explain, compiler: Any, **kwargs: Any) -> str:
+    return "EXPLAIN (FORMAT JSON) " + compiler.process(element.statement, **kwargs)
+
+
+def _parameter_shape(value: Any) -> Any:
+    """Reduce a parameter to what its effect on the plan depends on."""
+    if value is None or isinstance(value, bool):
+        return value
+    if isinstance(value, int):
+        # Magnitude only: OFFSET 5000 costs about what OFFSET 6000 does
+        return value.bit_length()
+    if isinstance(value, str):
+        # A leading wildcard rules out index scans on LIKE patterns
+        return value.startswith("%")
+    return type(value).__name__
+
+
+def query_cost_key(statement: Executable) -> str:
+    """Return the cache key of a statement's cost estimate."""
+    _, sql, params = query_fingerprint(statement)
+    shape = {name: _parameter_shape(value) for name, value in params.items()}
+    digest = hashlib.sha256(
+        sql.encode("utf-8") + b"\n" + orjson.dumps(shape, option=orjson.OPT_SORT_KEYS)
+    ).hexdigest()
+    return f"query_cost:{digest}"
+
+
+async def _estimate_cost(session: AsyncSession, statement: Executable) -> Optional[float]:
+    """Return the planner's total cost for statement, or None if EXPLAIN failed."""
+    try:
+        # A failed statement aborts the whole transaction in Postgres; the
+        # savepoint keeps the request's own queries on this session working
+        async with session.begin_nested():
+            plan = (await session.execute(_Explain(statement))).scalar_one()
+        if isinstance(plan, str):
+            plan = orjson.loads(plan)
+        return float(plan[0]["Plan"]["Total Cost"])
+    except Exception as e:
+        logger.error(f"Query cost estimate failed: {e}")
+        return None
+
+
+async def check_query_cost(session: AsyncSession, *statements: Executable) -> None:
+    """
+    Reject queries the planner estimates too expensive to run.
+
+    Use this before executing queries built from request filters. Each
+    statement's estimate is taken once per query shape, which is the SQL
+    with every parameter reduced to what drives its cost: the magnitude of
+    numbers such as OFFSET and whether a LIKE pattern starts with a
+    wildcard. The estimate is then cached for QUERY_COST_CACHE_TTL. If
+    EXPLAIN fails, the query is admitted.
+
+    Args:
+        session: Session to run EXPLAIN on
+        statements: Statements the request is about to execute
+
+    Raises:
+        QueryTooExpensive: If any estimate exceeds MAX_QUERY_COMPLEXITY
+    """
+    if not settings.QUERY_COST_GATE_ENABLED:
+        return
+
+    keys = {query_cost_key(statement): statement for statement in statements}
+    costs = await cache_manager.get_many(keys)
+    estimated = {}
+    for key, statement in keys.items():
+        if key not in costs:
+            cost = await _estimate_cost(session, statement)
+            if cost is not None:
+                costs[key] = estimated[key] = cost
+    if estimated:
+        await cache_manager.set_many(estimated, ttl=settings.QUERY_COST_CACHE_TTL)
+
+    cost = max(costs.values(), default=0.0)
+    if cost > settings.MAX_QUERY_COMPLEXITY:
+        raise QueryTooExpensive(cost, settings.MAX_QUERY_COMPLEXITY)
@@ -0,0 +1,173 @@
+"""
+Connection Pool Metrics
+Prometheus metrics for the database connection pools, labelled by pool
+"""
+
+import time
+from typing import Any, Dict, Type
+
+from prometheus_client import Counter, Gauge, Histogram
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import Pool
+
+DB_POOL_CHECKOUT_SECONDS = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time to get a connection from the pool, including opening and pinging it",
+    ["pool"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0, 30.0),
+)
+DB_POOL_TIMEOUTS = Counter(
+    "db_pool_timeouts_total",
+    "Checkouts that gave up after DB_POOL_TIMEOUT with the pool exhausted",
+    ["pool"],
+)
+DB_POOL_CHECKOUTS = Counter(
+    "db_pool_checkouts_total",
+    "Connections checked out of the pool",
+    ["pool"],
+)
+DB_POOL_CHECKINS = Counter(
+    "db_pool_checkins_total",
+    "Connections returned to the pool",
+    ["pool"],
+)
+DB_POOL_CONNECTS = Counter(
+    "db_pool_connects_total",
+    "Database connections opened by the pool",
+    ["pool"],
+)
+DB_POOL_INVALIDATIONS = Counter(
+    "db_pool_invalidations_total",
+    "Connections discarded as unusable, including failed pre-pings",
+    ["pool"],
+)
+DB_POOL_PING_FAILURES = Counter(
+    "db_pool_ping_failures_total",
+    "Stale connections found by pool_pre_ping",
+    ["pool"],
+)
+DB_POOL_CONNECTION_AGE = Histogram(
+    "db_pool_connection_age_seconds",
+    "Age of connections when they are closed",
+    ["pool"],
+    buckets=(1, 10, 60, 300, 900, 1800, 3600, 7200),
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out",
+    "Connections currently checked out",
+    ["pool"],
+)
+DB_POOL_OVERFLOW = Gauge(
+    "db_pool_overflow",
+    "Connections open beyond DB_POOL_SIZE",
+    ["pool"],
+)
+
+
+class _TimedCheckout:
+    """Pool mixin timing checkouts; see instrumented_pool()."""
+
+    metrics_name = "primary"
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            DB_POOL_TIMEOUTS.labels(self.metrics_name).inc()
+            raise
+        finally:
+            DB_POOL_CHECKOUT_SECONDS.labels(self.metrics_name).observe(
+                time.perf_counter() - start
+            )
+
+
+def instrumented_pool(poolclass: Type[Pool], name: str) -> Type[Pool]:
+    """
+    Return a subclass of poolclass that times checkouts.
+
+    Pass it as the engine's poolclass; it survives pool recreation on
+    dispose(). Use instrument_engine() for the other metrics.
+    """
+    return type(
+        f"Instrumented{poolclass.__name__}",
+        (_TimedCheckout, poolclass),
+        {"metrics_name": name},
+    )
+
+
+def _update_usage(pool: Pool, name: str) -> None:
+    # NullPool keeps no connections to count
+    if hasattr(pool, "checkedout"):
+        DB_POOL_CHECKED_OUT.labels(name).set(pool.checkedout())
+        DB_POOL_OVERFLOW.labels(name).set(max(pool.overflow(), 0))
+
+
+def instrument_engine(engine: Engine, name: str) -> None:
+    """Export pool events of engine (a sync engine) under the given pool label."""
+
+    @event.listens_for(engine, "connect")
+    def _connect(dbapi_connection: Any, record: Any) -> None:
+        record.info["connected_at"] = time.monotonic()
+        DB_POOL_CONNECTS.labels(name).inc()
+
+    @event.listens_for(engine, "checkout")
+    def _checkout(dbapi_connection: Any, record: Any, proxy: Any) -> None:
+        DB_POOL_CHECKOUTS.labels(name).inc()
+        _update_usage(engine.pool, name)
+
+    @event.listens_for(engine, "checkin")
+    def _checkin(dbapi_connection: Any, record: Any) -> None:
+        DB_POOL_CHECKINS.labels(name).inc()
+        _update_usage(engine.pool, name)
+
+    @event.listens_for(engine, "invalidate")
+    def _invalidate(dbapi_connection: Any, record: Any, exception: Any) -> None:
+        DB_POOL_INVALIDATIONS.labels(name).inc()
+        if isinstance(exception, exc.InvalidatePoolError):
+            DB_POOL_PING_FAILURES.labels(name).inc()
+
+    @event.listens_for(engine, "close")
+    def _close(dbapi_connection: Any, record: Any) -> None:
+        connected_at = record.info.get("connected_at")
+        if connected_at is not None:
+            DB_POOL_CONNECTION_AGE.labels(name).observe(time.monotonic() - connected_at)
+
+
+def _total(collector: Any, name: str, suffix: str = "_total") -> float:
+    for metric in collector.collect():
+        for sample in metric.samples:
+            if sample.name.endswith(suffix) and sample.labels["pool"] == name:
+                return sample.value
+    return 0
+
+
+def pool_stats(engine: Engine, name: str) -> Dict[str, Any]:
+    """
+    Summarize a pool's usage for this process.
+
+    Counts are read back from the Prometheus collectors, so they count
+    since process start and only cover this worker.
+    """
+    pool = engine.pool
+    checkouts = _total(DB_POOL_CHECKOUT_SECONDS, name, "_count")
+    wait = _total(DB_POOL_CHECKOUT_SECONDS, name, "_sum")
+    stats: Dict[str, Any] = {
+        "pool": type(pool).__name__,
+        "checkouts": int(_total(DB_POOL_CHECKOUTS, name)),
+        "checkins": int(_total(DB_POOL_CHECKINS, name)),
+        "connects": int(_total(DB_POOL_CONNECTS, name)),
+        "timeouts": int(_total(DB_POOL_TIMEOUTS, name)),
+        "invalidations": int(_total(DB_POOL_INVALIDATIONS, name)),
+        "ping_failures": int(_total(DB_POOL_PING_FAILURES, name)),
+        "avg_checkout_wait_ms": round(wait / checkouts * 1000, 3) if checkouts else None,
+    }
+    if hasattr(pool, "checkedout"):
+        stats.update(
+            size=pool.size(),
+            checked_out=pool.checkedout(),
+            idle=pool.checkedin(),
+            overflow=max(pool.overflow(), 0),
+        )
+    return stats
@@ -0,0 +1,176 @@
+"""
+Read Replicas
+Tracks replication lag and picks the engine a read may use
+"""
+
+import asyncio
+import math
+import random
+import time
+from dataclasses import dataclass
+from typing import List, Optional
+
+from prometheus_client import Gauge
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.core.logging import logger
+
+DB_REPLICA_LAG = Gauge(
+    "db_replica_lag_seconds",
+    "Replication lag of each read replica; +Inf while unreachable",
+    ["replica"],
+)
+
+_PRIMARY_LSN = text("SELECT pg_current_wal_lsn()::text")
+
+_REPLICA_STATUS = text(
+    """
+    SELECT
+        pg_last_wal_replay_lsn()::text AS replay_lsn,
+        EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) AS lag
+    """
+)
+
+
+def parse_lsn(value: str) -> int:
+    """Parse a Postgres LSN such as "16/B374D848"; raises ValueError."""
+    high, low = value.split("/")
+    return (int(high, 16) << 32) | int(low, 16)
+
+
+def format_lsn(value: int) -> str:
+    """Format an LSN parsed by parse_lsn()."""
+    return f"{value >> 32:X}/{value & 0xFFFFFFFF:X}"
+
+
+@dataclass
+class Replica:
+    """A read replica and its last observed replication state."""
+
+    name: str
+    engine: AsyncEngine
+    replay_lsn: int = 0
+    lag: float = math.inf
+
+
+class ReplicaRouter:
+    """
+    Routes reads to streaming replicas that are close enough to the primary.
+
+    refresh() (run every interval seconds by start()) samples the primary's
+    WAL position and every replica's replay position. A replica that
+    replayed up to the sampled position has no lag; otherwise its lag is
+    the age of the last transaction it replayed. Replicas lagging more than
+    max_lag seconds, or unreachable, get no reads.
+
+    A read that must see a given commit only goes to a replica that
+    replayed past its LSN, and otherwise to the primary. That covers a
+    client's read-your-writes token and cache fills, which must see the
+    primary's WAL position from when they started (see fill_position()),
+    so a value computed after an invalidation cannot come from a replica
+    that is still behind it. primary_lsn() serves those from the last
+    sample while it is fresh, so reads do not each query the primary.
+    """
+
+    def __init__(
+        self, primary: AsyncEngine, replicas: List[Replica], max_lag: float, interval: float
+    ):
+        self.primary = primary
+        self.replicas = replicas
+        self.max_lag = max_lag
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+        # Last sampled WAL position of the primary, and the time.monotonic()
+        # at which the query for it started
+        self._primary_lsn: Optional[int] = None
+        self._sampled_at = -math.inf
+
+    def choose(self, min_lsn: int = 0) -> AsyncEngine:
+        """Return the engine for a read that must see commits up to min_lsn."""
+        eligible = [
+            replica
+            for replica in self.replicas
+            if replica.lag <= self.max_lag and replica.replay_lsn >= min_lsn
+        ]
+        return random.choice(eligible).engine if eligible else self.primary
+
+    async def primary_lsn(self, since: float = -math.inf) -> int:
+        """
+        Return a WAL position the primary reached no earlier than since.
+
+        The last sample is reused while it was taken after since (a
+        time.monotonic() value) and at most two intervals ago, so a late
+        refresh() does not send every caller to the primary. Otherwise the
+        primary is queried and the result kept as the new sample; if that
+        fails, an older sample still taken after since is returned.
+        """
+        sampled = self._primary_lsn is not None and self._sampled_at >= since
+        if sampled and self._sampled_at >= time.monotonic() - 2 * self.interval:
+            return self._primary_lsn
+        try:
+            return await self._sample_primary()
+        except Exception as e:
+            if not sampled:
+                raise
+            logger.warning(f"Could not read the primary WAL position, using the last sample: {e}")
+            return self._primary_lsn
+
+    async def _sample_primary(self) -> int:
+        started = time.monotonic()
+        async with self.primary.connect() as connection:
+            lsn = parse_lsn((await connection.execute(_PRIMARY_LSN)).scalar_one())
+        # A slower concurrent query must not replace a later sample
+        if started >= self._sampled_at:
+            self._primary_lsn, self._sampled_at = lsn, started
+        return lsn
+
+    async def refresh(self) -> None:
+        """Sample the replication state of every replica."""
+        try:
+            primary_lsn = await self._sample_primary()
+        except Exception as e:
+            logger.warning(f"Could not read the primary WAL position: {e}")
+            primary_lsn = None
+        await asyncio.gather(*(self._poll(replica, primary_lsn) for replica in self.replicas))
+
+    async def _poll(self, replica: Replica, primary_lsn: Optional[int]) -> None:
+        try:
+            async with replica.engine.connect() as connection:
+                row = (await connection.execute(_REPLICA_STATUS)).one()
+            if row.replay_lsn is None:
+                raise ValueError("not a streaming replica")
+            replica.replay_lsn = parse_lsn(row.replay_lsn)
+            if primary_lsn is None:
+                # The lag cannot be told apart from an idle primary
+                replica.lag = math.inf
+            elif replica.replay_lsn >= primary_lsn:
+                replica.lag = 0.0
+            else:
+                replica.lag = float(row.lag or 0.0)
+        except Exception as e:
+            if math.isfinite(replica.lag):
+                logger.warning(f"Read replica {replica.name} unavailable: {e}")
+            replica.lag = math.inf
+        DB_REPLICA_LAG.labels(replica.name).set(replica.lag)
+
+    def start(self) -> None:
+        """Start sampling in the background."""
+        self._task = asyncio.create_task(self._refresh_periodically())
+
+    async def stop(self) -> None:
+        """Stop sampling and close the replica pools."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for replica in self.replicas:
+            await replica.engine.dispose()
+
+    async def _refresh_periodically(self) -> None:
+        while True:
+            await self.refresh()
+            await asyncio.sleep(self.interval)
@@ -16,14 +16,27 @@
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
 from slowapi.util import get_remote_address
+from sqlalchemy.exc import DBAPIError
 
 from app.api.v1 import api_router
 from app.core.config import settings
-from app.core.database import close_db_connections, init_db_connections
+from app.core.database import (
+    QueryTooExpensive,
+    close_db_connections,
+    init_db_connections,
+    is_query_timeout,
+    start_query_cache,
+    stop_query_cache,
+)
 from app.core.logging import setup_logging, logger
+from app.middleware.deadline import DeadlineMiddleware
 from app.middleware.error_handler import error_handler_middleware
+from app.middleware.read_your_writes import ReadYourWritesMiddleware
 from app.middleware.request_id import RequestIDMiddleware
 from app.middleware.timing import TimingMiddleware
+from app.services.cache_warmup import start_cache_warmup, stop_cache_warmup
+from app.services.change_feed import start_change_feed, stop_change_feed
+from app.services.membership import register_membership_filters
 from app.utils.cache import init_cache, close_cache
 
 
@@ -44,13 +57,24 @@ async def lifespan(app: FastAPI) -> AsyncGenerator:
     logger.info("Database connections initialized")
 
     # Initialize cache
+    register_membership_filters()
     await init_cache()
     logger.info("Cache initialized")
 
+    # Invalidate cache entries on row changes from any writer
+    await start_change_feed()
+    await start_query_cache()
+
+    # Precompute hot entries; readiness waits for this
+    await start_cache_warmup()
+
     yield
 
     # Cleanup
     logger.info("Shutting down application...")
+    await stop_cache_warmup()
+    await stop_change_feed()
+    await stop_query_cache()
     await close_db_connections()
     await close_cache()
     logger.info("Application shutdown complete")
@@ -83,7 +107,7 @@ async def lifespan(app: FastAPI) -> AsyncGenerator:
     allow_credentials=settings.CORS_ALLOW_CREDENTIALS,
     allow_methods=settings.CORS_ALLOW_METHODS,
     allow_headers=settings.CORS_ALLOW_HEADERS,
-    expose_headers=["X-Request-ID", "X-Response-Time"],
+    expose_headers=["X-Request-ID", "X-Response-Time", "X-DB-LSN"],
 )
 
 # Gzip compression
@@ -98,7 +122,9 @@ async def lifespan(app: FastAPI) -> AsyncGenerator:
 
 # Custom middleware
 app.add_middleware(RequestIDMiddleware)
+app.add_middleware(ReadYourWritesMiddleware)
 app.add_middleware(TimingMiddleware)
+app.add_middleware(DeadlineMiddleware)
 app.middleware("http")(error_handler_middleware)
 
 # ============================================
@@ -118,6 +144,37 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
     )
 
 
+@app.exception_handler(DBAPIError)
+async def database_exception_handler(request: Request, exc: DBAPIError):
+    """Handle statements cancelled by the request's query deadline."""
+    if not is_query_timeout(exc):
+        return await global_exception_handler(request, exc)
+
+    logger.warning(f"Query cancelled after exceeding its time budget: {request.url.path}")
+    return JSONResponse(
+        status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+        content={
+            "error": "Gateway Timeout",
+            "message": "The request took too long to query the database.",
+            "request_id": getattr(request.state, "request_id", None),
+        },
+    )
+
+
+@app.exception_handler(QueryTooExpensive)
+async def query_cost_exception_handler(request: Request, exc: QueryTooExpensive):
+    """Handle queries rejected by the cost gate."""
+    logger.warning(f"Rejected query with estimated cost {exc.cost:.0f}: {request.url}")
+    return JSONResponse(
+        status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+        content={
+            "error": "Query Too Expensive",
+            "message": "Narrow the filters or request an earlier page.",
+            "request_id": getattr(request.state, "request_id", None),
+        },
+    )
+
+
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
     """Global exception handler."""
@@ -0,0 +1,87 @@
+"""
+Deadline Middleware
+Bounds the database time of each request and cancels abandoned reads
+"""
+
+import asyncio
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.database import begin_deadline
+from app.core.logging import logger
+
+# Requests whose handler is cancelled when the client goes away. Writes run
+# to completion so that their outcome does not depend on the connection.
+_CANCELLABLE_METHODS = {"GET", "HEAD"}
+
+
+class DeadlineMiddleware:
+    """
+    Middleware starting each request's query deadline.
+
+    Database statements run with the time left until QUERY_TIMEOUT after
+    the request arrived as their statement_timeout (see query_timeout() for
+    per-route budgets).
+
+    When the client of a GET disconnects before a response started, the
+    handler is cancelled, which makes asyncpg cancel its running query on
+    the server. This is a plain ASGI middleware, unlike the others, as it
+    watches the receive channel while the handler runs.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        begin_deadline(settings.QUERY_TIMEOUT / 1000)
+        if scope["method"] not in _CANCELLABLE_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        # Unbounded, as GET and HEAD requests carry no body to buffer
+        messages: asyncio.Queue = asyncio.Queue()
+        response_started = False
+
+        async def receive_message() -> Message:
+            message = await messages.get()
+            if message["type"] == "http.disconnect":
+                # Keep answering later calls like the server would
+                messages.put_nowait(message)
+            return message
+
+        async def send_message(message: Message) -> None:
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        handler = asyncio.create_task(self.app(scope, receive_message, send_message))
+
+        async def watch_disconnect() -> None:
+            while True:
+                message = await receive()
+                messages.put_nowait(message)
+                if message["type"] == "http.disconnect":
+                    if not response_started:
+                        handler.cancel()
+                    return
+
+        watcher = asyncio.create_task(watch_disconnect())
+        try:
+            await asyncio.wait({handler})
+        finally:
+            watcher.cancel()
+            handler.cancel()
+
+        if handler.cancelled():
+            logger.info(
+                "Client disconnected; cancelled request",
+                extra={"method": scope["method"], "path": scope["path"]},
+            )
+            return
+        handler.result()
@@ -0,0 +1,46 @@
+"""
+Read-Your-Writes Middleware
+Carries the commit position of a client's last write between requests
+"""
+
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+from starlette.responses import Response
+
+from app.core.config import settings
+from app.core.database import begin_read_consistency
+from app.core.replicas import format_lsn
+
+LSN_HEADER = "X-DB-LSN"
+
+
+class ReadYourWritesMiddleware(BaseHTTPMiddleware):
+    """
+    Middleware keeping clients off replicas that miss their writes.
+
+    A request that wrote gets the primary's WAL position after its commit
+    in the X-DB-LSN header and a cookie. Sent back (cookie, or header for
+    clients without cookies), it makes get_read_db() read from the primary
+    until a replica has replayed that position.
+    """
+
+    async def dispatch(self, request: Request, call_next) -> Response:
+        """Track the token of the request and hand out a new one after writes."""
+        token = request.headers.get(LSN_HEADER) or request.cookies.get(
+            settings.DB_READ_YOUR_WRITES_COOKIE
+        )
+        consistency = begin_read_consistency(token)
+
+        response = await call_next(request)
+
+        if consistency.commit_lsn:
+            lsn = format_lsn(consistency.commit_lsn)
+            response.headers[LSN_HEADER] = lsn
+            response.set_cookie(
+                settings.DB_READ_YOUR_WRITES_COOKIE,
+                lsn,
+                max_age=settings.DB_READ_YOUR_WRITES_TTL,
+                httponly=True,
+                samesite="lax",
+            )
+        return response
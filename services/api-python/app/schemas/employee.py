@@ -131,6 +131,9 @@ class EmployeeResponse(BaseModel):
     current_salary: Optional[float] = None
     current_department: Optional[str] = None
     current_title: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+    version: int
 
     class Config:
         from_attributes = True
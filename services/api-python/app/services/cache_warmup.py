@@ -0,0 +1,142 @@
+"""
+Cache Warm-up
+Precomputes hot cache entries after startup, one worker at a time
+"""
+
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.v1.endpoints import analytics, departments
+from app.core.config import settings
+from app.core.database import ReadSessionLocal
+from app.core.logging import logger
+from app.utils.cache import cache_manager
+
+WARMUP_LOCK = "cache_warmup"
+
+# Seconds between attempts to take the warm-up lock
+_LOCK_RETRY_INTERVAL = 0.5
+
+# Calls warming each target, by name (see CACHE_WARMUP_TARGETS). They pass
+# every query parameter explicitly, with the endpoint defaults, so the
+# cache keys match those of requests without a query string.
+WARMUP_TARGETS: Dict[str, Callable[[AsyncSession], Awaitable]] = {
+    "analytics_summary": lambda db: analytics.get_analytics_summary(request=None, db=db),
+    "analytics_dept_perf": lambda db: analytics.get_department_performance(
+        request=None, db=db
+    ),
+    "analytics_title_dist": lambda db: analytics.get_title_distribution(
+        request=None, dept_no=None, db=db
+    ),
+    "analytics_salary_stats": lambda db: analytics.get_salary_statistics(
+        request=None, dept_no=None, current_only=True, db=db
+    ),
+    "departments": lambda db: departments.list_departments(
+        request=None, page=1, page_size=20, search=None, is_active=None, db=db
+    ),
+}
+
+
+class CacheWarmup:
+    """
+    Warms the configured targets in the background.
+
+    Workers take turns under a Redis lock: the first computes and caches
+    every target, the others then run the same calls, which are cache hits
+    that also fill their L1. Readiness reports not-ready until this worker
+    is done, or until CACHE_WARMUP_TIMEOUT has passed so a failing warm-up
+    cannot keep it out of rotation.
+    """
+
+    def __init__(self, targets: Dict[str, Callable[[AsyncSession], Awaitable]]):
+        self.targets = targets
+        self.done = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        """Start warming in the background."""
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop warming."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        try:
+            await asyncio.wait_for(self._warm_in_turn(), settings.CACHE_WARMUP_TIMEOUT)
+        except asyncio.TimeoutError:
+            logger.warning("Cache warm-up timed out; reporting ready anyway")
+        except Exception as e:
+            logger.error(f"Cache warm-up failed: {e}")
+        finally:
+            self.done.set()
+
+    async def _warm_in_turn(self) -> None:
+        while cache_manager.available:
+            token = await cache_manager.acquire_lock(WARMUP_LOCK, settings.CACHE_WARMUP_LOCK_TTL)
+            if token is not None:
+                try:
+                    await self._warm()
+                finally:
+                    await cache_manager.release_lock(WARMUP_LOCK, token)
+                return
+            await asyncio.sleep(_LOCK_RETRY_INTERVAL)
+        # Without Redis the results could not be shared; don't let every
+        # worker hit the database at once
+        logger.warning("Cache unavailable; skipping warm-up")
+
+    async def _warm(self) -> None:
+        start = time.perf_counter()
+        for name, warm in self.targets.items():
+            try:
+                async with ReadSessionLocal() as session:
+                    await warm(session)
+            except Exception as e:
+                logger.error(f"Cache warm-up of '{name}' failed: {e}")
+        logger.info(
+            f"Cache warm-up of {len(self.targets)} targets took "
+            f"{time.perf_counter() - start:.2f}s"
+        )
+
+
+_warmup: Optional[CacheWarmup] = None
+
+
+def warmup_complete() -> bool:
+    """Whether this worker finished (or skipped) its cache warm-up."""
+    return _warmup is None or _warmup.done.is_set()
+
+
+async def start_cache_warmup() -> None:
+    """Start warming the configured targets if enabled."""
+    global _warmup
+    if not settings.CACHE_WARMUP_ENABLED or not cache_manager.enabled:
+        return
+
+    unknown = set(settings.CACHE_WARMUP_TARGETS) - WARMUP_TARGETS.keys()
+    if unknown:
+        logger.warning(f"Ignoring unknown cache warm-up targets: {sorted(unknown)}")
+    targets = {
+        name: WARMUP_TARGETS[name]
+        for name in settings.CACHE_WARMUP_TARGETS
+        if name in WARMUP_TARGETS
+    }
+    _warmup = CacheWarmup(targets)
+    _warmup.start()
+
+
+async def stop_cache_warmup() -> None:
+    """Stop warming."""
+    global _warmup
+    if _warmup is not None:
+        await _warmup.stop()
+        _warmup = None
@@ -0,0 +1,342 @@
+"""
+Change Feed
+Translates Postgres row change notifications into cache invalidations
+"""
+
+import asyncio
+import json
+from typing import Any, Dict, Optional, Set
+
+import asyncpg
+from sqlalchemy.engine import make_url
+
+from app.core.config import settings
+from app.core.database import expire_cached_queries
+from app.core.logging import logger
+from app.services.membership import EMPLOYEE_FILTER
+from app.utils.cache import CacheUnavailable, cache_manager
+
+# Cache tags affected by a change to each table, formatted with the row's
+# key columns as sent by notify_cache_change() (migration V5); tags without
+# fields cover every row, e.g. the cached department lists
+TABLE_TAGS: Dict[str, tuple] = {
+    "employees": ("employee:{emp_no}",),
+    "departments": ("department:{dept_no}", "departments"),
+    "dept_emp": ("employee:{emp_no}", "department:{dept_no}"),
+    "salaries": ("salary:{id}", "employee:{emp_no}"),
+    "titles": ("employee:{emp_no}",),
+}
+
+# Cache keys of entries cached with the row version (cached(version=...)),
+# which are also their tags. Every change raises the key's version
+# watermark, so fills that read the row earlier cannot store it; entries
+# already written through at that version are kept
+VERSIONED_KEYS: Dict[str, str] = {
+    "employees": "employee:{emp_no}",
+    "departments": "department:{dept_no}",
+    "salaries": "salary:{id}",
+}
+
+# Namespaces holding aggregates over those tables
+CHANGE_NAMESPACES = ("analytics",)
+
+# Lock held by the one worker applying the feed
+FEED_LOCK = "change_feed"
+
+# Cache key of the replay checkpoint: a snapshot xmin such that the changes
+# of every transaction below it were applied
+CHECKPOINT_KEY = "change_feed:checkpoint"
+
+_SNAPSHOT_XMIN = "SELECT pg_snapshot_xmin(pg_current_snapshot())::text"
+
+_REPLAY = """
+SELECT change FROM cache_change_log
+WHERE txid >= $1::text::xid8
+ORDER BY id
+LIMIT $2
+"""
+
+_PURGE = "DELETE FROM cache_change_log WHERE created_at < now() - make_interval(secs => $1)"
+
+
+def tags_for_change(change: Dict[str, Any]) -> Set[str]:
+    """Return the cache tags to invalidate for one row change."""
+    tags = set()
+    for template in TABLE_TAGS.get(change.get("table"), ()):
+        for row in (change.get("old"), change.get("new")):
+            if row:
+                try:
+                    tags.add(template.format(**row))
+                except KeyError:
+                    continue
+    return tags
+
+
+def versions_for_change(change: Dict[str, Any]) -> Dict[str, int]:
+    """
+    Return the row version a change commits, by versioned cache key.
+
+    Inserts and updates commit the new row's version. A delete commits the
+    version after the deleted row's, which fences out fills that read the
+    row before it; a row later re-inserted under the same key starts at a
+    lower version and is not cached until that watermark expires.
+    """
+    template = VERSIONED_KEYS.get(change.get("table"))
+    if change.get("op") == "DELETE":
+        row, bump = change.get("old"), 1
+    else:
+        row, bump = change.get("new"), 0
+    if template is None or not row or row.get("version") is None:
+        return {}
+    try:
+        return {template.format(**row): row["version"] + bump}
+    except KeyError:
+        return {}
+
+
+class ChangeFeedListener:
+    """
+    Listens for row changes and invalidates the matching cache entries.
+
+    Notifications arriving within CACHE_CHANGE_FEED_BATCH_WINDOW are applied
+    together in one CacheManager.invalidate() call, which keeps entries the
+    API already wrote through at the updated version, and persisted query
+    results of the change namespaces are expired. Each batch counts as one
+    invalidation toward adaptive TTLs; the flush of a resync does not.
+
+    Notifications sent while nobody listened are lost, but every change is
+    also logged in cache_change_log (migration V7). Every
+    CACHE_CHANGE_FEED_CHECKPOINT_INTERVAL seconds the listener records how
+    far it applied them, and on (re)connect it replays the changes from
+    there. Only without a checkpoint, or with more than
+    CACHE_CHANGE_FEED_REPLAY_LIMIT changes to replay, are all tagged
+    entries and change namespaces invalidated instead. A batch that Redis
+    failed to apply, or that arrived while the cache was bypassed, keeps
+    the checkpoint back and is replayed once Redis is reachable again.
+
+    Every worker starts a listener, but only the one holding the FEED_LOCK
+    lock listens; the others wait to take over should it stop renewing the
+    lock within CACHE_CHANGE_FEED_LOCK_TTL. Each change is thus applied once,
+    not once per worker, which would bump the change namespaces repeatedly.
+    """
+
+    def __init__(self, dsn: str, channel: str):
+        self.dsn = dsn
+        self.channel = channel
+        self._queue: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue()
+        # Changes received but not applied yet, and whether applying any failed
+        self._pending = 0
+        self._failed = False
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        """Start contending for the feed in the background."""
+        self._task = asyncio.create_task(self._lead())
+
+    async def stop(self) -> None:
+        """Stop listening and hand the feed over to another worker."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _lead(self) -> None:
+        ttl = settings.CACHE_CHANGE_FEED_LOCK_TTL
+        while True:
+            token = await cache_manager.acquire_lock(FEED_LOCK, ttl)
+            if token is None:
+                await asyncio.sleep(ttl / 3)
+                continue
+
+            logger.info("Leading the change feed")
+            self._queue = asyncio.Queue()
+            self._pending = 0
+            self._failed = False
+            tasks = [
+                asyncio.create_task(self._listen()),
+                asyncio.create_task(self._apply_changes()),
+            ]
+            try:
+                while await cache_manager.renew_lock(FEED_LOCK, token, ttl):
+                    await asyncio.sleep(ttl / 3)
+                logger.warning("Lost the change feed lock")
+            finally:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+                await cache_manager.release_lock(FEED_LOCK, token)
+
+    def _enqueue(self, change: Dict[str, Any]) -> None:
+        self._pending += 1
+        self._queue.put_nowait(change)
+
+    def _on_notification(self, connection: Any, pid: int, channel: str, payload: str) -> None:
+        try:
+            self._enqueue(json.loads(payload))
+        except (TypeError, ValueError) as e:
+            logger.warning(f"Ignoring malformed change notification: {e}")
+
+    async def _listen(self) -> None:
+        backoff = 1
+        while True:
+            connection: Optional[asyncpg.Connection] = None
+            try:
+                connection = await asyncpg.connect(self.dsn)
+                lost = asyncio.Event()
+                connection.add_termination_listener(lambda _: lost.set())
+                await connection.add_listener(self.channel, self._on_notification)
+                logger.info(f"Listening for row changes on '{self.channel}'")
+                backoff = 1
+
+                # Changes committed before this connection listened were missed
+                checkpoint = await self._snapshot_xmin(connection)
+                await self._catch_up(connection)
+
+                interval = settings.CACHE_CHANGE_FEED_CHECKPOINT_INTERVAL
+                while not lost.is_set():
+                    try:
+                        await asyncio.wait_for(lost.wait(), interval)
+                    except asyncio.TimeoutError:
+                        checkpoint = await self._checkpoint(connection, checkpoint)
+                logger.warning("Change feed connection lost")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Change feed listener error: {e}")
+            finally:
+                if connection is not None and not connection.is_closed():
+                    try:
+                        await connection.close()
+                    except Exception:
+                        pass
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 30)
+
+    @staticmethod
+    async def _snapshot_xmin(connection: asyncpg.Connection) -> int:
+        """Return the oldest transaction still running; all below it have finished."""
+        return int(await connection.fetchval(_SNAPSHOT_XMIN))
+
+    async def _catch_up(self, connection: asyncpg.Connection) -> None:
+        """Queue the changes logged since the checkpoint, or resync without one."""
+        # A bypassed cache would read as a missing checkpoint; reconnect later
+        if not cache_manager.available:
+            raise CacheUnavailable("Cannot read the change feed checkpoint")
+        checkpoint = await cache_manager.get(CHECKPOINT_KEY)
+        if not isinstance(checkpoint, int):
+            await self._resync()
+            return
+
+        limit = settings.CACHE_CHANGE_FEED_REPLAY_LIMIT
+        rows = await connection.fetch(_REPLAY, str(checkpoint), limit + 1)
+        if len(rows) > limit:
+            await self._resync()
+            return
+        # Replayed from the checkpoint, which failed changes kept back
+        self._failed = False
+        for row in rows:
+            self._enqueue(json.loads(row["change"]))
+        logger.info(f"Replaying {len(rows)} row changes since the change feed checkpoint")
+
+    async def _checkpoint(self, connection: asyncpg.Connection, previous: int) -> int:
+        """
+        Record previous as the checkpoint if every change before it was applied.
+
+        previous is the xmin of a snapshot taken one interval earlier, so the
+        transactions below it had finished by then and their notifications
+        have arrived; they are applied once nothing is queued. Returns the
+        snapshot xmin for the next call. Raises after a batch failed, so that
+        reconnecting replays it.
+        """
+        if self._failed:
+            raise RuntimeError("Row changes failed to apply; replaying from the checkpoint")
+        sample = await self._snapshot_xmin(connection)
+        if self._pending == 0:
+            retention = settings.CACHE_CHANGE_FEED_RETENTION
+            # Expires with the logged changes it refers to
+            await cache_manager.set(CHECKPOINT_KEY, previous, ttl=retention)
+            await connection.execute(_PURGE, float(retention))
+        return sample
+
+    async def _resync(self) -> None:
+        """Drop everything that may have changed while nobody listened."""
+        logger.warning("No change feed checkpoint to replay from; invalidating all tagged entries")
+        await cache_manager.invalidate_tag_pattern("*", raise_errors=True)
+        # Not a change rate; see CacheManager.ttl_for()
+        await cache_manager.invalidate(
+            namespaces=CHANGE_NAMESPACES, record=False, raise_errors=True
+        )
+        await expire_cached_queries(CHANGE_NAMESPACES)
+
+    async def _apply_changes(self) -> None:
+        while True:
+            changes = [await self._queue.get()]
+            await asyncio.sleep(settings.CACHE_CHANGE_FEED_BATCH_WINDOW)
+            while not self._queue.empty():
+                changes.append(self._queue.get_nowait())
+
+            try:
+                if not cache_manager.available:
+                    raise CacheUnavailable("Redis is bypassed")
+                tags: Set[str] = set()
+                versions: Dict[str, int] = {}
+                unversioned: Set[str] = set()
+                for change in changes:
+                    change_tags = tags_for_change(change)
+                    change_versions = versions_for_change(change)
+                    tags |= change_tags
+                    unversioned |= change_tags - change_versions.keys()
+                    for key, version in change_versions.items():
+                        versions[key] = max(version, versions.get(key, version))
+                    if change.get("table") == "employees" and change.get("op") == "INSERT":
+                        await cache_manager.add_to_filter(EMPLOYEE_FILTER, change["new"]["emp_no"])
+
+                await cache_manager.invalidate(
+                    tags=tags,
+                    namespaces=CHANGE_NAMESPACES,
+                    versions=versions,
+                    record=True,
+                    raise_errors=True,
+                )
+                # A key also touched without a version (e.g. by a titles change)
+                # is dropped even if written through; its watermark stays raised
+                dropped = unversioned & versions.keys()
+                if dropped:
+                    await cache_manager.invalidate(tags=dropped, record=False, raise_errors=True)
+                await expire_cached_queries(CHANGE_NAMESPACES)
+                logger.debug(f"Applied {len(changes)} row changes to the cache")
+            except Exception as e:
+                # Kept back from the checkpoint, so the next connection replays them
+                self._failed = True
+                logger.error(f"Failed to apply row changes to the cache: {e}")
+            finally:
+                self._pending -= len(changes)
+
+
+_listener: Optional[ChangeFeedListener] = None
+
+
+async def start_change_feed() -> None:
+    """Start the change feed listener if enabled."""
+    global _listener
+    if not settings.CACHE_CHANGE_FEED_ENABLED or not cache_manager.enabled:
+        return
+
+    url = make_url(str(settings.DATABASE_URL)).set(drivername="postgresql")
+    _listener = ChangeFeedListener(
+        url.render_as_string(hide_password=False),
+        settings.CACHE_CHANGE_FEED_CHANNEL,
+    )
+    await _listener.start()
+
+
+async def stop_change_feed() -> None:
+    """Stop the change feed listener."""
+    global _listener
+    if _listener is not None:
+        await _listener.stop()
+        _listener = None
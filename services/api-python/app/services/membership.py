@@ -0,0 +1,30 @@
+"""
+Membership Filters
+Loaders for the Bloom filters kept by the cache manager
+"""
+
+from typing import List
+
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models.employee import Employee
+from app.utils.cache import cache_manager
+
+EMPLOYEE_FILTER = "employee"
+
+
+async def load_employee_numbers() -> List[int]:
+    """Load the emp_no of every employee that is not deleted."""
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(
+            select(Employee.emp_no).where(Employee.is_deleted == False)
+        )
+        return list(result.scalars().all())
+
+
+def register_membership_filters() -> None:
+    """Register the enabled filters; call before the cache connects."""
+    if settings.CACHE_EMPLOYEE_FILTER_ENABLED:
+        cache_manager.register_filter(EMPLOYEE_FILTER, load_employee_numbers)
@@ -0,0 +1,106 @@
+"""
+Adaptive TTL
+Chooses cache TTLs from how often each key family is invalidated
+"""
+
+import math
+import time
+from typing import Callable, Dict, Iterable, Set, Tuple
+
+
+class AdaptiveTTL:
+    """
+    TTL policy driven by observed invalidation rates.
+
+    A family (the key prefix of a cached() function) is registered with the
+    sources whose invalidation makes its entries stale, e.g. "tag:employee"
+    or "ns:analytics". Invalidations are counted per source with exponential
+    decay, which gives a recent rate; a family's TTL is factor times the mean
+    interval between invalidations of its most volatile source, clamped to
+    [min_ttl, max_ttl].
+
+    Until a source was invalidated about once per decay window, the family
+    keeps its default TTL, growing toward max_ttl the longer no change is
+    seen.
+
+    Counts are timestamped with the (wall) clock, so counts kept elsewhere,
+    e.g. shared by several processes, can be decayed the same way and
+    passed in with load().
+    """
+
+    def __init__(
+        self,
+        min_ttl: int,
+        max_ttl: int,
+        half_life: float,
+        factor: float = 0.5,
+        clock: Callable[[], float] = time.time,
+    ):
+        if not 0 < min_ttl <= max_ttl:
+            raise ValueError("TTL bounds must satisfy 0 < min_ttl <= max_ttl")
+        if half_life <= 0 or factor <= 0:
+            raise ValueError("half_life and factor must be positive")
+
+        self.min_ttl = min_ttl
+        self.max_ttl = max_ttl
+        self.factor = factor
+        # Mean lifetime of a counted event under the decay
+        self.lifetime = half_life / math.log(2)
+        self._clock = clock
+        self._started = clock()
+        self._counts: Dict[str, Tuple[float, float]] = {}
+        self._families: Dict[str, Set[str]] = {}
+
+    def register(self, family: str, sources: Iterable[str]) -> None:
+        """Make invalidations of sources shorten the TTL of family."""
+        self._families.setdefault(family, set()).update(sources)
+
+    def sources(self, family: str) -> Set[str]:
+        """Return the sources registered for family."""
+        return self._families.get(family, set())
+
+    def load(self, counts: Dict[str, Tuple[float, float]], started: float) -> None:
+        """
+        Replace the counts of some sources and the start of observation.
+
+        Args:
+            counts: (decayed count, clock time it was decayed to) by source
+            started: Clock time the sources were first observed
+        """
+        self._counts.update(counts)
+        self._started = started
+
+    def record(self, source: str) -> None:
+        """Count one invalidation of source."""
+        now = self._clock()
+        self._counts[source] = (self._count(source, now) + 1, now)
+
+    def interval(self, source: str) -> float:
+        """Return the recent mean seconds between invalidations of source."""
+        now = self._clock()
+        count = self._count(source, now)
+        window = self._window(now)
+        return window / count if count >= 1 else math.inf
+
+    def ttl(self, family: str, default: int) -> int:
+        """Return the TTL for new entries of family."""
+        sources = self._families.get(family)
+        if not sources:
+            return default
+
+        interval = min(self.interval(source) for source in sources)
+        if math.isinf(interval):
+            # No recent change: at least as long as observed without one
+            ttl = max(default, self.factor * self._window(self._clock()))
+        else:
+            ttl = self.factor * interval
+        return int(min(max(ttl, self.min_ttl), self.max_ttl))
+
+    def _count(self, source: str, now: float) -> float:
+        count, updated_at = self._counts.get(source, (0.0, now))
+        return count * math.exp(-max(now - updated_at, 0.0) / self.lifetime)
+
+    def _window(self, now: float) -> float:
+        # Decayed length of the observation period: the count of a steady
+        # rate r converges to r * window
+        return self.lifetime * (1 - math.exp(-max(now - self._started, 0.0) / self.lifetime))
@@ -3,20 +3,185 @@
 Redis-based caching with TTL and invalidation support
 """
 
+import asyncio
+import enum
+import hashlib
+import inspect
 import json
-from typing import Any, Optional, Callable
-from functools import wraps
+import sqlite3
+import time
+import uuid
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from datetime import date
+from decimal import Decimal
+from typing import Any, AsyncIterator, Awaitable, Dict, Iterable, List, Optional, Callable, Tuple
+from itertools import chain
 import redis.asyncio as aioredis
+from redis.exceptions import ConnectionError as RedisConnectionError
+from redis.exceptions import TimeoutError as RedisTimeoutError
+from fastapi import BackgroundTasks, Request, Response
+from fastapi.params import Depends, Security
+from pydantic.fields import FieldInfo
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.config import settings
 from app.core.logging import logger
+from app.utils import codecs
+from app.utils.adaptive_ttl import AdaptiveTTL
+from app.utils.bloom import BloomFilter
+from app.utils.circuit_breaker import CircuitBreaker
+from app.utils.disk_cache import DiskCache
+from app.utils.frequency_sketch import FrequencySketch
+from app.utils.hash_ring import HashRing
+from app.utils.cache_metrics import (
+    CACHE_ADMISSION_REJECTIONS,
+    CACHE_BUDGET_EVICTIONS,
+    CACHE_CIRCUIT_OPEN,
+    CACHE_ERRORS,
+    CACHE_EVICTIONS,
+    CACHE_HITS,
+    CACHE_MISSES,
+    CACHE_SETS,
+    CACHE_STORED_BYTES,
+    CACHE_TTL_SECONDS,
+    CACHE_VALUE_BYTES,
+    key_prefix,
+    observe,
+)
+from app.utils.local_cache import LocalCache
+from app.utils.cache_scripts import (
+    CHARGE_BUDGET_SCRIPT,
+    INVALIDATE_SCRIPT,
+    RECORD_INVALIDATIONS_SCRIPT,
+    RELEASE_LOCK_SCRIPT,
+    RENEW_LOCK_SCRIPT,
+    SET_IF_NEWER_SCRIPT,
+    TOUCH_BUDGET_SCRIPT,
+)
+
+
+def _decode_key(key: Any) -> str:
+    """Redis returns keys as bytes; L1 and pub/sub messages use str."""
+    return key.decode("utf-8") if isinstance(key, bytes) else key
+
+
+def _tag_family(tag: str) -> str:
+    """Return the family of a tag or tag template, e.g. "employee"."""
+    return tag.split(":", 1)[0]
+
+
+def _records(record: Optional[bool]) -> bool:
+    """Whether an invalidation counts toward adaptive TTLs; see CacheManager.invalidate()."""
+    if record is None:
+        return not settings.CACHE_CHANGE_FEED_ENABLED
+    return record
+
+
+# How long namespace generations are remembered on disk
+_DISK_GENERATION_TTL = 7 * 24 * 3600
+
+# Errors meaning Redis is unreachable or too slow, as opposed to bad data
+_REDIS_FAILURES = (RedisConnectionError, RedisTimeoutError, OSError, asyncio.TimeoutError)
+
+# Hash of the invalidation counts behind adaptive TTLs, shared by every
+# worker: field 'started' and one "<decayed count> <time>" field per source
+_TTL_RATES_KEY = "ttl_rates"
+
+
+class CacheUnavailable(Exception):
+    """Redis was bypassed, so an invalidation could not be applied."""
 
 
 class CacheManager:
-    """Redis cache manager."""
+    """
+    Redis cache manager.
+
+    Reads are served from an in-process LRU (L1) when possible and fall back
+    to Redis (L2). L1 entries inherit the remaining L2 TTL. Deletions are
+    broadcast over Redis pub/sub so every worker drops its L1 copy.
+
+    Every Redis command is bounded by CACHE_OPERATION_TIMEOUT. Repeated
+    timeouts or connection errors open a circuit breaker: the cache is then
+    bypassed (operations return their miss/failure value without touching
+    Redis, and L1 is not used) until a background probe reaches Redis again.
+
+    Reads are counted in a frequency sketch; writes made with admission=True
+    are skipped until their key was read CACHE_ADMISSION_MIN_FREQUENCY times
+    recently, so one-off lookups do not displace hot entries. Prefixes listed
+    in CACHE_PREFIX_BUDGETS are kept within their byte budget in Redis by
+    evicting the entries with the least recent use per byte.
+
+    Invalidations are counted per tag family and namespace, so families
+    registered with register_ttl_family() get TTLs that follow how often
+    their data actually changes (see ttl_for()). The counts are kept in
+    Redis and shared by every worker. With the change feed enabled only
+    the row changes it reports are counted, so writes made through the API
+    are not counted twice.
+
+    With several REDIS_NODES, keys are spread over the nodes by consistent
+    hashing. An entry's version watermark, tag memberships and budget
+    accounting live on the entry's node, so tag sets exist per node and
+    invalidation runs on every node; namespace and lock keys live on the
+    node their own key hashes to. Invalidation messages are published on
+    the node where they originate and every worker subscribes to all
+    nodes. A failing node opens the circuit breaker for the whole cache,
+    since invalidations could no longer reach its entries.
+    """
 
     def __init__(self):
+        # First node; also the only one when not sharding
         self.redis: Optional[aioredis.Redis] = None
+        # Clients by node name and the ring mapping keys to them when sharding
+        self.shards: Dict[str, aioredis.Redis] = {}
+        self.ring: Optional[HashRing] = None
         self.enabled = settings.CACHE_ENABLED
+        self.local: Optional[LocalCache] = (
+            LocalCache(
+                max_entries=settings.CACHE_L1_MAX_ENTRIES,
+                max_bytes=settings.CACHE_L1_MAX_BYTES,
+                on_evict=lambda key: CACHE_EVICTIONS.labels(key_prefix(key)).inc(),
+            )
+            if settings.CACHE_L1_ENABLED
+            else None
+        )
+        self.instance_id = uuid.uuid4().hex
+        # Bumped on every remote invalidation; guards L1 fills racing with one
+        self._invalidation_seq = 0
+        # time.monotonic() of the last invalidation made or received; cache
+        # fills must see the primary's WAL position from after it
+        self.last_invalidation = 0.0
+        # L1 is only trusted while subscribed to the invalidation channel
+        # (on every node)
+        self._subscribed = False
+        self._subscriptions: set = set()
+        # Bloom filters of existing IDs, rebuilt on every (re)subscribe
+        self._filters: Dict[str, BloomFilter] = {}
+        self._filter_loaders: Dict[str, Callable[[], Awaitable[Iterable[Any]]]] = {}
+        self._listener_tasks: List[asyncio.Task] = []
+        self.breaker = CircuitBreaker(
+            settings.CACHE_BREAKER_FAILURE_THRESHOLD, settings.CACHE_BREAKER_WINDOW
+        )
+        self._probe_task: Optional[asyncio.Task] = None
+        # On-disk tier, opened by connect() when enabled
+        self.disk: Optional[DiskCache] = None
+        self._disk_tasks: set = set()
+        # Namespace generations last recorded on disk
+        self._disk_generations: Dict[str, int] = {}
+        self.sketch: Optional[FrequencySketch] = (
+            FrequencySketch(settings.CACHE_ADMISSION_SKETCH_WIDTH)
+            if settings.CACHE_ADMISSION_ENABLED
+            else None
+        )
+        self.ttl_policy: Optional[AdaptiveTTL] = (
+            AdaptiveTTL(
+                settings.CACHE_ADAPTIVE_TTL_MIN,
+                settings.CACHE_ADAPTIVE_TTL_MAX,
+                settings.CACHE_ADAPTIVE_TTL_HALF_LIFE,
+                settings.CACHE_ADAPTIVE_TTL_FACTOR,
+            )
+            if settings.CACHE_ADAPTIVE_TTL_ENABLED
+            else None
+        )
 
     async def connect(self) -> None:
         """Connect to Redis."""
@@ -24,117 +189,1281 @@ async def connect(self) -> None:
             logger.info("Caching is disabled")
             return
 
-        try:
-            self.redis = await aioredis.from_url(
-                settings.REDIS_URL,
+        if settings.CACHE_DISK_ENABLED:
+            try:
+                self.disk = await asyncio.to_thread(
+                    DiskCache, settings.CACHE_DISK_PATH, settings.CACHE_DISK_MAX_BYTES
+                )
+                logger.info(f"Disk cache tier opened at {settings.CACHE_DISK_PATH}")
+            except (sqlite3.Error, OSError) as e:
+                logger.error(f"Failed to open disk cache tier: {e}")
+
+        urls = settings.REDIS_NODES or [str(settings.REDIS_URL)]
+        self.shards = {}
+        for url in urls:
+            # Waiting for a pooled connection counts against the command timeout
+            pool = aioredis.BlockingConnectionPool.from_url(
+                url,
                 encoding="utf-8",
-                decode_responses=True,
-                max_connections=20,
+                max_connections=settings.REDIS_MAX_CONNECTIONS,
+                timeout=settings.CACHE_OPERATION_TIMEOUT,
+                socket_timeout=settings.CACHE_OPERATION_TIMEOUT,
+                socket_connect_timeout=settings.CACHE_CONNECT_TIMEOUT,
             )
-            await self.redis.ping()
-            logger.info("Redis cache connected successfully")
+            self.shards[self._node_name(pool)] = aioredis.Redis.from_pool(pool)
+        self.redis = next(iter(self.shards.values()))
+        self.ring = (
+            HashRing(self.shards, settings.CACHE_HASH_RING_REPLICAS)
+            if len(self.shards) > 1
+            else None
+        )
+        try:
+            await asyncio.gather(*(client.ping() for client in self._clients()))
+            logger.info(f"Redis cache connected successfully ({len(self.shards)} nodes)")
         except Exception as e:
+            # Keep going without the cache; the probe enables it once Redis is up
             logger.error(f"Failed to connect to Redis: {e}")
-            self.enabled = False
+            self._open_breaker()
+
+        if self._broadcasts or self._filter_loaders:
+            self._start_listener()
 
     async def disconnect(self) -> None:
         """Disconnect from Redis."""
+        for task in (*self._listener_tasks, self._probe_task):
+            if task:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._listener_tasks = []
+        self._probe_task = None
+        self._subscribed = False
+        self._subscriptions.clear()
+
+        if self.disk is not None:
+            await asyncio.gather(*self._disk_tasks, return_exceptions=True)
+            self.disk.close()
+            self.disk = None
+
         if self.redis:
-            await self.redis.close()
+            for client in self._clients():
+                await client.aclose()
             logger.info("Redis cache disconnected")
 
-    async def get(self, key: str) -> Optional[Any]:
-        """Get value from cache."""
-        if not self.enabled or not self.redis:
-            return None
+    async def get(self, key: str, disk: bool = False) -> Optional[Any]:
+        """
+        Get value from cache.
 
-        try:
-            value = await self.redis.get(key)
-            if value:
-                return json.loads(value)
-            return None
-        except Exception as e:
-            logger.error(f"Cache get error for key '{key}': {e}")
-            return None
+        With disk=True, a key missing from Redis (or any key while Redis is
+        bypassed) is looked up in the on-disk tier. Disk hits are not copied
+        back to Redis, as the disk tier does not keep the tags and version
+        that invalidations of the Redis entry rely on.
+        """
+        return await self._get(key, codecs.decode, disk)
+
+    async def get_raw(self, key: str, disk: bool = False) -> Optional[bytes]:
+        """Get raw bytes stored with set_raw(); see get()."""
+        return await self._get(key, None, disk)
 
     async def set(
         self,
         key: str,
         value: Any,
         ttl: Optional[int] = None,
+        tags: Optional[Iterable[str]] = None,
+        version: Optional[int] = None,
+        admission: bool = False,
+        disk: bool = False,
+    ) -> bool:
+        """
+        Set value in cache with TTL.
+
+        Args:
+            key: Cache key
+            value: Value serializable by the configured codec
+            ttl: Time to live in seconds
+            tags: Tags to register the key under for invalidate_tags()
+            version: Row version of the value. The write is skipped (and
+                False returned) if a newer version of the key was written,
+                so a slow writer cannot replace newer data with older.
+                Other workers drop their L1 copy of the key.
+            admission: Skip the write (and return False) unless the key was
+                read often enough recently to be worth storing
+            disk: Also keep the value in the on-disk tier, which is written
+                even while Redis is bypassed (False is returned then)
+        """
+        if not (self.available or disk and self.disk is not None):
+            return False
+        if not self.admits(key, admission):
+            return False
+
+        try:
+            serialized = codecs.encode(value)
+        except codecs.CodecError as e:
+            CACHE_ERRORS.labels(key_prefix(key), "set").inc()
+            logger.error(f"Cache set error for key '{key}': {e}")
+            return False
+
+        # Keep the decoded form in L1 so L1 and L2 hits return the same types
+        written = self.available and await self._set(
+            key, serialized, ttl, tags, codecs.decode, version
+        )
+        if disk and (written or not self.available):
+            await self._disk_set(key, serialized, ttl or settings.REDIS_TTL)
+        return written
+
+    async def set_raw(
+        self,
+        key: str,
+        data: bytes,
+        ttl: Optional[int] = None,
+        tags: Optional[Iterable[str]] = None,
+        version: Optional[int] = None,
+        admission: bool = False,
+        disk: bool = False,
+    ) -> bool:
+        """Store raw bytes as-is; see set() for arguments."""
+        if not (self.available or disk and self.disk is not None):
+            return False
+        if not self.admits(key, admission):
+            return False
+
+        written = self.available and await self._set(key, data, ttl, tags, None, version)
+        if disk and (written or not self.available):
+            await self._disk_set(key, data, ttl or settings.REDIS_TTL)
+        return written
+
+    async def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        """
+        Get several values in one round trip.
+
+        Returns:
+            Mapping of the keys that were found to their values
+        """
+        return await self._get_many(keys, codecs.decode)
+
+    async def get_many_raw(self, keys: Iterable[str]) -> Dict[str, bytes]:
+        """Get several values stored with set_raw() or set_many_raw(); see get_many()."""
+        return await self._get_many(keys, None)
+
+    async def _get_many(self, keys: Iterable[str], decode: Optional[Callable]) -> Dict[str, Any]:
+        if not self.available:
+            return {}
+
+        found: Dict[str, Any] = {}
+        use_local = self._local_active
+        missing = []
+        for key in dict.fromkeys(keys):
+            self._record_read(key)
+            value = self.local.get(key) if use_local else None
+            if value is not None:
+                CACHE_HITS.labels(key_prefix(key), "l1").inc()
+                found[key] = value
+            else:
+                missing.append(key)
+        if not missing:
+            return found
+
+        prefix = key_prefix(missing[0])
+        try:
+            seq = self._invalidation_seq
+            with observe("get_many", prefix):
+                batches = self._by_client(missing)
+                results = await asyncio.gather(
+                    *(self._fetch_batch(client, batch, use_local) for client, batch in batches)
+                )
+
+            for (_, batch), (values, pttls) in zip(batches, results):
+                for key, data, pttl in zip(batch, values, pttls):
+                    if not data:
+                        CACHE_MISSES.labels(key_prefix(key)).inc()
+                        continue
+                    try:
+                        found[key] = decode(data) if decode else data
+                    except Exception as e:
+                        CACHE_ERRORS.labels(key_prefix(key), "get").inc()
+                        logger.error(f"Cache get error for key '{key}': {e}")
+                        continue
+                    CACHE_HITS.labels(key_prefix(key), "redis").inc()
+                    if use_local and pttl > 0 and seq == self._invalidation_seq:
+                        self.local.set(key, found[key], pttl / 1000, size=len(data))
+        except Exception as e:
+            self._record_failure(e)
+            CACHE_ERRORS.labels(prefix, "get_many").inc()
+            logger.error(f"Cache get_many error for {len(missing)} keys: {e}")
+        return found
+
+    async def _fetch_batch(self, client: aioredis.Redis, keys: List[str], with_ttl: bool) -> tuple:
+        """Fetch keys from one node in one round trip; returns (values, pttls)."""
+        pipe = client.pipeline(transaction=False)
+        pipe.mget(keys)
+        if with_ttl:
+            for key in keys:
+                pipe.pttl(key)
+        for key in keys:
+            if key_prefix(key) in settings.CACHE_PREFIX_BUDGETS:
+                self._queue_touch(pipe, key)
+        results = await pipe.execute()
+        return results[0], results[1 : len(keys) + 1] if with_ttl else [0] * len(keys)
+
+    async def set_many(
+        self,
+        items: Dict[str, Any],
+        ttl: Optional[int] = None,
+        tags: Optional[Dict[str, Iterable[str]]] = None,
+        versions: Optional[Dict[str, int]] = None,
+    ) -> bool:
+        """
+        Set several values in one pipelined round trip per node.
+
+        Args:
+            items: Mapping of cache keys to values
+            ttl: Time to live in seconds
+            tags: Optional mapping of cache keys to their tags
+            versions: Optional mapping of cache keys to the row version of
+                their value; see set()
+
+        Returns:
+            Whether every value was written
+        """
+        if not self.available or not items:
+            return False
+
+        encoded = {}
+        for key, value in items.items():
+            try:
+                encoded[key] = codecs.encode(value)
+            except codecs.CodecError as e:
+                CACHE_ERRORS.labels(key_prefix(key), "set").inc()
+                logger.error(f"Cache set error for key '{key}': {e}")
+
+        written = await self._set_many(encoded, items, ttl, tags, versions)
+        return written and len(encoded) == len(items)
+
+    async def set_many_raw(
+        self,
+        items: Dict[str, bytes],
+        ttl: Optional[int] = None,
+        tags: Optional[Dict[str, Iterable[str]]] = None,
+        versions: Optional[Dict[str, int]] = None,
     ) -> bool:
-        """Set value in cache with TTL."""
-        if not self.enabled or not self.redis:
+        """Store several raw values as-is; see set_many() for arguments."""
+        if not self.available or not items:
             return False
+        return await self._set_many(items, items, ttl, tags, versions)
 
+    async def _set_many(
+        self,
+        encoded: Dict[str, bytes],
+        items: Dict[str, Any],
+        ttl: Optional[int],
+        tags: Optional[Dict[str, Iterable[str]]],
+        versions: Optional[Dict[str, int]],
+    ) -> bool:
+        """Store encoded values, keeping items (their decoded form) in L1."""
+        if not encoded:
+            return False
+
+        prefix = key_prefix(next(iter(encoded)))
         try:
             ttl = ttl or settings.REDIS_TTL
-            serialized = json.dumps(value, default=str)
-            await self.redis.setex(key, ttl, serialized)
+            with observe("set_many", prefix):
+                stored = await asyncio.gather(
+                    *(
+                        self._store_batch(client, batch, encoded, ttl, tags or {}, versions or {})
+                        for client, batch in self._by_client(encoded)
+                    )
+                )
+            evicted = set()
+            skipped = set()
+            for batch_evicted, batch_skipped in stored:
+                evicted.update(await self._drop_evicted(batch_evicted))
+                skipped.update(batch_skipped)
+            if skipped:
+                logger.debug(f"Skipped cache set of older versions for {len(skipped)} keys")
+            for key, data in encoded.items():
+                if key not in skipped:
+                    CACHE_SETS.labels(key_prefix(key)).inc()
+                    CACHE_VALUE_BYTES.labels(key_prefix(key)).observe(len(data))
+            if self.local is not None:
+                self.local.delete_many(skipped)
+            if self._local_active:
+                for key, data in encoded.items():
+                    if key not in evicted and key not in skipped:
+                        self.local.set(key, items[key], ttl, size=len(data))
+            return not skipped
+        except Exception as e:
+            self._record_failure(e)
+            CACHE_ERRORS.labels(prefix, "set_many").inc()
+            logger.error(f"Cache set_many error for {len(encoded)} keys: {e}")
+            return False
+
+    async def _store_batch(
+        self,
+        client: aioredis.Redis,
+        keys: List[str],
+        encoded: Dict[str, bytes],
+        ttl: int,
+        tags: Dict[str, Iterable[str]],
+        versions: Dict[str, int],
+    ) -> tuple:
+        """
+        Store keys on one node in one round trip.
+
+        Returns (keys evicted for budgets, keys skipped for a newer version).
+        A skipped write is still charged to its budget, at about the size of
+        the newer entry it lost to.
+        """
+        charges = []
+        guarded = {}
+        channel = settings.CACHE_INVALIDATION_CHANNEL if self._broadcasts else ""
+        pipe = client.pipeline(transaction=False)
+        for key in keys:
+            if key in versions:
+                guarded[len(pipe)] = key
+                tag_keys = [self._tag_key(tag) for tag in tags.get(key) or ()]
+                pipe.eval(
+                    SET_IF_NEWER_SCRIPT,
+                    2 + len(tag_keys),
+                    key,
+                    self._version_key(key),
+                    *tag_keys,
+                    encoded[key],
+                    ttl,
+                    versions[key],
+                    channel,
+                    self.instance_id,
+                )
+            else:
+                self._queue_set(pipe, key, encoded[key], ttl, tags.get(key))
+            if key_prefix(key) in settings.CACHE_PREFIX_BUDGETS:
+                charges.append(len(pipe))
+                self._queue_charge(pipe, key, len(encoded[key]))
+        results = await pipe.execute()
+        evicted = [key for index in charges for key in results[index]]
+        skipped = [key for index, key in guarded.items() if not results[index]]
+        return evicted, skipped
+
+    async def _get(self, key: str, decode: Optional[Callable], disk: bool = False) -> Optional[Any]:
+        if not self.available:
+            return await self._disk_get(key, decode) if disk else None
+
+        prefix = key_prefix(key)
+        self._record_read(key)
+        use_local = self._local_active
+        if use_local:
+            value = self.local.get(key)
+            if value is not None:
+                CACHE_HITS.labels(prefix, "l1").inc()
+                return value
+
+        try:
+            seq = self._invalidation_seq
+            budgeted = prefix in settings.CACHE_PREFIX_BUDGETS
+            with observe("get", prefix):
+                if not use_local and not budgeted:
+                    value = await self._client(key).get(key)
+                else:
+                    # Fetch the remaining TTL in the same round trip so the L1
+                    # copy expires together with the Redis entry.
+                    pipe = self._client(key).pipeline(transaction=False)
+                    pipe.get(key)
+                    if use_local:
+                        pipe.pttl(key)
+                    if budgeted:
+                        self._queue_touch(pipe, key)
+                    results = await pipe.execute()
+                    value, pttl = results[0], results[1] if use_local else 0
+
+            if not value:
+                result = await self._disk_get(key, decode) if disk else None
+                if result is None:
+                    CACHE_MISSES.labels(prefix).inc()
+                return result
+
+            result = decode(value) if decode else value
+            CACHE_HITS.labels(prefix, "redis").inc()
+            if use_local and pttl > 0 and seq == self._invalidation_seq:
+                self.local.set(key, result, pttl / 1000, size=len(value))
+            return result
+        except Exception as e:
+            self._record_failure(e)
+            CACHE_ERRORS.labels(prefix, "get").inc()
+            logger.error(f"Cache get error for key '{key}': {e}")
+            return await self._disk_get(key, decode) if disk else None
+
+    async def _disk_get(self, key: str, decode: Optional[Callable]) -> Optional[Any]:
+        """Read key from the on-disk tier."""
+        entry = await self._disk_call("get", key, self.disk.get, key) if self.disk else None
+        if entry is None:
+            return None
+
+        data, _ = entry
+        try:
+            result = decode(data) if decode else data
+        except Exception as e:
+            CACHE_ERRORS.labels(key_prefix(key), "disk_get").inc()
+            logger.error(f"Disk cache decode error for key '{key}': {e}")
+            return None
+        CACHE_HITS.labels(key_prefix(key), "disk").inc()
+        return result
+
+    async def _disk_set(self, key: str, data: bytes, ttl: int) -> None:
+        if self.disk is not None:
+            await self._disk_call("set", key, self.disk.set, key, data, ttl)
+
+    async def _disk_delete(self, keys: Iterable[str] = (), pattern: Optional[str] = None) -> None:
+        if self.disk is None:
+            return
+        keys = list(keys)
+        if keys:
+            await self._disk_call("delete", keys[0], self.disk.delete_many, keys)
+        if pattern:
+            await self._disk_call("delete", pattern, self.disk.delete_pattern, pattern)
+
+    async def _disk_call(self, operation: str, key: str, func: Callable, *args: Any) -> Any:
+        """Run a blocking disk tier call in a thread; errors are logged, not raised."""
+        try:
+            return await asyncio.to_thread(func, *args)
+        except sqlite3.Error as e:
+            CACHE_ERRORS.labels(key_prefix(key), f"disk_{operation}").inc()
+            logger.error(f"Disk cache {operation} error for '{key}': {e}")
+            return None
+
+    async def _set(
+        self,
+        key: str,
+        data: bytes,
+        ttl: Optional[int],
+        tags: Optional[Iterable[str]],
+        decode: Optional[Callable],
+        version: Optional[int] = None,
+    ) -> bool:
+        prefix = key_prefix(key)
+        try:
+            ttl = ttl or settings.REDIS_TTL
+            budgeted = prefix in settings.CACHE_PREFIX_BUDGETS
+            charged = None
+            client = self._client(key)
+            with observe("set", prefix):
+                if version is not None:
+                    tag_keys = [self._tag_key(tag) for tag in tags or ()]
+                    channel = settings.CACHE_INVALIDATION_CHANNEL if self._broadcasts else ""
+                    written = await client.eval(
+                        SET_IF_NEWER_SCRIPT,
+                        2 + len(tag_keys),
+                        key,
+                        self._version_key(key),
+                        *tag_keys,
+                        data,
+                        ttl,
+                        version,
+                        channel,
+                        self.instance_id,
+                    )
+                    if not written:
+                        if self.local is not None:
+                            self.local.delete(key)
+                        logger.debug(f"Skipped cache set of older version {version} for '{key}'")
+                        return False
+                    if budgeted:
+                        pipe = client.pipeline(transaction=False)
+                        self._queue_charge(pipe, key, len(data))
+                        (charged,) = await pipe.execute()
+                elif tags or budgeted:
+                    pipe = client.pipeline(transaction=False)
+                    self._queue_set(pipe, key, data, ttl, tags)
+                    if budgeted:
+                        self._queue_charge(pipe, key, len(data))
+                    results = await pipe.execute()
+                    charged = results[-1] if budgeted else None
+                else:
+                    await client.setex(key, ttl, data)
+            CACHE_SETS.labels(prefix).inc()
+            CACHE_VALUE_BYTES.labels(prefix).observe(len(data))
+            if charged and key in await self._drop_evicted(charged):
+                # Ranked below everything else in its budget
+                return False
+            if self._local_active:
+                self.local.set(key, decode(data) if decode else data, ttl, size=len(data))
             return True
         except Exception as e:
+            self._record_failure(e)
+            CACHE_ERRORS.labels(prefix, "set").inc()
             logger.error(f"Cache set error for key '{key}': {e}")
             return False
 
     async def delete(self, key: str) -> bool:
         """Delete key from cache."""
-        if not self.enabled or not self.redis:
+        await self._disk_delete([key])
+        if not self.available:
             return False
 
+        self.last_invalidation = time.monotonic()
         try:
-            await self.redis.delete(key)
-            return True
+            if self.local is not None:
+                self.local.delete(key)
+            with observe("delete", key_prefix(key)):
+                deleted = await self._client(key).delete(key)
+            await self._publish_invalidation(keys=[key])
+            return bool(deleted)
         except Exception as e:
+            self._record_failure(e)
+            CACHE_ERRORS.labels(key_prefix(key), "delete").inc()
             logger.error(f"Cache delete error for key '{key}': {e}")
             return False
 
     async def delete_pattern(self, pattern: str) -> int:
-        """Delete all keys matching pattern."""
-        if not self.enabled or not self.redis:
+        """
+        Delete all keys matching pattern.
+
+        Walks the keyspace with SCAN, so it is still O(total keys). Prefer
+        invalidate_tags() or bump_namespace() on request paths.
+        """
+        await self._disk_delete(pattern=pattern)
+        if not self.available:
             return 0
 
+        self.last_invalidation = time.monotonic()
         try:
-            keys = await self.redis.keys(pattern)
-            if keys:
-                return await self.redis.delete(*keys)
-            return 0
+            if self.local is not None:
+                self.local.delete_pattern(pattern)
+
+            deleted = 0
+            for client in self._clients():
+                cursor = 0
+                while True:
+                    cursor, keys = await client.scan(cursor, match=pattern, count=500)
+                    if keys:
+                        deleted += len(keys)
+                        await client.delete(*keys)
+                    if not cursor:
+                        break
+
+            await self._publish_invalidation(pattern=pattern)
+            return deleted
         except Exception as e:
+            self._record_failure(e)
             logger.error(f"Cache delete pattern error for '{pattern}': {e}")
             return 0
 
+    async def invalidate(
+        self,
+        tags: Iterable[str] = (),
+        namespaces: Iterable[str] = (),
+        versions: Optional[Dict[str, int]] = None,
+        record: Optional[bool] = None,
+        raise_errors: bool = False,
+    ) -> int:
+        """
+        Drop tagged keys and bump namespaces in a single round trip per node.
+
+        The tag sets are read and deleted together with their members inside
+        one script, so keys tagged concurrently end up in a fresh set instead
+        of being lost. Cost is O(members) of the tag sets; the keyspace is
+        not scanned.
+
+        Args:
+            tags: Tags whose keys to delete; see set()
+            namespaces: Namespaces to bump; see bump_namespace()
+            versions: Row version just committed, by cache key. The key's
+                version watermark is raised to it, so older fills in flight
+                cannot write the key back; an entry already written at that
+                version or newer, e.g. written through after an update, is
+                kept even if one of the tags lists it.
+            record: Count the invalidation toward adaptive TTLs; by default
+                only while the change feed, which counts every row change
+                itself, is disabled
+            raise_errors: Raise CacheUnavailable while Redis is bypassed and
+                re-raise Redis errors, instead of returning 0, for callers
+                that must retry invalidations which were not applied
+
+        Returns:
+            Number of cache entries deleted
+        """
+        tags = list(tags)
+        namespaces = list(namespaces)
+        namespace_keys = [self._namespace_key(ns) for ns in namespaces]
+        if _records(record):
+            await self._record_invalidations(tags, namespace_keys)
+        if not (tags or namespaces or versions):
+            return 0
+        if not self.available:
+            if raise_errors:
+                raise CacheUnavailable(f"Cannot invalidate tags {tags}, namespaces {namespaces}")
+            return 0
+
+        self.last_invalidation = time.monotonic()
+        try:
+            self._invalidation_seq += 1
+            if self.local is not None:
+                self.local.delete_many(namespace_keys)
+            channel = settings.CACHE_INVALIDATION_CHANNEL if self._broadcasts else ""
+            tag_keys = [self._tag_key(tag) for tag in tags]
+            versions = versions or {}
+            # Every node holds tag sets and version keys of its own entries;
+            # each namespace counter lives on one node
+            owned = dict(self._by_client(namespace_keys))
+            versioned = dict(self._by_client(versions)) if versions else {}
+            calls = [
+                client.eval(
+                    INVALIDATE_SCRIPT,
+                    len(tag_keys) + len(owned.get(client, ())) + len(versioned.get(client, ())),
+                    *tag_keys,
+                    *owned.get(client, ()),
+                    *(self._version_key(key) for key in versioned.get(client, ())),
+                    len(tag_keys),
+                    len(owned.get(client, ())),
+                    channel,
+                    self.instance_id,
+                    settings.CACHE_VERSION_TTL,
+                    *chain.from_iterable(
+                        (key, versions[key]) for key in versioned.get(client, ())
+                    ),
+                )
+                for client in self._clients()
+                if tag_keys or owned.get(client) or versioned.get(client)
+            ]
+            with observe("invalidate", "tag"):
+                results = await asyncio.gather(*calls)
+            deleted = 0
+            dropped = []
+            for node_deleted, keys in results:
+                deleted += node_deleted
+                dropped.extend(_decode_key(key) for key in keys)
+            if self.local is not None:
+                self.local.delete_many(dropped)
+            await self._disk_delete(dropped)
+            return deleted
+        except Exception as e:
+            self._record_failure(e)
+            CACHE_ERRORS.labels("tag", "invalidate").inc()
+            logger.error(f"Cache invalidate error for tags {tags}, namespaces {namespaces}: {e}")
+            if raise_errors:
+                raise
+            return 0
+
+    async def invalidate_tags(self, *tags: str) -> int:
+        """Delete every key registered under any of the given tags."""
+        return await self.invalidate(tags=tags)
+
+    async def invalidate_tag_pattern(self, pattern: str, raise_errors: bool = False) -> int:
+        """
+        Invalidate every tag matching a glob pattern, e.g. "employee:*".
+
+        Scans the tag sets rather than the whole keyspace, but is still
+        O(tags); meant for resynchronization, not request paths.
+        raise_errors is passed on as in invalidate().
+        """
+        if not self.available:
+            if raise_errors:
+                raise CacheUnavailable(f"Cannot invalidate tags matching '{pattern}'")
+            return 0
+
+        self.last_invalidation = time.monotonic()
+        prefix = self._tag_key("")
+        deleted = 0
+        try:
+            for client in self._clients():
+                cursor = 0
+                while True:
+                    cursor, tag_keys = await client.scan(
+                        cursor, match=self._tag_key(pattern), count=500
+                    )
+                    tags = [_decode_key(key)[len(prefix):] for key in tag_keys]
+                    if tags:
+                        # A flush, not a change rate of the tag families
+                        deleted += await self.invalidate(
+                            tags=tags, record=False, raise_errors=raise_errors
+                        )
+                    if not cursor:
+                        break
+        except Exception as e:
+            self._record_failure(e)
+            CACHE_ERRORS.labels("tag", "invalidate").inc()
+            logger.error(f"Cache invalidate tag pattern error for '{pattern}': {e}")
+            if raise_errors:
+                raise
+        return deleted
+
+    async def namespace_generation(self, namespace: str) -> int:
+        """
+        Get the current generation of a key namespace.
+
+        Keys built with the generation are invalidated all at once by
+        bump_namespace(); stale generations simply expire.
+
+        With the disk tier, the generation is also recorded on disk, so
+        entries kept there stay addressable while Redis is bypassed and
+        after Redis lost the counter (flush or restart without persistence).
+        """
+        key = self._namespace_key(namespace)
+        if not self.available:
+            return await self._disk_generation(key)
+
+        use_local = self._local_active
+        if use_local:
+            generation = self.local.get(key)
+            if generation is not None:
+                return generation
+
+        try:
+            seq = self._invalidation_seq
+            generation = int(await self._client(key).get(key) or 0)
+            if self.disk is not None:
+                generation = await self._sync_disk_generation(key, generation)
+            if use_local and seq == self._invalidation_seq:
+                self.local.set(key, generation, settings.REDIS_TTL)
+            return generation
+        except Exception as e:
+            self._record_failure(e)
+            logger.error(f"Cache namespace error for '{namespace}': {e}")
+            return await self._disk_generation(key)
+
+    async def _disk_generation(self, key: str) -> int:
+        """Return the namespace generation last recorded on disk."""
+        if self.disk is None:
+            return 0
+        entry = await self._disk_call("get", key, self.disk.get, key)
+        return int(entry[0]) if entry else 0
+
+    async def _sync_disk_generation(self, key: str, generation: int) -> int:
+        """Record a generation read from Redis, or restore a lost one from disk."""
+        if generation == 0:
+            recorded = await self._disk_generation(key)
+            if recorded:
+                client = self._client(key)
+                await client.set(key, recorded, nx=True)
+                return int(await client.get(key) or 0)
+        elif self._disk_generations.get(key) != generation:
+            await self._disk_set(key, str(generation).encode(), _DISK_GENERATION_TTL)
+            self._disk_generations[key] = generation
+        return generation
+
+    async def bump_namespace(self, namespace: str, record: Optional[bool] = None) -> int:
+        """
+        Invalidate every key of a namespace in O(1).
+
+        record counts the bump toward adaptive TTLs; see invalidate().
+        """
+        key = self._namespace_key(namespace)
+        if _records(record):
+            await self._record_invalidations((), [key])
+        if not self.available:
+            return 0
+
+        try:
+            if self.local is not None:
+                self.local.delete(key)
+            generation = await self._client(key).incr(key)
+            await self._publish_invalidation(keys=[key])
+            if self.disk is not None:
+                await self._sync_disk_generation(key, generation)
+            return generation
+        except Exception as e:
+            self._record_failure(e)
+            logger.error(f"Cache namespace bump error for '{namespace}': {e}")
+            return 0
+
+    async def acquire_lock(self, name: str, ttl: int) -> Optional[str]:
+        """
+        Try to acquire a short-lived distributed lock.
+
+        Returns:
+            Lock token to pass to release_lock(), or None if the lock is held
+            elsewhere or Redis is unavailable
+        """
+        if not self.available:
+            return None
+
+        token = uuid.uuid4().hex
+        try:
+            key = self._lock_key(name)
+            if await self._client(key).set(key, token, nx=True, ex=ttl):
+                return token
+            return None
+        except Exception as e:
+            self._record_failure(e)
+            logger.error(f"Cache lock error for '{name}': {e}")
+            return None
+
+    async def release_lock(self, name: str, token: str) -> bool:
+        """Release a lock if it is still held with the given token."""
+        if not self.available:
+            return False
+
+        try:
+            key = self._lock_key(name)
+            return bool(await self._client(key).eval(RELEASE_LOCK_SCRIPT, 1, key, token))
+        except Exception as e:
+            self._record_failure(e)
+            logger.error(f"Cache unlock error for '{name}': {e}")
+            return False
+
+    async def renew_lock(self, name: str, token: str, ttl: int) -> bool:
+        """Reset a lock's TTL; False if it is no longer held with the given token."""
+        if not self.available:
+            return False
+
+        try:
+            key = self._lock_key(name)
+            return bool(await self._client(key).eval(RENEW_LOCK_SCRIPT, 1, key, token, ttl))
+        except Exception as e:
+            self._record_failure(e)
+            logger.error(f"Cache lock renewal error for '{name}': {e}")
+            return False
+
+    def register_filter(self, name: str, loader: Callable[[], Awaitable[Iterable[Any]]]) -> None:
+        """
+        Keep a Bloom filter of existing IDs for might_contain().
+
+        The filter is built from loader() whenever the invalidation channel
+        is (re)subscribed, and kept current across workers by add_to_filter().
+        Must be called before connect().
+        """
+        self._filter_loaders[name] = loader
+
+    def might_contain(self, name: str, item: Any) -> bool:
+        """
+        Check an ID against a registered filter.
+
+        Returns False only if the ID definitely does not exist; True if it
+        may exist or the filter is not available.
+        """
+        bloom = self._filters.get(name)
+        if bloom is None or not self._subscribed or self.breaker.is_open:
+            return True
+        return item in bloom
+
+    async def add_to_filter(self, name: str, item: Any) -> None:
+        """Record a newly created ID in every worker's filter."""
+        if name not in self._filter_loaders:
+            return
+        bloom = self._filters.get(name)
+        if bloom is not None:
+            bloom.add(item)
+        if self.available:
+            await self._publish_invalidation(filter_items={name: [item]})
+
+    async def _rebuild_filters(self) -> None:
+        """Build every registered filter from its loader."""
+        for name, loader in self._filter_loaders.items():
+            try:
+                items = list(await loader())
+                # Leave headroom for creates until the next rebuild
+                capacity = max(2 * len(items), 1024)
+                self._filters[name] = await asyncio.to_thread(
+                    BloomFilter.from_items, items, capacity, settings.CACHE_FILTER_ERROR_RATE
+                )
+                logger.info(f"Built '{name}' membership filter with {len(items)} items")
+            except Exception as e:
+                self._filters.pop(name, None)
+                logger.error(f"Failed to build '{name}' membership filter: {e}")
+
     async def exists(self, key: str) -> bool:
         """Check if key exists in cache."""
-        if not self.enabled or not self.redis:
+        if not self.available:
             return False
 
         try:
-            return bool(await self.redis.exists(key))
+            return bool(await self._client(key).exists(key))
         except Exception as e:
+            self._record_failure(e)
             logger.error(f"Cache exists error for key '{key}': {e}")
             return False
 
     async def increment(self, key: str, amount: int = 1) -> int:
         """Increment counter."""
-        if not self.enabled or not self.redis:
+        if not self.available:
             return 0
 
         try:
-            return await self.redis.incrby(key, amount)
+            return await self._client(key).incrby(key, amount)
         except Exception as e:
+            self._record_failure(e)
             logger.error(f"Cache increment error for key '{key}': {e}")
             return 0
 
     async def get_ttl(self, key: str) -> int:
         """Get TTL for key."""
-        if not self.enabled or not self.redis:
+        if not self.available:
             return -1
 
         try:
-            return await self.redis.ttl(key)
+            return await self._client(key).ttl(key)
         except Exception as e:
+            self._record_failure(e)
             logger.error(f"Cache TTL error for key '{key}': {e}")
             return -1
 
+    def _queue_set(
+        self,
+        pipe: Any,
+        key: str,
+        data: bytes,
+        ttl: int,
+        tags: Optional[Iterable[str]],
+    ) -> None:
+        """Queue a SETEX and its tag registrations on a pipeline."""
+        pipe.setex(key, ttl, data)
+        for tag in tags or ():
+            tag_key = self._tag_key(tag)
+            pipe.sadd(tag_key, key)
+            # Tag sets live as long as their longest-lived member
+            pipe.expire(tag_key, ttl, nx=True)
+            pipe.expire(tag_key, ttl, gt=True)
+
+    def _queue_charge(self, pipe: Any, key: str, size: int) -> None:
+        """Queue the byte budget accounting of a write on a pipeline."""
+        prefix = key_prefix(key)
+        # Keys spread evenly over the nodes, and so does the budget
+        budget = settings.CACHE_PREFIX_BUDGETS[prefix] // len(self._clients())
+        pipe.eval(CHARGE_BUDGET_SCRIPT, 3, *self._budget_keys(prefix), key, size, budget)
+
+    async def stored_bytes(self) -> Dict[str, int]:
+        """
+        Return the bytes stored in Redis per key prefix with a byte budget.
+
+        Read from the budget accounting on every node, and exported as the
+        cache_stored_bytes gauge. Prefixes without a budget are not tracked.
+        """
+        if not self.available:
+            return {}
+
+        stored: Dict[str, int] = {}
+        try:
+            for prefix in settings.CACHE_PREFIX_BUDGETS:
+                budget_key = self._budget_keys(prefix)[0]
+                totals = await asyncio.gather(
+                    *(client.hget(budget_key, "total") for client in self._clients())
+                )
+                stored[prefix] = sum(int(total or 0) for total in totals)
+                CACHE_STORED_BYTES.labels(prefix).set(stored[prefix])
+        except Exception as e:
+            self._record_failure(e)
+            logger.error(f"Cache stored bytes error: {e}")
+        return stored
+
+    def _queue_touch(self, pipe: Any, key: str) -> None:
+        """Queue a recency update of a budgeted key on a pipeline."""
+        pipe.eval(TOUCH_BUDGET_SCRIPT, 3, *self._budget_keys(key_prefix(key)), key)
+
+    async def _drop_evicted(self, evicted: Iterable[Any]) -> set:
+        """Forget keys evicted to stay within a budget; returns them as str."""
+        keys = {_decode_key(key) for key in evicted}
+        if keys:
+            for key in keys:
+                CACHE_BUDGET_EVICTIONS.labels(key_prefix(key)).inc()
+            if self.local is not None:
+                self.local.delete_many(keys)
+            await self._publish_invalidation(keys=keys)
+        return keys
+
+    def _record_read(self, key: str) -> None:
+        if self.sketch is not None:
+            self.sketch.increment(key)
+
+    def admits(self, key: str, admission: bool = True) -> bool:
+        """Whether a write of key passes the admission policy."""
+        if not admission or self.sketch is None:
+            return True
+        if self.sketch.estimate(key) >= settings.CACHE_ADMISSION_MIN_FREQUENCY:
+            return True
+        CACHE_ADMISSION_REJECTIONS.labels(key_prefix(key)).inc()
+        return False
+
+    def register_ttl_family(
+        self, prefix: str, tags: Iterable[str] = (), namespace: Optional[str] = None
+    ) -> None:
+        """
+        Let the TTL of a key prefix follow invalidations of its tags and namespace.
+
+        Args:
+            prefix: Key prefix of the family, as passed to ttl_for()
+            tags: Tags or tag templates of its entries, e.g. "employee:{emp_no}";
+                only the part before the first ":" (the tag family) matters
+            namespace: Namespace its keys are built with
+        """
+        if self.ttl_policy is None:
+            return
+        sources = [self._tag_key(_tag_family(tag)) for tag in tags]
+        if namespace:
+            sources.append(self._namespace_key(namespace))
+        self.ttl_policy.register(prefix, sources)
+
+    async def ttl_for(self, prefix: str, default: int) -> int:
+        """
+        Return the TTL for new entries of a key prefix.
+
+        Families registered with register_ttl_family() get a TTL within
+        CACHE_ADAPTIVE_TTL_MIN..MAX from the recent invalidation rate of
+        their tags and namespace, as counted by all workers; others, and all
+        prefixes while adaptive TTLs are disabled, keep default. Without
+        Redis the counts last read are used.
+        """
+        if self.ttl_policy is None:
+            return default
+        sources = sorted(self.ttl_policy.sources(prefix))
+        if sources and self.available:
+            try:
+                started, *entries = await self._client(_TTL_RATES_KEY).hmget(
+                    _TTL_RATES_KEY, "started", *sources
+                )
+                if started is not None:
+                    counts = {}
+                    for source, entry in zip(sources, entries):
+                        count, at = entry.split() if entry else (0, time.time())
+                        counts[source] = (float(count), float(at))
+                    self.ttl_policy.load(counts, float(started))
+            except Exception as e:
+                self._record_failure(e)
+                logger.warning(f"Cache TTL rates read error for '{prefix}': {e}")
+        ttl = self.ttl_policy.ttl(prefix, default)
+        CACHE_TTL_SECONDS.labels(prefix).set(ttl)
+        return ttl
+
+    async def _record_invalidations(
+        self, tags: Iterable[str], namespace_keys: Iterable[str]
+    ) -> None:
+        """Count one invalidation per tag family and namespace."""
+        if self.ttl_policy is None:
+            return
+        sources = sorted({self._tag_key(_tag_family(tag)) for tag in tags}.union(namespace_keys))
+        if not sources:
+            return
+        # Locally too, for while Redis is unavailable
+        for source in sources:
+            self.ttl_policy.record(source)
+        if not self.available:
+            return
+        try:
+            await self._client(_TTL_RATES_KEY).eval(
+                RECORD_INVALIDATIONS_SCRIPT,
+                1,
+                _TTL_RATES_KEY,
+                time.time(),
+                self.ttl_policy.lifetime,
+                *sources,
+            )
+        except Exception as e:
+            self._record_failure(e)
+            logger.warning(f"Cache TTL rates write error for {sources}: {e}")
+
+    def _client(self, key: str) -> aioredis.Redis:
+        """Client of the node owning key."""
+        if self.ring is None:
+            return self.redis
+        return self.shards[self.ring.node_for(key)]
+
+    def _clients(self) -> List[aioredis.Redis]:
+        """Clients of every node."""
+        if self.ring is None:
+            return [self.redis]
+        return list(self.shards.values())
+
+    def _by_client(self, keys: Iterable[str]) -> List[Tuple[aioredis.Redis, List[str]]]:
+        """Group keys by the node owning them."""
+        if self.ring is None:
+            return [(self.redis, list(keys))]
+        groups: Dict[str, List[str]] = {}
+        for key in keys:
+            groups.setdefault(self.ring.node_for(key), []).append(key)
+        return [(self.shards[node], group) for node, group in groups.items()]
+
+    @staticmethod
+    def _node_name(pool: aioredis.ConnectionPool) -> str:
+        """Name a node by its address, so credentials can change without remapping keys."""
+        kwargs = pool.connection_kwargs
+        address = kwargs.get("path") or f"{kwargs.get('host')}:{kwargs.get('port', 6379)}"
+        return f"{address}/{kwargs.get('db', 0)}"
+
+    @staticmethod
+    def _budget_keys(prefix: str) -> tuple:
+        return f"budget:{prefix}", f"budget:{prefix}:size", f"budget:{prefix}:rank"
+
+    @staticmethod
+    def _tag_key(tag: str) -> str:
+        return f"tag:{tag}"
+
+    @staticmethod
+    def _namespace_key(namespace: str) -> str:
+        return f"ns:{namespace}"
+
+    @staticmethod
+    def _lock_key(name: str) -> str:
+        return f"lock:{name}"
+
+    @staticmethod
+    def _version_key(key: str) -> str:
+        # Must match 'ver:' in INVALIDATE_SCRIPT; outlives invalidation of the key
+        return f"ver:{key}"
+
+    @property
+    def available(self) -> bool:
+        """Whether cache operations currently go to Redis."""
+        return self.enabled and self.redis is not None and not self.breaker.is_open
+
+    @property
+    def _broadcasts(self) -> bool:
+        # Whether other workers keep copies (L1, or disk on other hosts) to invalidate
+        return self.local is not None or self.disk is not None
+
+    @property
+    def _local_active(self) -> bool:
+        return self.local is not None and self._subscribed and not self.breaker.is_open
+
+    def _record_failure(self, error: Exception) -> None:
+        """Count Redis failures towards opening the circuit breaker."""
+        if isinstance(error, _REDIS_FAILURES) and self.breaker.record_failure():
+            logger.warning(f"Bypassing Redis cache after repeated failures: {error}")
+            self._on_breaker_opened()
+
+    def _open_breaker(self) -> None:
+        if self.breaker.open():
+            self._on_breaker_opened()
+
+    def _on_breaker_opened(self) -> None:
+        CACHE_CIRCUIT_OPEN.set(1)
+        # Invalidations may be lost while Redis is unreachable
+        self._invalidation_seq += 1
+        if self.local is not None:
+            self.local.clear()
+        if self._probe_task is None or self._probe_task.done():
+            self._probe_task = asyncio.create_task(self._probe_until_healthy())
+
+    async def _probe_until_healthy(self) -> None:
+        """Ping Redis until every node answers, then stop bypassing it."""
+        while True:
+            await asyncio.sleep(settings.CACHE_BREAKER_PROBE_INTERVAL)
+            try:
+                await asyncio.gather(*(client.ping() for client in self._clients()))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.debug(f"Redis health probe failed: {e}")
+                continue
+
+            self.breaker.close()
+            CACHE_CIRCUIT_OPEN.set(0)
+            logger.info("Redis cache reachable again; re-enabling")
+            # Resubscribe so L1 and the filters restart from a clean state
+            if self._listener_tasks:
+                for task in self._listener_tasks:
+                    task.cancel()
+                self._start_listener()
+            return
+
+    def _start_listener(self) -> None:
+        self._listener_tasks = [
+            asyncio.create_task(self._listen_for_invalidations(client))
+            for client in self._clients()
+        ]
+
+    async def _publish_invalidation(
+        self,
+        keys: Optional[Iterable[str]] = None,
+        pattern: Optional[str] = None,
+        filter_items: Optional[Dict[str, list]] = None,
+    ) -> None:
+        """Tell other workers to drop L1 and disk entries or extend their filters."""
+        if not self._broadcasts and not filter_items:
+            return
+
+        message: dict = {"origin": self.instance_id}
+        if keys:
+            message["keys"] = list(keys)
+        if pattern:
+            message["pattern"] = pattern
+        if filter_items:
+            message["filters"] = filter_items
+
+        try:
+            await self.redis.publish(settings.CACHE_INVALIDATION_CHANNEL, json.dumps(message))
+        except Exception as e:
+            self._record_failure(e)
+            logger.error(f"Cache invalidation publish error: {e}")
+
+    def _apply_invalidation(self, message: dict) -> None:
+        """Apply an invalidation message to the local cache."""
+        if message.get("origin") == self.instance_id:
+            return
+        self.last_invalidation = time.monotonic()
+
+        for name, items in (message.get("filters") or {}).items():
+            bloom = self._filters.get(name)
+            if bloom is not None:
+                for item in items:
+                    bloom.add(item)
+
+        if self.disk is not None:
+            # The disk tier is shared per host; other hosts drop their copies here.
+            # Bumped namespace generations are recorded on disk, not deleted.
+            namespace_prefix = self._namespace_key("")
+            disk_keys = [
+                key for key in message.get("keys") or () if not key.startswith(namespace_prefix)
+            ]
+            if disk_keys or message.get("pattern"):
+                task = asyncio.create_task(self._disk_delete(disk_keys, message.get("pattern")))
+                self._disk_tasks.add(task)
+                task.add_done_callback(self._disk_tasks.discard)
+
+        if self.local is None:
+            return
+        self._invalidation_seq += 1
+        if message.get("keys"):
+            self.local.delete_many(message["keys"])
+        if message.get("pattern"):
+            self.local.delete_pattern(message["pattern"])
+
+    async def _listen_for_invalidations(self, client: aioredis.Redis) -> None:
+        """Consume invalidation messages published on one node."""
+        backoff = 1
+        while True:
+            pubsub = client.pubsub()
+            try:
+                await pubsub.subscribe(settings.CACHE_INVALIDATION_CHANNEL)
+                # Messages may have been missed while (re)subscribing
+                self._invalidation_seq += 1
+                if self.local is not None:
+                    self.local.clear()
+                self._subscriptions.add(client)
+                self._subscribed = len(self._subscriptions) == len(self._clients())
+                backoff = 1
+                # Filter additions are published on the first node only.
+                # Messages arriving meanwhile are buffered and applied after.
+                if client is self.redis:
+                    await self._rebuild_filters()
+                while True:
+                    # Wait with an explicit timeout; blocking reads would be cut
+                    # off by the per-command socket timeout
+                    message = await pubsub.get_message(timeout=1.0)
+                    if message is None or message.get("type") != "message":
+                        continue
+                    try:
+                        self._apply_invalidation(json.loads(message["data"]))
+                    except (TypeError, ValueError) as e:
+                        logger.warning(f"Ignoring malformed cache invalidation message: {e}")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._record_failure(e)
+                logger.error(f"Cache invalidation listener error: {e}")
+                # Without invalidations the L1 copies cannot be trusted
+                self._invalidation_seq += 1
+                if self.local is not None:
+                    self.local.clear()
+            finally:
+                self._subscriptions.discard(client)
+                self._subscribed = False
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 30)
+
 
 # Global cache instance
 cache_manager = CacheManager()
@@ -150,52 +1479,148 @@ async def close_cache() -> None:
     await cache_manager.disconnect()
 
 
-def cached(
+# Parameters of these types are injected by FastAPI and never part of a key
+_INJECTED_TYPES = (AsyncSession, Request, Response, BackgroundTasks)
+
+# Parameter strings longer than this are replaced by their hash
+MAX_KEY_PARAMS_LENGTH = 128
+
+
+# Fragment of None, which no escaped value can produce
+_NONE_FRAGMENT = "~"
+
+# Percent-encodes the characters that separate fragments, list items,
+# hashed parameters and namespace generations, and the escape character
+_KEY_ESCAPES = str.maketrans({char: f"%{ord(char):02X}" for char in "%:,#@~"})
+
+_KEY_COLLECTIONS = (list, tuple, set, frozenset)
+
+
+class _Unkeyable(Exception):
+    """Raised for argument values that cannot be part of a cache key."""
+
+
+def _normalize_key_value(value: Any) -> str:
+    """
+    Render an argument value as a stable cache key fragment.
+
+    Fragments are unambiguous: separators inside values are escaped and
+    None differs from "", so distinct arguments never share a key.
+    """
+    if value is None:
+        return _NONE_FRAGMENT
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, enum.Enum):
+        return _normalize_key_value(value.value)
+    if isinstance(value, str):
+        return value.translate(_KEY_ESCAPES)
+    if isinstance(value, int):
+        return str(value)
+    if isinstance(value, float):
+        return repr(value)
+    if isinstance(value, Decimal):
+        return str(value.normalize())
+    if isinstance(value, date):
+        # Datetimes contain ":"
+        return value.isoformat().translate(_KEY_ESCAPES)
+    if isinstance(value, uuid.UUID):
+        return value.hex
+    if isinstance(value, _KEY_COLLECTIONS):
+        items = []
+        for item in value:
+            fragment = _normalize_key_value(item)
+            if isinstance(item, _KEY_COLLECTIONS):
+                # The "," of nested collections is escaped once more
+                fragment = fragment.translate(_KEY_ESCAPES)
+            items.append(fragment)
+        return ",".join(sorted(items) if isinstance(value, (set, frozenset)) else items)
+    raise _Unkeyable(type(value).__name__)
+
+
+def _is_injected(parameter: inspect.Parameter, value: Any) -> bool:
+    """Check whether a parameter is supplied by dependency injection."""
+    if isinstance(parameter.default, (Depends, Security)):
+        return True
+    annotation = parameter.annotation
+    if inspect.isclass(annotation) and issubclass(annotation, _INJECTED_TYPES):
+        return True
+    return isinstance(value, _INJECTED_TYPES)
+
+
+def bind_arguments(signature: inspect.Signature, args: tuple, kwargs: dict) -> Dict[str, Any]:
+    """
+    Bind call arguments to a signature with defaults applied.
+
+    FastAPI parameter markers such as Query(20) used as defaults are
+    replaced by their actual default values.
+    """
+    bound = signature.bind_partial(*args, **kwargs)
+    bound.apply_defaults()
+    arguments = {}
+    for name, value in bound.arguments.items():
+        if isinstance(value, FieldInfo) and not isinstance(value, (Depends, Security)):
+            value = value.get_default(call_default_factory=True)
+        arguments[name] = value
+    return arguments
+
+
+def build_cache_key(
     key_prefix: str,
-    ttl: Optional[int] = None,
-    key_builder: Optional[Callable] = None,
-):
+    signature: inspect.Signature,
+    args: tuple,
+    kwargs: dict,
+) -> str:
     """
-    Decorator for caching function results.
+    Build a deterministic cache key from a call.
 
-    Args:
-        key_prefix: Prefix for cache key
-        ttl: Time to live in seconds
-        key_builder: Custom function to build cache key
+    Arguments are bound to the signature so positional, keyword and
+    defaulted calls produce the same key. Dependency-injected parameters
+    (sessions, requests, Depends()) and values without a stable
+    representation are skipped. Long parameter lists are hashed.
 
     Example:
-        @cached(key_prefix="employee", ttl=300)
-        async def get_employee(emp_id: int):
-            return await db.get_employee(emp_id)
+        get_employee(10001, db=session) -> "employee:10001"
+        get_title_distribution(dept_no=None) -> "analytics_title_dist:~"
     """
+    arguments = bind_arguments(signature, args, kwargs)
 
-    def decorator(func: Callable):
-        @wraps(func)
-        async def wrapper(*args, **kwargs):
-            # Build cache key
-            if key_builder:
-                cache_key = key_builder(*args, **kwargs)
-            else:
-                params = "_".join(str(arg) for arg in args)
-                params += "_".join(f"{k}={v}" for k, v in kwargs.items())
-                cache_key = f"{key_prefix}:{params}"
+    fragments = []
+    for name, value in arguments.items():
+        parameter = signature.parameters[name]
+        if parameter.kind in (parameter.VAR_POSITIONAL, parameter.VAR_KEYWORD):
+            continue
+        if _is_injected(parameter, value):
+            continue
+        try:
+            fragments.append(_normalize_key_value(value))
+        except _Unkeyable as e:
+            logger.debug(f"Skipping unkeyable parameter '{name}' ({e}) for {key_prefix}")
 
-            # Try to get from cache
-            cached_value = await cache_manager.get(cache_key)
-            if cached_value is not None:
-                logger.debug(f"Cache hit for key: {cache_key}")
-                return cached_value
+    params = ":".join(fragments)
+    if len(params) > MAX_KEY_PARAMS_LENGTH:
+        params = "#" + hashlib.sha1(params.encode("utf-8")).hexdigest()
 
-            # Execute function
-            result = await func(*args, **kwargs)
+    return f"{key_prefix}:{params}" if params else key_prefix
 
-            # Store in cache
-            if result is not None:
-                await cache_manager.set(cache_key, result, ttl)
-                logger.debug(f"Cache set for key: {cache_key}")
 
-            return result
+# Commit position the reads of a running cache fill must see, None outside
+# fills; see fill_position() in app/core/database.py
+filling_cache: ContextVar[Optional[int]] = ContextVar("filling_cache", default=None)
 
-        return wrapper
 
-    return decorator
+@asynccontextmanager
+async def cache_fill() -> AsyncIterator[None]:
+    """
+    Mark the reads made inside the block as computing a cached value.
+
+    They must see every commit made before the block started, by whichever
+    worker, so that a change that was already invalidated is not cached again.
+    """
+    from app.core.database import fill_position
+
+    token = filling_cache.set(await fill_position())
+    try:
+        yield
+    finally:
+        filling_cache.reset(token)
@@ -0,0 +1,916 @@
+"""
+Cache Decorator
+cached() and reject_unknown() for endpoint functions, storing their results
+through the shared CacheManager
+"""
+
+import asyncio
+import gzip
+import hashlib
+import inspect
+import json
+import time
+from dataclasses import dataclass, replace
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from functools import partial, wraps
+import orjson
+from fastapi import HTTPException, Request, Response, status
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.core.logging import logger
+from app.utils.cache import bind_arguments, build_cache_key, cache_fill, cache_manager
+from app.utils.conditional import http_date, is_not_modified, not_modified
+from app.utils.cache_metrics import CACHE_RECOMPUTE_SECONDS, key_prefix
+
+
+# Computations in flight in this process, by cache key
+_inflight: Dict[str, asyncio.Future] = {}
+
+_MISSING = object()
+
+
+async def _single_flight(key: str, compute: Callable) -> Any:
+    """
+    Run compute() once per key at a time within this process.
+
+    Concurrent callers for the same key await the first caller's result
+    (or exception) instead of starting their own computation.
+    """
+    future = _inflight.get(key)
+    if future is not None:
+        try:
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            if not future.cancelled():
+                raise
+            # The leading request was cancelled; take over
+            return await _single_flight(key, compute)
+
+    future = asyncio.get_running_loop().create_future()
+    # Avoid "exception was never retrieved" warnings when nobody waits
+    future.add_done_callback(lambda f: f.cancelled() or f.exception())
+    _inflight[key] = future
+    try:
+        result = await compute()
+    except asyncio.CancelledError:
+        future.cancel()
+        raise
+    except Exception as e:
+        future.set_exception(e)
+        raise
+    else:
+        future.set_result(result)
+        return result
+    finally:
+        if _inflight.get(key) is future:
+            del _inflight[key]
+
+
+@dataclass
+class CachedResponse:
+    """
+    A fully encoded HTTP response body as stored by cached(response=True).
+
+    Hits are sent to the client as-is, skipping response model validation
+    and JSON encoding.
+    """
+
+    body: bytes
+    etag: str
+    media_type: str = "application/json"
+    encoding: Optional[str] = None
+    fresh_until: Optional[float] = None
+    status_code: int = 200
+    last_modified: Optional[str] = None
+
+    @classmethod
+    def from_content(
+        cls,
+        content: Any,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+    ) -> "CachedResponse":
+        """
+        Encode content the way ORJSONResponse would, gzipping large bodies.
+
+        The ETag defaults to a hash of the body.
+        """
+        body = orjson.dumps(
+            jsonable_encoder(content),
+            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY,
+        )
+        etag = etag or f'"{hashlib.sha1(body).hexdigest()}"'
+        encoding = None
+        if len(body) >= settings.CACHE_RESPONSE_GZIP_MIN_SIZE:
+            body = gzip.compress(body, compresslevel=6)
+            encoding = "gzip"
+        return cls(body=body, etag=etag, encoding=encoding, last_modified=last_modified)
+
+    def pack(self) -> bytes:
+        """Serialize as a JSON metadata line followed by the body."""
+        meta = {
+            "etag": self.etag,
+            "media_type": self.media_type,
+            "encoding": self.encoding,
+            "fresh_until": self.fresh_until,
+            "status_code": self.status_code,
+            "last_modified": self.last_modified,
+        }
+        return json.dumps(meta).encode("utf-8") + b"\n" + self.body
+
+    @classmethod
+    def unpack(cls, data: bytes) -> "CachedResponse":
+        """Inverse of pack()."""
+        meta, body = data.split(b"\n", 1)
+        return cls(body=body, **json.loads(meta))
+
+    def content(self) -> Any:
+        """Decode the body back to its JSON content."""
+        body = gzip.decompress(self.body) if self.encoding == "gzip" else self.body
+        return orjson.loads(body)
+
+    def to_response(self, request: Optional[Request] = None) -> Response:
+        """
+        Build a response, decompressing only for clients without gzip.
+
+        Conditional requests matching the stored validators get a 304.
+        """
+        if self.status_code == status.HTTP_200_OK and is_not_modified(
+            request, self.etag, self.last_modified
+        ):
+            return not_modified(self.etag, self.last_modified)
+
+        headers = {"ETag": self.etag}
+        if self.last_modified:
+            headers["Last-Modified"] = self.last_modified
+        body = self.body
+        if self.encoding == "gzip":
+            headers["Vary"] = "Accept-Encoding"
+            accepts_gzip = request is not None and "gzip" in request.headers.get(
+                "accept-encoding", ""
+            )
+            if accepts_gzip:
+                headers["Content-Encoding"] = "gzip"
+            else:
+                body = gzip.decompress(body)
+        return Response(
+            content=body,
+            status_code=self.status_code,
+            media_type=self.media_type,
+            headers=headers,
+        )
+
+
+@dataclass
+class _NotFound:
+    """A cached 404 for a lookup; see cached(negative_ttl=...)."""
+
+    detail: Any
+
+
+# Field marking negative entries stored as plain values
+_NOT_FOUND_FIELD = "__not_found__"
+
+
+class _ValueEntries:
+    """Stores decorated function results as JSON values."""
+
+    def __init__(self, disk: bool = False):
+        self.disk = disk
+
+    async def load(self, cache_key: str) -> Optional[tuple]:
+        """Return (value, is_fresh) or None on a miss."""
+        try:
+            entry = await cache_manager.get(cache_key, disk=self.disk)
+        except Exception as e:
+            logger.error(f"Cache lookup failed for key '{cache_key}': {e}")
+            return None
+        return self._parse(entry)
+
+    async def load_many(self, cache_keys: List[str]) -> Dict[str, tuple]:
+        """Return (value, is_fresh) by key for the keys found, in one round trip."""
+        found = await cache_manager.get_many(cache_keys)
+        return {key: self._parse(entry) for key, entry in found.items()}
+
+    @staticmethod
+    def _parse(entry: Any) -> Optional[tuple]:
+        if entry is None:
+            return None
+        if isinstance(entry, dict) and _NOT_FOUND_FIELD in entry:
+            return _NotFound(entry[_NOT_FOUND_FIELD]), True
+        if isinstance(entry, dict) and "fresh_until" in entry:
+            return entry.get("value"), entry["fresh_until"] > time.time()
+        # Entries written without a soft expiry are fresh until Redis drops them
+        return entry, True
+
+    def encode(self, result: Any) -> Any:
+        """Convert a function result to its cached form."""
+        return jsonable_encoder(result)
+
+    def content(self, value: Any) -> Any:
+        """Convert a cached value to the JSON form of the function result."""
+        return value
+
+    async def save(
+        self,
+        cache_key: str,
+        value: Any,
+        ttl: Optional[int],
+        tags: Optional[list],
+        fresh_for: Optional[float] = None,
+        version: Optional[int] = None,
+        admission: bool = False,
+    ) -> bool:
+        """
+        Store value; fresh_for marks it stale after that many seconds.
+
+        See CacheManager.set() for version, admission and the return value.
+        """
+        if fresh_for is not None:
+            value = {"value": value, "fresh_until": time.time() + fresh_for}
+        return await cache_manager.set(
+            cache_key,
+            value,
+            ttl=ttl,
+            tags=tags,
+            version=version,
+            admission=admission,
+            disk=self.disk,
+        )
+
+    async def save_many(
+        self,
+        values: Dict[str, Any],
+        ttl: Optional[int],
+        tags: Dict[str, list],
+        versions: Dict[str, int],
+        fresh_for: Optional[float] = None,
+    ) -> bool:
+        """Store several values in one round trip; not kept in the disk tier."""
+        if fresh_for is not None:
+            fresh_until = time.time() + fresh_for
+            values = {
+                key: {"value": value, "fresh_until": fresh_until} for key, value in values.items()
+            }
+        return await cache_manager.set_many(values, ttl=ttl, tags=tags, versions=versions)
+
+    async def save_not_found(
+        self,
+        cache_key: str,
+        detail: Any,
+        ttl: int,
+        tags: Optional[list],
+        version: Optional[int] = None,
+    ) -> None:
+        """Store a negative entry for a lookup that raised a 404."""
+        await cache_manager.set(
+            cache_key, {_NOT_FOUND_FIELD: detail}, ttl=ttl, tags=tags, version=version
+        )
+
+    def output(self, value: Any, request: Optional[Request]) -> Any:
+        """Convert a cached value to the decorated function's return value."""
+        return value
+
+
+class _ResponseEntries(_ValueEntries):
+    """Stores decorated function results as encoded response bodies."""
+
+    def __init__(
+        self,
+        etag: Optional[Callable[[Any], str]] = None,
+        last_modified: Optional[Callable[[Any], Optional[datetime]]] = None,
+        disk: bool = False,
+    ):
+        super().__init__(disk)
+        self.etag = etag
+        self.last_modified = last_modified
+
+    async def load(self, cache_key: str) -> Optional[tuple]:
+        try:
+            data = await cache_manager.get_raw(cache_key, disk=self.disk)
+            if data is None:
+                return None
+            entry = CachedResponse.unpack(data)
+        except Exception as e:
+            logger.error(f"Cache lookup failed for key '{cache_key}': {e}")
+            return None
+        return self._parse(entry)
+
+    async def load_many(self, cache_keys: List[str]) -> Dict[str, tuple]:
+        found = {}
+        for key, data in (await cache_manager.get_many_raw(cache_keys)).items():
+            try:
+                found[key] = self._parse(CachedResponse.unpack(data))
+            except Exception as e:
+                logger.error(f"Cache lookup failed for key '{key}': {e}")
+        return found
+
+    @staticmethod
+    def _parse(entry: CachedResponse) -> tuple:
+        if entry.status_code == status.HTTP_404_NOT_FOUND:
+            return _NotFound(orjson.loads(entry.body)["detail"]), True
+        return entry, entry.fresh_until is None or entry.fresh_until > time.time()
+
+    def encode(self, result: Any) -> CachedResponse:
+        return CachedResponse.from_content(
+            result,
+            etag=self.etag(result) if self.etag else None,
+            last_modified=http_date(self.last_modified(result)) if self.last_modified else None,
+        )
+
+    def content(self, value: CachedResponse) -> Any:
+        return value.content()
+
+    async def save(
+        self,
+        cache_key: str,
+        value: CachedResponse,
+        ttl: Optional[int],
+        tags: Optional[list],
+        fresh_for: Optional[float] = None,
+        version: Optional[int] = None,
+        admission: bool = False,
+    ) -> bool:
+        if fresh_for is not None:
+            value = replace(value, fresh_until=time.time() + fresh_for)
+        return await cache_manager.set_raw(
+            cache_key,
+            value.pack(),
+            ttl=ttl,
+            tags=tags,
+            version=version,
+            admission=admission,
+            disk=self.disk,
+        )
+
+    async def save_many(
+        self,
+        values: Dict[str, CachedResponse],
+        ttl: Optional[int],
+        tags: Dict[str, list],
+        versions: Dict[str, int],
+        fresh_for: Optional[float] = None,
+    ) -> bool:
+        if fresh_for is not None:
+            fresh_until = time.time() + fresh_for
+            values = {key: replace(value, fresh_until=fresh_until) for key, value in values.items()}
+        return await cache_manager.set_many_raw(
+            {key: value.pack() for key, value in values.items()},
+            ttl=ttl,
+            tags=tags,
+            versions=versions,
+        )
+
+    async def save_not_found(
+        self,
+        cache_key: str,
+        detail: Any,
+        ttl: int,
+        tags: Optional[list],
+        version: Optional[int] = None,
+    ) -> None:
+        entry = CachedResponse(
+            body=orjson.dumps({"detail": detail}),
+            etag="",
+            status_code=status.HTTP_404_NOT_FOUND,
+        )
+        await cache_manager.set_raw(cache_key, entry.pack(), ttl=ttl, tags=tags, version=version)
+
+    def output(self, value: CachedResponse, request: Optional[Request]) -> Response:
+        return value.to_response(request)
+
+
+async def _wait_for_value(cache_key: str, entries: _ValueEntries, timeout: float) -> Any:
+    """Poll the cache for a value another worker is computing."""
+    deadline = time.monotonic() + timeout
+    delay = 0.025
+    while time.monotonic() < deadline and cache_manager.available:
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, 0.25)
+        loaded = await entries.load(cache_key)
+        if loaded is not None and loaded[1]:
+            return loaded[0]
+    return _MISSING
+
+
+def _new_session(timeout: float) -> AsyncSession:
+    """Open a database session for reads that is not tied to a request."""
+    from app.core.database import ReadSessionLocal, begin_deadline
+
+    # A budget of its own, not what is left of the request that spawned it
+    begin_deadline(timeout)
+    return ReadSessionLocal()
+
+
+def _request_budget() -> float:
+    """Return the query budget of the current request's route; see current_budget()."""
+    from app.core.database import current_budget
+
+    return current_budget()
+
+
+async def _refresh_in_background(
+    cache_key: str,
+    func: Callable,
+    signature: inspect.Signature,
+    args: tuple,
+    kwargs: dict,
+    store: Callable,
+    extend: Callable,
+    timeout: float,
+) -> None:
+    """
+    Recompute a stale entry outside the request.
+
+    The request's database session is closed by the time this runs, so
+    session arguments are replaced with a fresh one, whose statements get
+    timeout seconds: the budget of the route that scheduled the refresh.
+    Failures keep serving the stale value for another retry interval
+    instead of raising.
+    """
+    token = await cache_manager.acquire_lock(cache_key, settings.CACHE_LOCK_TTL)
+    if token is None:
+        # Another worker is already refreshing this key
+        return
+
+    try:
+        async with _new_session(timeout) as session:
+            arguments = bind_arguments(signature, args, kwargs)
+            for name, value in arguments.items():
+                if isinstance(value, AsyncSession):
+                    arguments[name] = session
+            with CACHE_RECOMPUTE_SECONDS.labels(key_prefix(cache_key)).time():
+                async with cache_fill():
+                    result = await func(**arguments)
+        await store(result)
+        logger.debug(f"Refreshed stale cache key: {cache_key}")
+    except Exception as e:
+        logger.warning(f"Background refresh failed for key '{cache_key}': {e}")
+        await extend()
+    finally:
+        await cache_manager.release_lock(cache_key, token)
+
+
+# Background refresh tasks, keyed by cache key
+_refreshing: Dict[str, asyncio.Task] = {}
+
+
+def _schedule_refresh(cache_key: str, refresh: Callable) -> None:
+    """Start a background refresh unless one is already running here."""
+    if cache_key in _refreshing:
+        return
+    task = asyncio.create_task(refresh())
+    _refreshing[cache_key] = task
+    task.add_done_callback(lambda _: _refreshing.pop(cache_key, None))
+
+
+def _find_request(args: tuple, kwargs: dict) -> Optional[Request]:
+    """Find the incoming request among a call's arguments, if any."""
+    for value in (*args, *kwargs.values()):
+        if isinstance(value, Request):
+            return value
+    return None
+
+
+@dataclass
+class _CacheSpec:
+    """How cached() stores the results of one decorated function."""
+
+    func: Callable
+    signature: inspect.Signature
+    entries: _ValueEntries
+    key_prefix: str
+    key_builder: Optional[Callable]
+    tags: Optional[Iterable[str]]
+    namespace: Optional[str]
+    lock: bool
+    fresh_ttl: int
+    hard_ttl: Optional[int]
+    stale_ttl: Optional[int]
+    swr: bool
+    negative_ttl: Optional[int]
+    version: Optional[Callable[[Any], int]]
+    admission: bool
+    disk: bool
+    adaptive_ttl: bool
+
+    @property
+    def stale_aware(self) -> bool:
+        return self.stale_ttl is not None
+
+    async def entry_ttls(self) -> tuple:
+        """Return (hard TTL, soft TTL) for a new entry."""
+        if not self.adaptive_ttl:
+            return self.hard_ttl, self.fresh_ttl
+        fresh = await cache_manager.ttl_for(self.key_prefix, self.fresh_ttl)
+        return (fresh + self.stale_ttl if self.stale_aware else fresh), fresh
+
+    def generation_key(self, base_key: str, generation: int) -> str:
+        return f"{base_key}@{self.namespace}.{generation}"
+
+    def last_generation_key(self, base_key: str) -> str:
+        # Points at the newest generation of base_key holding a value
+        return f"{base_key}@{self.namespace}"
+
+
+@dataclass
+class _CacheCall:
+    """The cache entry of one call of a cached() function."""
+
+    args: tuple
+    kwargs: dict
+    base_key: str
+    cache_key: str
+    generation: int
+    tags: Optional[list]
+
+
+async def _resolve_call(spec: _CacheSpec, args: tuple, kwargs: dict) -> _CacheCall:
+    """Build the key, namespace generation and tags of a call."""
+    if spec.key_builder:
+        base_key = spec.key_builder(*args, **kwargs)
+    else:
+        base_key = build_cache_key(spec.key_prefix, spec.signature, args, kwargs)
+
+    cache_key = base_key
+    generation = 0
+    if spec.namespace:
+        generation = await cache_manager.namespace_generation(spec.namespace)
+        cache_key = spec.generation_key(base_key, generation)
+
+    entry_tags = None
+    if spec.tags:
+        arguments = bind_arguments(spec.signature, args, kwargs)
+        entry_tags = [tag.format(**arguments) for tag in spec.tags]
+    return _CacheCall(args, kwargs, base_key, cache_key, generation, entry_tags)
+
+
+async def _save_result(spec: _CacheSpec, call: _CacheCall, result: Any, admit: bool = False) -> Any:
+    """Store a computed result and return its cached form."""
+    if result is None:
+        return None
+    value = spec.entries.encode(result)
+    entry_ttl, fresh_for = await spec.entry_ttls()
+    saved = await spec.entries.save(
+        call.cache_key,
+        value,
+        ttl=entry_ttl,
+        tags=call.tags,
+        fresh_for=fresh_for if spec.stale_aware else None,
+        version=spec.version(result) if spec.version else None,
+        admission=admit,
+    )
+    if saved and spec.swr and spec.namespace:
+        await cache_manager.set(
+            spec.last_generation_key(call.base_key), call.generation, ttl=entry_ttl, disk=spec.disk
+        )
+    logger.debug(f"Cache set for key: {call.cache_key}")
+    return value
+
+
+async def _load_many(spec: _CacheSpec, calls: List[dict]) -> Dict[int, Any]:
+    """
+    Look up several calls, given by keyword arguments, in one round trip.
+
+    Returns the JSON form of the fresh results found by call position,
+    None for cached 404s.
+    """
+    resolved = [await _resolve_call(spec, (), call) for call in calls]
+    loaded = await spec.entries.load_many([call.cache_key for call in resolved])
+    found = {}
+    for index, call in enumerate(resolved):
+        entry = loaded.get(call.cache_key)
+        if entry is None or not entry[1]:
+            continue
+        value = entry[0]
+        found[index] = None if isinstance(value, _NotFound) else spec.entries.content(value)
+    return found
+
+
+async def _save_many(spec: _CacheSpec, results: List[Tuple[Any, dict]]) -> None:
+    """Store several (result, keyword arguments) pairs in one round trip."""
+    values: Dict[str, Any] = {}
+    entry_tags: Dict[str, list] = {}
+    versions: Dict[str, int] = {}
+    pointers: Dict[str, int] = {}
+    for result, arguments in results:
+        if result is None:
+            continue
+        call = await _resolve_call(spec, (), arguments)
+        values[call.cache_key] = spec.entries.encode(result)
+        if call.tags:
+            entry_tags[call.cache_key] = call.tags
+        if spec.version:
+            versions[call.cache_key] = spec.version(result)
+        if spec.swr and spec.namespace:
+            pointers[spec.last_generation_key(call.base_key)] = call.generation
+    if not values:
+        return
+
+    entry_ttl, fresh_for = await spec.entry_ttls()
+    await spec.entries.save_many(
+        values,
+        ttl=entry_ttl,
+        tags=entry_tags,
+        versions=versions,
+        fresh_for=fresh_for if spec.stale_aware else None,
+    )
+    if pointers:
+        await cache_manager.set_many(pointers, ttl=entry_ttl)
+
+
+async def _load_entry(spec: _CacheSpec, call: _CacheCall) -> tuple:
+    """Return (value, is_fresh) for a call, the value being _MISSING on a miss."""
+    loaded = await spec.entries.load(call.cache_key)
+    if loaded is not None:
+        return loaded
+    if spec.swr and call.generation > 0:
+        # Fall back to the value from before the last invalidations. A
+        # write can bump the namespace more than once (the API and the
+        # change feed both do), so generation - 1 may never have been
+        # computed.
+        last = await cache_manager.get(spec.last_generation_key(call.base_key), disk=spec.disk)
+        if isinstance(last, int) and last < call.generation:
+            loaded = await spec.entries.load(spec.generation_key(call.base_key, last))
+        if loaded is not None:
+            return loaded[0], False
+    return _MISSING, False
+
+
+def _serve_stale(spec: _CacheSpec, call: _CacheCall, stale: Any) -> None:
+    """Refresh a stale entry in the background while it is being served."""
+
+    async def extend():
+        # Keep serving the stale value until the next retry
+        retry = min(settings.CACHE_SWR_RETRY_INTERVAL, spec.fresh_ttl)
+        await spec.entries.save(
+            call.cache_key,
+            stale,
+            ttl=retry + spec.stale_ttl,
+            tags=call.tags,
+            fresh_for=retry,
+        )
+
+    logger.debug(f"Serving stale value for key: {call.cache_key}")
+    budget = _request_budget()
+    store = partial(_save_result, spec, call, admit=spec.admission)
+    _schedule_refresh(
+        call.cache_key,
+        lambda: _refresh_in_background(
+            call.cache_key, spec.func, spec.signature, call.args, call.kwargs, store, extend, budget
+        ),
+    )
+
+
+async def _compute_entry(spec: _CacheSpec, call: _CacheCall, stale: Any) -> Any:
+    """
+    Compute and store a call's result, returning its cached form.
+
+    With spec.lock, a worker that finds another recomputing the key
+    returns the stale value if any, or waits for the other's result.
+    """
+    token = None
+    if spec.lock:
+        token = await cache_manager.acquire_lock(call.cache_key, settings.CACHE_LOCK_TTL)
+        if token is None and cache_manager.available:
+            # Another worker is recomputing this key
+            if stale is not _MISSING:
+                logger.debug(f"Serving stale value for key: {call.cache_key}")
+                return stale
+            value = await _wait_for_value(call.cache_key, spec.entries, settings.CACHE_LOCK_WAIT)
+            if value is not _MISSING:
+                return value
+
+    try:
+        # Execute function
+        with CACHE_RECOMPUTE_SECONDS.labels(spec.key_prefix).time():
+            async with cache_fill():
+                result = await spec.func(*call.args, **call.kwargs)
+        return await _save_result(spec, call, result, spec.admission)
+    except HTTPException as e:
+        if spec.negative_ttl and e.status_code == status.HTTP_404_NOT_FOUND:
+            # Row versions start at 1, so the watermark of an insert fences
+            # out a miss that looked the row up before it
+            await spec.entries.save_not_found(
+                call.cache_key,
+                e.detail,
+                spec.negative_ttl,
+                call.tags,
+                version=0 if spec.version else None,
+            )
+        raise
+    finally:
+        if token:
+            await cache_manager.release_lock(call.cache_key, token)
+
+
+def _respond(entries: _ValueEntries, value: Any, request: Optional[Request]) -> Any:
+    """Return a cached value from the decorated function, raising cached 404s."""
+    if isinstance(value, _NotFound):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=value.detail)
+    return entries.output(value, request)
+
+
+def cached(
+    key_prefix: str,
+    ttl: Optional[int] = None,
+    key_builder: Optional[Callable] = None,
+    tags: Optional[Iterable[str]] = None,
+    namespace: Optional[str] = None,
+    lock: bool = False,
+    stale_ttl: Optional[int] = None,
+    swr: bool = False,
+    response: bool = False,
+    negative_ttl: Optional[int] = None,
+    etag: Optional[Callable[[Any], str]] = None,
+    last_modified: Optional[Callable[[Any], Optional[datetime]]] = None,
+    version: Optional[Callable[[Any], int]] = None,
+    admission: bool = False,
+    disk: bool = False,
+    adaptive_ttl: bool = False,
+):
+    """
+    Decorator for caching function results.
+
+    Concurrent misses for the same key within a process share a single
+    computation. With lock=True a short Redis lock also lets only one
+    worker recompute; the others wait up to CACHE_LOCK_WAIT seconds for its
+    result, or return the stale value if one is kept (see stale_ttl).
+
+    With swr=True (stale-while-revalidate) the entry is fresh for ttl
+    seconds (soft TTL) and kept until ttl + stale_ttl (hard TTL). In
+    between, the stale value is returned immediately and refreshed in a
+    background task. After namespace bumps the value of the last generation
+    that was stored is served the same way, however many bumps ago that was.
+
+    With response=True the final JSON body is cached (gzipped when large)
+    together with its ETag, and the endpoint returns a Response built from
+    those bytes. Declare a ``request: Request`` parameter so gzipped bodies
+    can be sent to clients that accept them without recompression, and so
+    If-None-Match / If-Modified-Since can be answered with a 304 from the
+    cache entry alone. The ETag defaults to a hash of the body; pass etag
+    (e.g. entity_etag) and last_modified to derive them from the result.
+
+    With negative_ttl set, a 404 HTTPException raised by the function is
+    cached for that many seconds under the same key and tags, and raised
+    again on hits. Creates must invalidate the tag of the new key.
+
+    The decorated function gets a write_through(result, *args, **kwargs)
+    method that stores a result the caller already has, e.g. the refreshed
+    row after an update, under the key and tags of that call. With version
+    set (e.g. attrgetter("version")) every write is guarded by the row
+    version, so neither a slow concurrent writer nor a miss that read the
+    row earlier can replace a newer cached result with an older one. Pass
+    every committed version to CacheManager.invalidate(versions=...) under
+    the cache key of the call, e.g. {"employee:10001": 3}, to fence out
+    fills that read the row before the commit and to keep the write-through.
+
+    Batch endpoints can share the entries of a single-item endpoint through
+    get_many(calls) and write_through_many(results), which read and write
+    several calls, each given by its keyword arguments, in one round trip
+    per node. get_many() returns the JSON form of the fresh results found
+    by call position, with None for cached 404s. Batch writes are not kept
+    in the on-disk tier.
+
+    With admission=True a computed result is only stored once its key was
+    read CACHE_ADMISSION_MIN_FREQUENCY times recently, so one-off calls do
+    not take Redis memory from hot entries. Reads are counted per worker,
+    so a key may take up to that many reads per worker before it is stored;
+    meant for endpoints whose keys are mostly one-off, such as filtered or
+    paged lists, not for small lookups by ID. lock=True entries are
+    always stored since other workers wait for them, and so are
+    write_through() results and cached 404s: lookups of missing keys are
+    rarely repeated before they are stored, and negative_ttl bounds their cost.
+
+    With disk=True results are also kept in the host's on-disk tier (see
+    CACHE_DISK_ENABLED) and read from it when Redis misses or is bypassed,
+    so expensive results survive restarts and Redis outages. Cached 404s
+    stay in Redis only.
+
+    With adaptive_ttl=True, ttl is only the starting point: the TTL of new
+    entries follows how often the tags and namespace are invalidated (see
+    CacheManager.ttl_for()), so rarely changing data is kept for hours and
+    volatile data for shorter windows. stale_ttl is added on top as usual.
+
+    Args:
+        key_prefix: Prefix for cache key
+        ttl: Time to live in seconds (soft TTL when stale_ttl is set)
+        key_builder: Custom function to build cache key
+        tags: Tag templates formatted with the call arguments,
+            e.g. "employee:{emp_no}"; see CacheManager.invalidate_tags()
+        namespace: Namespace whose generation is part of the key;
+            see CacheManager.bump_namespace()
+        lock: Coordinate recomputation across workers with a Redis lock
+        stale_ttl: Keep expired values this many extra seconds so they can
+            be served while another worker recomputes
+        swr: Serve stale values and refresh them in the background
+        response: Cache the encoded HTTP response instead of the value
+        negative_ttl: Cache 404s for this many seconds
+        etag: Build the ETag from the function result (response mode)
+        last_modified: Get the Last-Modified time from the result (response mode)
+        version: Get the row version from the result to guard writes
+        admission: Store results only after repeated reads of their key
+        disk: Keep results in the on-disk tier as well
+        adaptive_ttl: Adapt ttl to the invalidation rate of tags and namespace
+
+    Example:
+        @cached(key_prefix="employee", ttl=300, tags=["employee:{emp_no}"])
+        async def get_employee(emp_no: int):
+            return await db.get_employee(emp_no)
+    """
+    if swr and not stale_ttl:
+        raise ValueError("swr=True requires stale_ttl")
+
+    entries = _ResponseEntries(etag, last_modified, disk) if response else _ValueEntries(disk)
+
+    def decorator(func: Callable):
+        fresh_ttl = ttl or settings.REDIS_TTL
+        spec = _CacheSpec(
+            func=func,
+            signature=inspect.signature(func),
+            entries=entries,
+            key_prefix=key_prefix,
+            key_builder=key_builder,
+            tags=tags,
+            namespace=namespace,
+            lock=lock,
+            fresh_ttl=fresh_ttl,
+            hard_ttl=fresh_ttl + stale_ttl if stale_ttl is not None else ttl,
+            stale_ttl=stale_ttl,
+            swr=swr,
+            negative_ttl=negative_ttl,
+            version=version,
+            admission=admission and not lock,
+            disk=disk,
+            adaptive_ttl=adaptive_ttl,
+        )
+        if adaptive_ttl:
+            cache_manager.register_ttl_family(key_prefix, tags or (), namespace)
+
+        async def write_through(result: Any, *args, **kwargs) -> None:
+            """Cache result as the return value of func(*args, **kwargs)."""
+            await _save_result(spec, await _resolve_call(spec, args, kwargs), result)
+
+        async def write_through_many(results: Iterable[Tuple[Any, dict]]) -> None:
+            """Cache each (result, kwargs) pair as the return value of func(**kwargs)."""
+            await _save_many(spec, list(results))
+
+        async def get_many(calls: Iterable[dict]) -> Dict[int, Any]:
+            """Return the cached results of func(**kwargs) for several kwargs."""
+            return await _load_many(spec, list(calls))
+
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            request = _find_request(args, kwargs)
+            call = await _resolve_call(spec, args, kwargs)
+
+            value, fresh = await _load_entry(spec, call)
+            if fresh:
+                logger.debug(f"Cache hit for key: {call.cache_key}")
+                return _respond(entries, value, request)
+            if swr and value is not _MISSING:
+                _serve_stale(spec, call, value)
+                return _respond(entries, value, request)
+
+            result = await _single_flight(call.cache_key, lambda: _compute_entry(spec, call, value))
+            return None if result is None else _respond(entries, result, request)
+
+        wrapper.write_through = write_through
+        wrapper.write_through_many = write_through_many
+        wrapper.get_many = get_many
+        return wrapper
+
+    return decorator
+
+
+def reject_unknown(filter_name: str, argument: str, detail: str):
+    """
+    Decorator raising 404 for IDs a membership filter rules out.
+
+    Place it above @cached so impossible IDs are rejected without touching
+    Redis or the database; see CacheManager.register_filter().
+
+    Args:
+        filter_name: Name the filter was registered under
+        argument: Name of the parameter holding the ID
+        detail: 404 detail template formatted with the call arguments
+    """
+
+    def decorator(func: Callable):
+        signature = inspect.signature(func)
+
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            arguments = bind_arguments(signature, args, kwargs)
+            if not cache_manager.might_contain(filter_name, arguments[argument]):
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail=detail.format(**arguments),
+                )
+            return await func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,146 @@
+"""
+Cache Metrics
+Prometheus metrics for the cache layers, labelled by key prefix
+"""
+
+import re
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator
+
+from prometheus_client import Counter, Gauge, Histogram
+
+CACHE_HITS = Counter(
+    "cache_hits_total",
+    "Cache hits",
+    ["prefix", "tier"],
+)
+CACHE_MISSES = Counter(
+    "cache_misses_total",
+    "Cache misses",
+    ["prefix"],
+)
+CACHE_SETS = Counter(
+    "cache_sets_total",
+    "Cache writes",
+    ["prefix"],
+)
+CACHE_EVICTIONS = Counter(
+    "cache_evictions_total",
+    "Entries evicted from the in-process cache to stay within its limits",
+    ["prefix"],
+)
+CACHE_BUDGET_EVICTIONS = Counter(
+    "cache_budget_evictions_total",
+    "Entries evicted from Redis to keep a key prefix within its byte budget",
+    ["prefix"],
+)
+CACHE_ADMISSION_REJECTIONS = Counter(
+    "cache_admission_rejections_total",
+    "Values not stored because their key was not read often enough",
+    ["prefix"],
+)
+CACHE_ERRORS = Counter(
+    "cache_errors_total",
+    "Failed cache operations",
+    ["prefix", "operation"],
+)
+CACHE_VALUE_BYTES = Histogram(
+    "cache_value_bytes",
+    "Size of values written to Redis",
+    ["prefix"],
+    buckets=(128, 512, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304),
+)
+CACHE_OPERATION_SECONDS = Histogram(
+    "cache_operation_duration_seconds",
+    "Latency of Redis cache operations",
+    ["prefix", "operation"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+)
+CACHE_RECOMPUTE_SECONDS = Histogram(
+    "cache_recompute_duration_seconds",
+    "Time spent computing values for cache misses",
+    ["prefix"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+CACHE_TTL_SECONDS = Gauge(
+    "cache_ttl_seconds",
+    "TTL chosen for new entries of a key prefix from its invalidation rate",
+    ["prefix"],
+)
+CACHE_STORED_BYTES = Gauge(
+    "cache_stored_bytes",
+    "Bytes stored in Redis under a key prefix with a byte budget",
+    ["prefix"],
+)
+CACHE_CIRCUIT_OPEN = Gauge(
+    "cache_circuit_open",
+    "1 while Redis is bypassed after repeated failures",
+)
+
+# Cache keys look like "<prefix>:<params>", "<prefix>@<ns>.<gen>" or "<prefix>#<hash>"
+_PREFIX_END = re.compile(r"[:@#]")
+
+
+def key_prefix(key: Any) -> str:
+    """Return the metrics label for a cache key."""
+    if isinstance(key, bytes):
+        key = key.decode("utf-8", "replace")
+    return _PREFIX_END.split(key, 1)[0]
+
+
+@contextmanager
+def observe(operation: str, prefix: str) -> Iterator[None]:
+    """Time a Redis operation."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        CACHE_OPERATION_SECONDS.labels(prefix, operation).observe(time.perf_counter() - start)
+
+
+def _totals(counter: Any, field: str, stats: Dict[str, Dict[str, float]]) -> None:
+    for metric in counter.collect():
+        for sample in metric.samples:
+            if sample.name.endswith("_total"):
+                stats[sample.labels["prefix"]][field] += sample.value
+
+
+def prefix_stats() -> Dict[str, Dict[str, float]]:
+    """
+    Summarize this process's cache activity per key prefix.
+
+    Values are read back from the Prometheus collectors, so they count
+    since process start and only cover this worker. bytes_written is the
+    total size of the values written, not what Redis currently holds; see
+    CacheManager.stored_bytes() for that.
+    """
+    stats: Dict[str, Dict[str, float]] = defaultdict(
+        lambda: {
+            "hits": 0,
+            "misses": 0,
+            "sets": 0,
+            "evictions": 0,
+            "budget_evictions": 0,
+            "rejections": 0,
+            "errors": 0,
+            "bytes_written": 0,
+        }
+    )
+    _totals(CACHE_HITS, "hits", stats)
+    _totals(CACHE_MISSES, "misses", stats)
+    _totals(CACHE_SETS, "sets", stats)
+    _totals(CACHE_EVICTIONS, "evictions", stats)
+    _totals(CACHE_BUDGET_EVICTIONS, "budget_evictions", stats)
+    _totals(CACHE_ADMISSION_REJECTIONS, "rejections", stats)
+    _totals(CACHE_ERRORS, "errors", stats)
+    for metric in CACHE_VALUE_BYTES.collect():
+        for sample in metric.samples:
+            if sample.name.endswith("_sum"):
+                stats[sample.labels["prefix"]]["bytes_written"] += sample.value
+
+    for values in stats.values():
+        reads = values["hits"] + values["misses"]
+        values["hit_ratio"] = round(values["hits"] / reads, 4) if reads else None
+    return dict(stats)
@@ -0,0 +1,171 @@
+"""
+Cache Scripts
+Lua scripts run by CacheManager, each applying one change atomically on a
+Redis node
+"""
+
+# Drops tagged keys and bumps namespaces in one round trip.
+# KEYS: tag set keys, namespace keys, then the version watermarks ('ver:'
+# keys) of the versioned entries owned by this node
+# ARGV: number of tag keys, number of namespace keys, invalidation channel
+# ("" to skip), origin, watermark TTL, then a cache key and the row version
+# just committed for each watermark. Every watermark is raised to its
+# version whether or not the entry exists, so a fill that read the row
+# before the commit cannot write it back afterwards; entries already
+# holding that version or newer are kept.
+INVALIDATE_SCRIPT = """
+local ntags, nnamespaces = tonumber(ARGV[1]), tonumber(ARGV[2])
+local kept, seen, keys = {}, {}, {}
+for j = 1, #KEYS - ntags - nnamespaces do
+    local key, version = ARGV[4 + 2 * j], tonumber(ARGV[5 + 2 * j])
+    local watermark = KEYS[ntags + nnamespaces + j]
+    local current = tonumber(redis.call('GET', watermark))
+    if current and current >= version then
+        kept[key] = true
+    else
+        redis.call('SET', watermark, version, 'EX', ARGV[5])
+        seen[key] = true
+        table.insert(keys, key)
+    end
+end
+for i = 1, ntags do
+    local members, stale = redis.call('SMEMBERS', KEYS[i]), {}
+    for _, member in ipairs(members) do
+        if not kept[member] then
+            table.insert(stale, member)
+            if not seen[member] then
+                seen[member] = true
+                table.insert(keys, member)
+            end
+        end
+    end
+    if #stale == #members then
+        redis.call('DEL', KEYS[i])
+    else
+        for s = 1, #stale, 1000 do
+            redis.call('SREM', KEYS[i], unpack(stale, s, math.min(s + 999, #stale)))
+        end
+    end
+end
+local deleted = 0
+for i = 1, #keys, 1000 do
+    deleted = deleted + redis.call('DEL', unpack(keys, i, math.min(i + 999, #keys)))
+end
+local changed = {}
+for i, key in ipairs(keys) do
+    changed[i] = key
+end
+for i = ntags + 1, ntags + nnamespaces do
+    redis.call('INCR', KEYS[i])
+    table.insert(changed, KEYS[i])
+end
+if ARGV[3] ~= '' and #changed > 0 then
+    redis.call('PUBLISH', ARGV[3], cjson.encode({origin = ARGV[4], keys = changed}))
+end
+return {deleted, keys}
+"""
+
+# Writes an entry unless a newer version of it was already written.
+# KEYS: entry key, version key, then tag set keys
+# ARGV: data, TTL, version, invalidation channel ("" to skip), origin
+# The version key keeps the longer of its TTL and the entry's, so a
+# watermark raised by _INVALIDATE_SCRIPT is not shortened.
+SET_IF_NEWER_SCRIPT = """
+local current = tonumber(redis.call('GET', KEYS[2]))
+if current and current > tonumber(ARGV[3]) then
+    return 0
+end
+redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[2])
+redis.call('SET', KEYS[2], ARGV[3], 'KEEPTTL')
+redis.call('EXPIRE', KEYS[2], ARGV[2], 'NX')
+redis.call('EXPIRE', KEYS[2], ARGV[2], 'GT')
+for i = 3, #KEYS do
+    redis.call('SADD', KEYS[i], KEYS[1])
+    redis.call('EXPIRE', KEYS[i], ARGV[2], 'NX')
+    redis.call('EXPIRE', KEYS[i], ARGV[2], 'GT')
+end
+if ARGV[4] ~= '' then
+    redis.call('PUBLISH', ARGV[4], cjson.encode({origin = ARGV[5], keys = {KEYS[1]}}))
+end
+return 1
+"""
+
+# Accounts a write against its prefix's byte budget and evicts entries
+# until the prefix fits (GreedyDual-Size). An entry ranks at the budget's
+# floor plus 1 / size when written or read, and the floor rises to the
+# rank of each evicted entry, so small and recently used entries survive
+# longest. Entries that expired or were deleted in the meantime are still
+# counted until they sink to the bottom and are popped for free.
+# KEYS: budget hash (total, floor), entry size hash, rank sorted set
+# ARGV: key, size in bytes, budget in bytes
+# Returns the keys evicted.
+CHARGE_BUDGET_SCRIPT = """
+local size = tonumber(ARGV[2])
+local previous = tonumber(redis.call('HGET', KEYS[2], ARGV[1]) or 0)
+redis.call('HSET', KEYS[2], ARGV[1], size)
+local total = redis.call('HINCRBY', KEYS[1], 'total', size - previous)
+local floor = tonumber(redis.call('HGET', KEYS[1], 'floor') or 0)
+redis.call('ZADD', KEYS[3], string.format('%.17g', floor + 1 / math.max(size, 1)), ARGV[1])
+local evicted = {}
+while total > tonumber(ARGV[3]) do
+    local popped = redis.call('ZPOPMIN', KEYS[3])
+    if #popped == 0 then
+        break
+    end
+    floor = tonumber(popped[2])
+    local freed = tonumber(redis.call('HGET', KEYS[2], popped[1]) or 0)
+    redis.call('HDEL', KEYS[2], popped[1])
+    total = redis.call('HINCRBY', KEYS[1], 'total', -freed)
+    if redis.call('DEL', popped[1]) == 1 then
+        table.insert(evicted, popped[1])
+    end
+end
+redis.call('HSET', KEYS[1], 'floor', string.format('%.17g', floor))
+return evicted
+"""
+
+# Moves a budgeted entry that was read back up to the top of its rank.
+# KEYS: budget hash, entry size hash, rank sorted set; ARGV: key
+TOUCH_BUDGET_SCRIPT = """
+local size = tonumber(redis.call('HGET', KEYS[2], ARGV[1]))
+if size then
+    local floor = tonumber(redis.call('HGET', KEYS[1], 'floor') or 0)
+    local rank = string.format('%.17g', floor + 1 / math.max(size, 1))
+    redis.call('ZADD', KEYS[3], 'XX', rank, ARGV[1])
+end
+return 0
+"""
+
+# Deletes the lock only if it still holds our token
+RELEASE_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+# Extends the lock's TTL only if it still holds our token
+RENEW_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('EXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+# Decays the count of each source to now and adds one invalidation.
+# KEYS: rates hash; ARGV: now, mean lifetime of a count, sources...
+RECORD_INVALIDATIONS_SCRIPT = """
+local now = tonumber(ARGV[1])
+redis.call('HSETNX', KEYS[1], 'started', ARGV[1])
+for i = 3, #ARGV do
+    local count = 0
+    local entry = redis.call('HGET', KEYS[1], ARGV[i])
+    if entry then
+        local previous, at = string.match(entry, '(%S+) (%S+)')
+        local age = math.max(now - tonumber(at), 0)
+        count = tonumber(previous) * math.exp(-age / tonumber(ARGV[2]))
+    end
+    redis.call('HSET', KEYS[1], ARGV[i], string.format('%.17g %.17g', count + 1, now))
+end
+return 0
+"""
@@ -0,0 +1,63 @@
+"""
+Circuit Breaker
+Skips a failing dependency until a health probe succeeds again
+"""
+
+import time
+from collections import deque
+from typing import Callable, Deque, Optional
+
+
+class CircuitBreaker:
+    """
+    Failure-rate circuit breaker.
+
+    Opens once failure_threshold failures are recorded within window
+    seconds. While open, callers should skip the dependency entirely. It is
+    closed by whoever probes the dependency in the background (close()),
+    never by letting request traffic through to test it.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int,
+        window: float,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if failure_threshold <= 0:
+            raise ValueError("failure_threshold must be positive")
+
+        self.failure_threshold = failure_threshold
+        self.window = window
+        self._clock = clock
+        self._failures: Deque[float] = deque()
+        self.opened_at: Optional[float] = None
+
+    @property
+    def is_open(self) -> bool:
+        return self.opened_at is not None
+
+    def record_failure(self) -> bool:
+        """Record a failure; returns True if it opened the breaker."""
+        if self.is_open:
+            return False
+
+        now = self._clock()
+        self._failures.append(now)
+        while self._failures and self._failures[0] <= now - self.window:
+            self._failures.popleft()
+        if len(self._failures) >= self.failure_threshold:
+            return self.open()
+        return False
+
+    def open(self) -> bool:
+        """Open the breaker; returns True if it was closed."""
+        if self.is_open:
+            return False
+        self.opened_at = self._clock()
+        return True
+
+    def close(self) -> None:
+        """Close the breaker and forget past failures."""
+        self.opened_at = None
+        self._failures.clear()
@@ -0,0 +1,220 @@
+"""
+Cache Codecs
+Serialization and compression of cached values
+"""
+
+import json
+import uuid
+import zlib
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Callable, Dict, Optional
+
+import orjson
+
+from app.core.config import settings
+from app.core.logging import logger
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional dependency
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:  # pragma: no cover - optional dependency
+    lz4_frame = None
+
+
+# Encoded entries start with MAGIC, a codec id and a compression id.
+# Anything else is a legacy entry written with json.dumps().
+MAGIC = b"\x00"
+HEADER_SIZE = 3
+NO_COMPRESSION = b"-"
+
+
+class CodecError(ValueError):
+    """Raised when a value cannot be encoded or decoded."""
+
+
+def _orjson_default(value: Any) -> Any:
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def _orjson_dumps(value: Any) -> bytes:
+    return orjson.dumps(
+        value,
+        default=_orjson_default,
+        option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY,
+    )
+
+
+# msgpack extension types, so Decimals and dates round-trip as themselves
+_EXT_DECIMAL = 1
+_EXT_DATETIME = 2
+_EXT_DATE = 3
+_EXT_UUID = 4
+
+
+def _msgpack_default(value: Any) -> Any:
+    if isinstance(value, Decimal):
+        return msgpack.ExtType(_EXT_DECIMAL, str(value).encode("ascii"))
+    if isinstance(value, datetime):
+        return msgpack.ExtType(_EXT_DATETIME, value.isoformat().encode("ascii"))
+    if isinstance(value, date):
+        return msgpack.ExtType(_EXT_DATE, value.isoformat().encode("ascii"))
+    if isinstance(value, uuid.UUID):
+        return msgpack.ExtType(_EXT_UUID, value.bytes)
+    raise TypeError(f"Type is not msgpack serializable: {type(value).__name__}")
+
+
+def _msgpack_ext_hook(code: int, data: bytes) -> Any:
+    if code == _EXT_DECIMAL:
+        return Decimal(data.decode("ascii"))
+    if code == _EXT_DATETIME:
+        return datetime.fromisoformat(data.decode("ascii"))
+    if code == _EXT_DATE:
+        return date.fromisoformat(data.decode("ascii"))
+    if code == _EXT_UUID:
+        return uuid.UUID(bytes=data)
+    return msgpack.ExtType(code, data)
+
+
+def _msgpack_dumps(value: Any) -> bytes:
+    return msgpack.packb(value, default=_msgpack_default, use_bin_type=True)
+
+
+def _msgpack_loads(data: bytes) -> Any:
+    return msgpack.unpackb(
+        data, ext_hook=_msgpack_ext_hook, raw=False, strict_map_key=False
+    )
+
+
+def _zstd_compress(data: bytes) -> bytes:
+    return zstandard.ZstdCompressor(level=3).compress(data)
+
+
+def _zstd_decompress(data: bytes) -> bytes:
+    return zstandard.ZstdDecompressor().decompress(data)
+
+
+# name -> (id, dumps, loads, available)
+_CODECS: Dict[str, tuple] = {
+    "orjson": (b"j", _orjson_dumps, orjson.loads, True),
+    "msgpack": (b"m", _msgpack_dumps, _msgpack_loads, msgpack is not None),
+}
+
+# name -> (id, compress, decompress, available)
+_COMPRESSORS: Dict[str, tuple] = {
+    "zstd": (b"z", _zstd_compress, _zstd_decompress, zstandard is not None),
+    "lz4": (
+        b"l",
+        lambda data: lz4_frame.compress(data),
+        lambda data: lz4_frame.decompress(data),
+        lz4_frame is not None,
+    ),
+    "zlib": (b"d", lambda data: zlib.compress(data, 6), zlib.decompress, True),
+}
+
+_CODECS_BY_ID: Dict[bytes, tuple] = {
+    entry[0]: (name, *entry[1:]) for name, entry in _CODECS.items()
+}
+_COMPRESSORS_BY_ID: Dict[bytes, tuple] = {
+    entry[0]: (name, *entry[1:]) for name, entry in _COMPRESSORS.items()
+}
+
+_warned: set = set()
+
+
+def _resolve(
+    registry: Dict[str, tuple], name: Optional[str], fallback: Optional[str]
+) -> Optional[str]:
+    """Return name if usable, otherwise fallback (warning once)."""
+    if name is None:
+        return None
+    entry = registry.get(name)
+    if entry is not None and entry[3]:
+        return name
+    if name not in _warned:
+        _warned.add(name)
+        reason = "unknown" if entry is None else "not installed"
+        logger.warning(f"Cache codec '{name}' is {reason}; using {fallback or 'none'}")
+    return fallback
+
+
+def encode(
+    value: Any,
+    codec: Optional[str] = None,
+    compression: Optional[str] = "default",
+    min_size: Optional[int] = None,
+) -> bytes:
+    """
+    Serialize a value for storage.
+
+    Args:
+        value: Value to encode
+        codec: Serializer name, defaults to CACHE_CODEC
+        compression: Compressor name or None, defaults to CACHE_COMPRESSION
+        min_size: Compress only payloads at least this large,
+            defaults to CACHE_COMPRESSION_MIN_SIZE
+
+    Returns:
+        Header followed by the (possibly compressed) payload
+    """
+    codec = _resolve(_CODECS, codec or settings.CACHE_CODEC, "orjson")
+    if compression == "default":
+        compression = settings.CACHE_COMPRESSION
+    compression = _resolve(_COMPRESSORS, compression, None)
+    if min_size is None:
+        min_size = settings.CACHE_COMPRESSION_MIN_SIZE
+
+    codec_id, dumps, _, _ = _CODECS[codec]
+    try:
+        payload = dumps(value)
+    except (TypeError, ValueError, OverflowError) as e:
+        raise CodecError(f"Cannot encode value with {codec}: {e}") from e
+
+    compression_id = NO_COMPRESSION
+    if compression and len(payload) >= min_size:
+        compressor_id, compress, _, _ = _COMPRESSORS[compression]
+        compressed = compress(payload)
+        # Incompressible payloads are stored as-is
+        if len(compressed) < len(payload):
+            payload = compressed
+            compression_id = compressor_id
+
+    return MAGIC + codec_id + compression_id + payload
+
+
+def decode(data: bytes) -> Any:
+    """
+    Deserialize a value written by encode() or a legacy JSON entry.
+
+    The codec and compression are read from the entry header, so entries
+    written under different settings can be read side by side.
+    """
+    if not data.startswith(MAGIC):
+        return json.loads(data)
+
+    codec_id = data[1:2]
+    compression_id = data[2:3]
+    payload = data[HEADER_SIZE:]
+
+    if compression_id != NO_COMPRESSION:
+        compressor = _COMPRESSORS_BY_ID.get(compression_id)
+        if compressor is None or not compressor[3]:
+            raise CodecError(f"Unsupported cache compression id {compression_id!r}")
+        payload = compressor[2](payload)
+
+    codec = _CODECS_BY_ID.get(codec_id)
+    if codec is None or not codec[3]:
+        raise CodecError(f"Unsupported cache codec id {codec_id!r}")
+    loads: Callable = codec[2]
+    return loads(payload)
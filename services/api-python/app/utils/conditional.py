@@ -0,0 +1,92 @@
+"""
+Conditional Requests
+ETag and Last-Modified validators for GET endpoints
+"""
+
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Optional, Union
+
+from fastapi import Request, Response, status
+
+
+def entity_etag(entity: Any, *extra: Any) -> str:
+    """
+    Strong ETag for a single row.
+
+    The version column is bumped by the updated_at trigger on every
+    update, so uuid + version changes exactly when the row does. Pass
+    extra parts for response fields derived from anything else, e.g. the
+    current date for ages.
+    """
+    return '"' + "-".join(str(part) for part in (entity.uuid, entity.version, *extra)) + '"'
+
+
+def watermark_etag(*parts: Any) -> str:
+    """
+    Weak ETag for a list or aggregate from a change watermark.
+
+    Pass the query parameters together with values that change whenever
+    the result may change, e.g. the row count and max(updated_at), or a
+    cache namespace generation.
+    """
+    digest = hashlib.sha1("|".join(str(part) for part in parts).encode("utf-8")).hexdigest()
+    return f'W/"{digest[:32]}"'
+
+
+def http_date(value: Union[datetime, str, None]) -> Optional[str]:
+    """Format a timestamp (naive values are UTC) as an HTTP-date."""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return format_datetime(value.astimezone(timezone.utc), usegmt=True)
+
+
+def _opaque(etag: str) -> str:
+    return etag[2:] if etag.startswith("W/") else etag
+
+
+def is_not_modified(
+    request: Optional[Request],
+    etag: Optional[str],
+    last_modified: Optional[str] = None,
+) -> bool:
+    """
+    Evaluate If-None-Match / If-Modified-Since for a GET (RFC 7232).
+
+    If-None-Match uses weak comparison and takes precedence; If-Modified-Since
+    is only considered when the request carries no If-None-Match.
+    """
+    if request is None:
+        return False
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if not etag:
+            return False
+        candidates = [tag.strip() for tag in if_none_match.split(",")]
+        return "*" in candidates or _opaque(etag) in {_opaque(tag) for tag in candidates}
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified:
+        try:
+            return parsedate_to_datetime(last_modified) <= parsedate_to_datetime(
+                if_modified_since
+            )
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def not_modified(etag: Optional[str], last_modified: Optional[str] = None) -> Response:
+    """Build a 304 response carrying the validators."""
+    headers = {}
+    if etag:
+        headers["ETag"] = etag
+    if last_modified:
+        headers["Last-Modified"] = last_modified
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
@@ -0,0 +1,169 @@
+"""
+Disk Cache
+Size-bounded key/value store in a SQLite file shared by a host's workers
+"""
+
+import sqlite3
+import threading
+import time
+from typing import Iterable, Optional, Tuple
+
+
+class DiskCache:
+    """
+    Key/value store with expiry in a SQLite file.
+
+    Every worker on a host opens the same file (WAL mode lets readers run
+    alongside a writer), so entries outlive process restarts and deploys.
+    Once the stored values exceed max_bytes, expired entries and then the
+    least recently read ones are deleted. Methods block; call them from a
+    thread.
+
+    Reads only write to the file when the entry's read time is more than
+    access_resolution seconds old, since every write takes the file's one
+    write lock. The byte total is kept in the meta table by triggers, so
+    writes do not sum the table.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_bytes: int,
+        timeout: float = 1.0,
+        access_resolution: float = 60.0,
+    ):
+        if max_bytes <= 0:
+            raise ValueError("max_bytes must be positive")
+
+        self.path = path
+        self.max_bytes = max_bytes
+        self.access_resolution = access_resolution
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(
+            path, timeout=timeout, isolation_level=None, check_same_thread=False
+        )
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                value BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                expires_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+            """
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_entries_accessed ON entries (accessed_at)")
+        # In one transaction, so that the total starts from the entries of a
+        # file created before the triggers existed exactly once
+        self._db.execute("BEGIN IMMEDIATE")
+        try:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL)"
+            )
+            self._db.execute(
+                """
+                INSERT OR IGNORE INTO meta (name, value)
+                SELECT 'bytes', COALESCE(SUM(size), 0) FROM entries
+                """
+            )
+            self._db.execute(
+                """
+                CREATE TRIGGER IF NOT EXISTS entries_bytes_insert AFTER INSERT ON entries
+                BEGIN
+                    UPDATE meta SET value = value + NEW.size WHERE name = 'bytes';
+                END
+                """
+            )
+            self._db.execute(
+                """
+                CREATE TRIGGER IF NOT EXISTS entries_bytes_update AFTER UPDATE OF size ON entries
+                BEGIN
+                    UPDATE meta SET value = value + NEW.size - OLD.size WHERE name = 'bytes';
+                END
+                """
+            )
+            self._db.execute(
+                """
+                CREATE TRIGGER IF NOT EXISTS entries_bytes_delete AFTER DELETE ON entries
+                BEGIN
+                    UPDATE meta SET value = value - OLD.size WHERE name = 'bytes';
+                END
+                """
+            )
+            self._db.execute("COMMIT")
+        except BaseException:
+            self._db.execute("ROLLBACK")
+            raise
+
+    def get(self, key: str) -> Optional[Tuple[bytes, float]]:
+        """Return (value, seconds to live) or None if missing or expired."""
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT value, expires_at, accessed_at FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            # Expired entries are left to eviction
+            if row is None or row[1] <= now:
+                return None
+            if now - row[2] > self.access_resolution:
+                self._db.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key))
+        return row[0], row[1] - now
+
+    def size(self) -> int:
+        """Return the bytes stored."""
+        with self._lock:
+            return self._total()
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        """Store value for ttl seconds."""
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                """
+                INSERT INTO entries (key, value, size, expires_at, accessed_at)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (key) DO UPDATE SET
+                    value = excluded.value,
+                    size = excluded.size,
+                    expires_at = excluded.expires_at,
+                    accessed_at = excluded.accessed_at
+                """,
+                (key, value, len(value), now + ttl, now),
+            )
+            self._evict(now)
+
+    def delete_many(self, keys: Iterable[str]) -> None:
+        """Delete keys."""
+        with self._lock:
+            self._db.executemany("DELETE FROM entries WHERE key = ?", ((key,) for key in keys))
+
+    def delete_pattern(self, pattern: str) -> None:
+        """Delete keys matching a glob pattern."""
+        with self._lock:
+            self._db.execute("DELETE FROM entries WHERE key GLOB ?", (pattern,))
+
+    def close(self) -> None:
+        """Close the file."""
+        with self._lock:
+            self._db.close()
+
+    def _total(self) -> int:
+        (total,) = self._db.execute("SELECT value FROM meta WHERE name = 'bytes'").fetchone()
+        return total
+
+    def _evict(self, now: float) -> None:
+        if self._total() <= self.max_bytes:
+            return
+
+        self._db.execute("DELETE FROM entries WHERE expires_at <= ?", (now,))
+        total = self._total()
+        evicted = []
+        for key, size in self._db.execute("SELECT key, size FROM entries ORDER BY accessed_at"):
+            if total <= self.max_bytes:
+                break
+            evicted.append((key,))
+            total -= size
+        self._db.executemany("DELETE FROM entries WHERE key = ?", evicted)
@@ -0,0 +1,61 @@
+"""
+Frequency Sketch
+Approximate recent access counts for cache admission (TinyLFU)
+"""
+
+import hashlib
+from typing import Any, Iterable, Optional
+
+# Counters saturate here, like the 4-bit counters of TinyLFU
+MAX_COUNT = 15
+
+# Translation table halving every counter byte at once
+_HALVE = bytes(count >> 1 for count in range(256))
+
+
+class FrequencySketch:
+    """
+    Count-min sketch of recent access frequencies.
+
+    estimate() never undercounts the increments of an item since the last
+    aging step, and overcounts only through hash collisions. After
+    sample_size increments every counter is halved, so the counts follow
+    recent popularity instead of growing forever.
+    """
+
+    def __init__(self, width: int, depth: int = 4, sample_size: Optional[int] = None):
+        if width <= 0:
+            raise ValueError("width must be positive")
+        if depth <= 0:
+            raise ValueError("depth must be positive")
+
+        self.width = width
+        self.depth = depth
+        self.sample_size = sample_size or 10 * width
+        self.additions = 0
+        self._rows = [bytearray(width) for _ in range(depth)]
+
+    def increment(self, item: Any) -> None:
+        """Count one access to item."""
+        for row, index in zip(self._rows, self._indexes(item)):
+            if row[index] < MAX_COUNT:
+                row[index] += 1
+        self.additions += 1
+        if self.additions >= self.sample_size:
+            self.age()
+
+    def estimate(self, item: Any) -> int:
+        """Return the approximate number of recent accesses to item."""
+        return min(row[index] for row, index in zip(self._rows, self._indexes(item)))
+
+    def age(self) -> None:
+        """Halve every counter."""
+        self._rows = [row.translate(_HALVE) for row in self._rows]
+        self.additions //= 2
+
+    def _indexes(self, item: Any) -> Iterable[int]:
+        # Double hashing: one counter per row from two 64-bit halves of one digest
+        digest = hashlib.blake2b(str(item).encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.width for i in range(self.depth))
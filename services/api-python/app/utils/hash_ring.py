@@ -0,0 +1,62 @@
+"""
+Consistent Hash Ring
+Maps cache keys to Redis nodes with virtual nodes
+"""
+
+import bisect
+import hashlib
+from typing import Dict, Iterable, List
+
+
+def _hash(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """
+    Consistent hash ring.
+
+    Every node is placed at `replicas` points on the ring, and a key belongs
+    to the node of the first point at or after the key's hash. Removing a
+    node therefore only remaps the keys it owned, and adding one only takes
+    over a share of the other nodes' keys.
+    """
+
+    def __init__(self, nodes: Iterable[str] = (), replicas: int = 160):
+        if replicas <= 0:
+            raise ValueError("replicas must be positive")
+
+        self.replicas = replicas
+        self.nodes: List[str] = []
+        self._points: List[int] = []
+        self._owners: Dict[int, str] = {}
+        for node in nodes:
+            self.add(node)
+
+    def add(self, node: str) -> None:
+        """Place a node on the ring."""
+        if node in self.nodes:
+            raise ValueError(f"Node '{node}' is already on the ring")
+        self.nodes.append(node)
+        for i in range(self.replicas):
+            point = _hash(f"{node}#{i}")
+            # On a (vanishingly rare) collision the earlier node keeps the point
+            if point not in self._owners:
+                self._owners[point] = node
+                bisect.insort(self._points, point)
+
+    def remove(self, node: str) -> None:
+        """Take a node off the ring."""
+        self.nodes.remove(node)
+        self._points = [point for point in self._points if self._owners[point] != node]
+        self._owners = {point: self._owners[point] for point in self._points}
+
+    def node_for(self, key: str) -> str:
+        """Return the node owning key."""
+        if not self._points:
+            raise LookupError("The hash ring has no nodes")
+        index = bisect.bisect_left(self._points, _hash(key)) % len(self._points)
+        return self._owners[self._points[index]]
+
+    def __len__(self) -> int:
+        return len(self.nodes)
@@ -0,0 +1,125 @@
+"""
+Local Cache
+In-process LRU cache with entry, memory and TTL bounds
+"""
+
+import time
+from collections import OrderedDict
+from fnmatch import fnmatchcase
+from typing import Any, Callable, Iterable, Optional, Tuple
+
+
+class LocalCache:
+    """
+    Bounded in-process LRU cache.
+
+    Entries expire after their own TTL and the cache evicts least recently
+    used entries once either the entry count or the estimated byte size
+    exceeds its limit. Not thread-safe; intended for use from a single
+    event loop.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 10000,
+        max_bytes: int = 64 * 1024 * 1024,
+        on_evict: Optional[Callable[[str], None]] = None,
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        # Called with the key of every entry evicted for space
+        self.on_evict = on_evict
+        self.current_bytes = 0
+        self.evictions = 0
+        # key -> (value, expires_at, size)
+        self._data: "OrderedDict[str, Tuple[Any, float, int]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key) is not None
+
+    def get(self, key: str) -> Optional[Any]:
+        """Get value for key, or None if missing or expired."""
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+
+        value, expires_at, _ = entry
+        if expires_at <= time.monotonic():
+            self._remove(key)
+            return None
+
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Any, ttl: float, size: int = 0) -> bool:
+        """
+        Store value for ttl seconds.
+
+        Args:
+            key: Cache key
+            value: Value to store
+            ttl: Time to live in seconds
+            size: Estimated size of the value in bytes
+
+        Returns:
+            False if the value was not stored (non-positive TTL or too large)
+        """
+        if ttl <= 0 or size > self.max_bytes:
+            self.delete(key)
+            return False
+
+        if key in self._data:
+            self._remove(key)
+
+        self._data[key] = (value, time.monotonic() + ttl, size)
+        self.current_bytes += size
+        self._evict()
+        return True
+
+    def delete(self, key: str) -> bool:
+        """Delete key. Returns True if it was present."""
+        if key in self._data:
+            self._remove(key)
+            return True
+        return False
+
+    def delete_many(self, keys: Iterable[str]) -> int:
+        """Delete several keys. Returns number of keys removed."""
+        return sum(1 for key in keys if self.delete(key))
+
+    def delete_pattern(self, pattern: str) -> int:
+        """Delete all keys matching a Redis-style glob pattern."""
+        matches = [key for key in self._data if fnmatchcase(key, pattern)]
+        for key in matches:
+            self._remove(key)
+        return len(matches)
+
+    def clear(self) -> None:
+        """Remove all entries."""
+        self._data.clear()
+        self.current_bytes = 0
+
+    def ttl(self, key: str) -> float:
+        """Remaining TTL in seconds, or -1 if key is missing."""
+        entry = self._data.get(key)
+        if entry is None:
+            return -1
+        remaining = entry[1] - time.monotonic()
+        return remaining if remaining > 0 else -1
+
+    def _remove(self, key: str) -> None:
+        _, _, size = self._data.pop(key)
+        self.current_bytes -= size
+
+    def _evict(self) -> None:
+        while self._data and (
+            len(self._data) > self.max_entries or self.current_bytes > self.max_bytes
+        ):
+            key = next(iter(self._data))
+            self._remove(key)
+            self.evictions += 1
+            if self.on_evict is not None:
+                self.on_evict(key)
@@ -0,0 +1,73 @@
+"""
+Integration Tests for Sharded Cache
+Runs against several Redis servers listed in TEST_REDIS_NODES, e.g.
+TEST_REDIS_NODES=redis://localhost:7001/0,redis://localhost:7002/0,redis://localhost:7003/0
+"""
+
+import os
+from unittest.mock import patch
+
+import pytest
+
+from app.utils.cache import CacheManager
+from app.utils.hash_ring import HashRing
+
+NODES = [url for url in os.environ.get("TEST_REDIS_NODES", "").split(",") if url]
+
+pytestmark = pytest.mark.skipif(
+    len(NODES) < 2, reason="TEST_REDIS_NODES must list at least two Redis servers"
+)
+
+
+@pytest.mark.integration
+@pytest.mark.cache
+class TestShardedCache:
+    """Test CacheManager against several Redis nodes."""
+
+    @pytest.fixture
+    async def cache_manager(self):
+        """Connect a cache manager to every test node."""
+        manager = CacheManager()
+        manager.local = None
+        with patch("app.utils.cache.settings.REDIS_NODES", NODES):
+            await manager.connect()
+        for client in manager.shards.values():
+            await client.flushdb()
+        yield manager
+        await manager.disconnect()
+
+    async def test_keys_spread_over_nodes(self, cache_manager):
+        """Test that entries land on every node and read back."""
+        items = {f"sharding_test:{i}": {"i": i} for i in range(300)}
+
+        assert await cache_manager.set_many(items, ttl=60)
+
+        assert await cache_manager.get_many(items) == items
+        for client in cache_manager.shards.values():
+            assert await client.dbsize() > 0
+
+    async def test_tag_invalidation_across_nodes(self, cache_manager):
+        """Test that a tag drops its entries on every node."""
+        keys = [f"sharding_test:{i}" for i in range(50)]
+        for key in keys:
+            await cache_manager.set(key, 1, ttl=60, tags=["employee:1"])
+        await cache_manager.bump_namespace("analytics")
+
+        deleted = await cache_manager.invalidate(tags=["employee:1"], namespaces=["analytics"])
+
+        assert deleted == len(keys)
+        assert await cache_manager.get_many(keys) == {}
+        assert await cache_manager.namespace_generation("analytics") == 2
+
+    async def test_removed_node_only_remaps_its_keys(self, cache_manager):
+        """Test that dropping a node leaves the other nodes' keys in place."""
+        removed = cache_manager.ring.nodes[-1]
+        smaller = HashRing(
+            [node for node in cache_manager.ring.nodes if node != removed],
+            cache_manager.ring.replicas,
+        )
+        keys = [f"sharding_test:{i}" for i in range(1000)]
+
+        for key in keys:
+            if cache_manager.ring.node_for(key) != removed:
+                assert smaller.node_for(key) == cache_manager.ring.node_for(key)
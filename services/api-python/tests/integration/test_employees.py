@@ -120,6 +120,32 @@ async def test_get_employee_caching(self, client: AsyncClient, test_employee):
         assert response1.json() == response2.json()
 
 
+@pytest.mark.integration
+@pytest.mark.api
+class TestEmployeeBatch:
+    """Test multi-employee lookup endpoint."""
+
+    async def test_get_employees_batch(self, client: AsyncClient, test_employee):
+        """Test that existing employees are returned in request order."""
+        response = await client.get(
+            f"/api/v1/employees/batch?emp_no=999999&emp_no={test_employee.emp_no}"
+        )
+
+        assert response.status_code == 200
+        data = response.json()
+        assert [item["emp_no"] for item in data] == [test_employee.emp_no]
+
+        # Second request is served from cache
+        cached = await client.get(f"/api/v1/employees/batch?emp_no={test_employee.emp_no}")
+        assert cached.json() == data
+
+    async def test_get_employees_batch_requires_ids(self, client: AsyncClient):
+        """Test that at least one employee number is required."""
+        response = await client.get("/api/v1/employees/batch")
+
+        assert response.status_code == 422
+
+
 @pytest.mark.integration
 @pytest.mark.api
 @pytest.mark.database
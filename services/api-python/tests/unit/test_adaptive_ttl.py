@@ -0,0 +1,97 @@
+"""
+Unit Tests for Adaptive TTL
+Tests TTLs chosen from invalidation rates
+"""
+
+import pytest
+
+from app.utils.adaptive_ttl import AdaptiveTTL
+
+HOUR = 3600
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def policy(clock):
+    ttl = AdaptiveTTL(min_ttl=60, max_ttl=6 * HOUR, half_life=24 * HOUR, clock=clock)
+    ttl.register("department", ["tag:department"])
+    ttl.register("employee_salaries", ["tag:employee"])
+    return ttl
+
+
+@pytest.mark.unit
+class TestAdaptiveTTL:
+    """Test AdaptiveTTL class."""
+
+    def test_unregistered_family_keeps_default(self, policy):
+        """Test that families without sources are not adapted."""
+        assert policy.ttl("query", 300) == 300
+
+    def test_default_until_observed(self, policy, clock):
+        """Test that a new family starts from its default TTL."""
+        clock.now = 60
+        assert policy.ttl("department", 300) == 300
+
+    def test_quiet_family_grows_to_max(self, policy, clock):
+        """Test that data not changing for long is cached for hours."""
+        clock.now = 48 * HOUR
+        assert policy.ttl("department", 300) == 6 * HOUR
+
+    def test_volatile_family_shrinks(self, policy, clock):
+        """Test that frequent invalidations shorten the TTL."""
+        for _ in range(200):
+            clock.now += 30
+            policy.record("tag:employee")
+
+        ttl = policy.ttl("employee_salaries", 300)
+
+        assert 60 <= ttl < 300
+        assert policy.ttl("department", 300) >= 300
+
+    def test_rate_estimate(self, policy, clock):
+        """Test that a steady rate is estimated as its interval."""
+        for _ in range(2000):
+            clock.now += 120
+            policy.record("tag:employee")
+
+        assert policy.interval("tag:employee") == pytest.approx(120, rel=0.05)
+        assert policy.ttl("employee_salaries", 300) == pytest.approx(60, abs=3)
+
+    def test_ttl_recovers_after_changes_stop(self, policy, clock):
+        """Test that old invalidations decay away."""
+        for _ in range(100):
+            clock.now += 10
+            policy.record("tag:department")
+        assert policy.ttl("department", 300) == 60
+
+        clock.now += 30 * 24 * HOUR
+
+        assert policy.ttl("department", 300) == 6 * HOUR
+
+    def test_most_volatile_source_wins(self, policy, clock):
+        """Test that a family is as short-lived as its busiest source."""
+        policy.register("department", ["ns:analytics"])
+        for _ in range(100):
+            clock.now += 10
+            policy.record("ns:analytics")
+
+        assert policy.ttl("department", 300) == 60
+
+    def test_rejects_bad_bounds(self):
+        """Test that the TTL bounds are validated."""
+        with pytest.raises(ValueError):
+            AdaptiveTTL(min_ttl=600, max_ttl=60, half_life=HOUR)
+        with pytest.raises(ValueError):
+            AdaptiveTTL(min_ttl=60, max_ttl=600, half_life=0)
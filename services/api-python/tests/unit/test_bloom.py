@@ -0,0 +1,34 @@
+"""
+Unit Tests for Bloom Filter
+Tests membership and sizing
+"""
+
+import pytest
+
+from app.utils.bloom import BloomFilter
+
+
+@pytest.mark.unit
+class TestBloomFilter:
+    """Test BloomFilter class."""
+
+    def test_added_items_are_members(self):
+        """Test that there are no false negatives."""
+        bloom = BloomFilter.from_items(range(1000), capacity=1000)
+
+        assert all(item in bloom for item in range(1000))
+        assert bloom.count == 1000
+
+    def test_false_positive_rate(self):
+        """Test that the false positive rate stays near the target."""
+        bloom = BloomFilter.from_items(range(10000), capacity=10000, error_rate=0.01)
+
+        false_positives = sum(1 for item in range(10000, 30000) if item in bloom)
+        assert false_positives / 20000 < 0.02
+
+    def test_invalid_arguments(self):
+        """Test that invalid sizes are rejected."""
+        with pytest.raises(ValueError):
+            BloomFilter(0)
+        with pytest.raises(ValueError):
+            BloomFilter(100, error_rate=1.5)
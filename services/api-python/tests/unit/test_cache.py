@@ -5,7 +5,25 @@
 
 import pytest
 from unittest.mock import AsyncMock, MagicMock, patch
-from app.utils.cache import CacheManager, cached
+import asyncio
+import inspect
+import json
+import time
+from datetime import date
+from typing import Optional
+from fastapi import Depends, HTTPException, Query, Request, Response
+from redis.exceptions import ConnectionError as RedisConnectionError
+from redis.exceptions import TimeoutError as RedisTimeoutError
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.core.database import begin_deadline, query_timeout
+from app.utils.bloom import BloomFilter
+from app.utils.disk_cache import DiskCache
+from app.utils.hash_ring import HashRing
+from app.utils.cache import CacheManager, CacheUnavailable, build_cache_key
+from app.utils.cache_decorator import CachedResponse, cached, reject_unknown
+from app.utils.cache_scripts import INVALIDATE_SCRIPT
+from app.utils.local_cache import LocalCache
 
 
 @pytest.mark.unit
@@ -106,6 +124,97 @@ async def test_delete_pattern(self, cache_manager):
         assert count == 2
         cache_manager.redis.delete.assert_called()
 
+    async def test_set_with_tags(self, cache_manager):
+        """Test that tagged keys are registered in their tag sets."""
+        pipe = MagicMock()
+        pipe.execute = AsyncMock()
+        cache_manager.redis.pipeline = MagicMock(return_value=pipe)
+
+        await cache_manager.set("employee:1", {"a": 1}, ttl=300, tags=["employee:1"])
+
+        pipe.setex.assert_called_once()
+        pipe.sadd.assert_called_once_with("tag:employee:1", "employee:1")
+        pipe.execute.assert_called_once()
+
+    async def test_invalidate_tags(self, cache_manager):
+        """Test deletion of all keys registered under a tag."""
+        cache_manager.redis.eval = AsyncMock(
+            return_value=[2, [b"employee:1", b"employee_salaries:1"]]
+        )
+
+        count = await cache_manager.invalidate_tags("employee:1")
+
+        assert count == 2
+        args = cache_manager.redis.eval.call_args[0]
+        assert args[1:4] == (1, "tag:employee:1", 1)
+        cache_manager.redis.keys.assert_not_called()
+
+    async def test_invalidate_tags_and_namespaces(self, cache_manager):
+        """Test that tags and namespaces are invalidated in one call."""
+        cache_manager.local = LocalCache()
+        cache_manager.local.set("employee:1", {"emp_no": 1}, 60)
+        cache_manager.local.set("ns:analytics", 3, 60)
+        cache_manager.redis.eval = AsyncMock(return_value=[1, [b"employee:1"]])
+
+        await cache_manager.invalidate(tags=["employee:1"], namespaces=["analytics"])
+
+        args = cache_manager.redis.eval.call_args[0]
+        assert args[1:5] == (2, "tag:employee:1", "ns:analytics", 1)
+        cache_manager.redis.eval.assert_called_once()
+        assert cache_manager.local.get("employee:1") is None
+        assert cache_manager.local.get("ns:analytics") is None
+
+    async def test_invalidate_tag_pattern(self, cache_manager):
+        """Test that tags matching a pattern are found by scanning tag sets."""
+        cache_manager.redis.scan = AsyncMock(
+            return_value=(0, [b"tag:employee:1", b"tag:employee:2"])
+        )
+        cache_manager.redis.eval = AsyncMock(return_value=[3, []])
+
+        count = await cache_manager.invalidate_tag_pattern("employee:*")
+
+        assert count == 3
+        assert cache_manager.redis.scan.call_args.kwargs["match"] == "tag:employee:*"
+        args = cache_manager.redis.eval.call_args[0]
+        assert args[1:4] == (2, "tag:employee:1", "tag:employee:2")
+
+    async def test_get_many(self, cache_manager):
+        """Test that several keys are fetched with one MGET."""
+        pipe = MagicMock()
+        pipe.execute = AsyncMock(return_value=[[b'{"emp_no": 1}', None]])
+        cache_manager.redis.pipeline = MagicMock(return_value=pipe)
+
+        result = await cache_manager.get_many(["employee:1", "employee:2"])
+
+        assert result == {"employee:1": {"emp_no": 1}}
+        pipe.mget.assert_called_once_with(["employee:1", "employee:2"])
+
+    async def test_set_many(self, cache_manager):
+        """Test that several keys are stored in one pipeline."""
+        pipe = MagicMock()
+        pipe.execute = AsyncMock(return_value=[])
+        cache_manager.redis.pipeline = MagicMock(return_value=pipe)
+
+        result = await cache_manager.set_many(
+            {"employee:1": {"emp_no": 1}, "employee:2": {"emp_no": 2}},
+            ttl=60,
+            tags={"employee:1": ["employee:1"]},
+        )
+
+        assert result is True
+        assert pipe.setex.call_count == 2
+        pipe.sadd.assert_called_once_with("tag:employee:1", "employee:1")
+        pipe.execute.assert_awaited_once()
+
+    async def test_bump_namespace(self, cache_manager):
+        """Test that bumping a namespace increments its generation."""
+        cache_manager.redis.incr = AsyncMock(return_value=4)
+        cache_manager.redis.get.return_value = b"4"
+
+        assert await cache_manager.bump_namespace("analytics") == 4
+        assert await cache_manager.namespace_generation("analytics") == 4
+        cache_manager.redis.incr.assert_called_once_with("ns:analytics")
+
     async def test_clear_all(self, cache_manager):
         """Test clearing all cache."""
         cache_manager.redis.flushdb = AsyncMock()
@@ -140,6 +249,147 @@ async def test_error_handling(self, cache_manager):
         assert result is None
 
 
+@pytest.mark.unit
+@pytest.mark.cache
+class TestTwoTierCache:
+    """Test the in-process L1 layer of CacheManager."""
+
+    @pytest.fixture
+    def cache_manager(self):
+        """Create a cache manager with an active L1 cache."""
+        manager = CacheManager()
+        manager.redis = AsyncMock()
+        manager.local = LocalCache()
+        manager._subscribed = True
+        return manager
+
+    def _mock_pipeline(self, cache_manager, results):
+        pipe = MagicMock()
+        pipe.execute = AsyncMock(return_value=results)
+        cache_manager.redis.pipeline = MagicMock(return_value=pipe)
+        return pipe
+
+    async def test_l2_hit_populates_l1(self, cache_manager):
+        """Test that a Redis hit is kept in L1 with the Redis TTL."""
+        self._mock_pipeline(cache_manager, [b'{"key": "value"}', 30000])
+
+        assert await cache_manager.get("test_key") == {"key": "value"}
+        assert await cache_manager.get("test_key") == {"key": "value"}
+
+        cache_manager.redis.pipeline.assert_called_once()
+        assert 0 < cache_manager.local.ttl("test_key") <= 30
+
+    async def test_set_populates_l1(self, cache_manager):
+        """Test that set stores the value locally as well."""
+        await cache_manager.set("test_key", {"key": "value"}, ttl=300)
+
+        assert cache_manager.local.get("test_key") == {"key": "value"}
+
+    async def test_delete_publishes_invalidation(self, cache_manager):
+        """Test that delete evicts locally and notifies other workers."""
+        cache_manager.local.set("test_key", "value", ttl=60)
+
+        await cache_manager.delete("test_key")
+
+        assert cache_manager.local.get("test_key") is None
+        cache_manager.redis.publish.assert_called_once()
+
+    async def test_remote_invalidation(self, cache_manager):
+        """Test that invalidations from other workers evict L1 entries."""
+        cache_manager.local.set("employee:1", "a", ttl=60)
+        cache_manager.local.set("employee:2", "b", ttl=60)
+
+        cache_manager._apply_invalidation({"origin": "other", "keys": ["employee:1"]})
+        assert cache_manager.local.get("employee:1") is None
+
+        cache_manager._apply_invalidation({"origin": "other", "pattern": "employee:*"})
+        assert cache_manager.local.get("employee:2") is None
+
+    async def test_l1_bypassed_when_not_subscribed(self, cache_manager):
+        """Test that L1 is not used without the invalidation channel."""
+        cache_manager._subscribed = False
+        cache_manager.local.set("test_key", "stale", ttl=60)
+        cache_manager.redis.get.return_value = b'"fresh"'
+
+        assert await cache_manager.get("test_key") == "fresh"
+
+
+def _get_db():
+    """Dummy dependency used in key builder tests."""
+
+
+@pytest.mark.unit
+@pytest.mark.cache
+class TestCacheKeyBuilder:
+    """Test signature-aware cache key generation."""
+
+    @staticmethod
+    async def endpoint(
+        emp_no: int,
+        dept_no: Optional[str] = Query(None),
+        current_only: bool = Query(True),
+        db: AsyncSession = Depends(_get_db),
+    ):
+        """Endpoint-shaped function used for key generation."""
+
+    def _key(self, *args, **kwargs):
+        signature = inspect.signature(self.endpoint)
+        return build_cache_key("test", signature, args, kwargs)
+
+    def test_injected_session_is_skipped(self):
+        """Test that dependency-injected sessions do not affect the key."""
+        session = MagicMock(spec=AsyncSession)
+
+        assert self._key(1, db=session) == self._key(1, db=MagicMock(spec=AsyncSession))
+        assert "AsyncSession" not in self._key(1, db=session)
+
+    def test_positional_keyword_and_defaults_match(self):
+        """Test that equivalent calls produce the same key."""
+        explicit = self._key(emp_no=1, dept_no=None, current_only=True)
+
+        assert self._key(1) == explicit
+        assert self._key(1, None, True) == explicit
+        assert explicit == "test:1:~:1"
+
+    def test_different_values_produce_different_keys(self):
+        """Test that keys reflect argument values."""
+        assert self._key(1, "d001") != self._key(1, "d002")
+        assert self._key(1, current_only=False) != self._key(1)
+
+    def test_long_parameters_are_hashed(self):
+        """Test that long parameter lists produce fixed-length keys."""
+        key = self._key(1, "d" * 500)
+
+        assert key.startswith("test:#")
+        assert len(key) == len("test:#") + 40
+
+    def test_normalizes_values(self):
+        """Test normalization of dates and lists."""
+        def func(day: date, ids: list):
+            pass
+
+        key = build_cache_key("test", inspect.signature(func), (date(2024, 1, 2), [1, 2]), {})
+        assert key == "test:2024-01-02:1,2"
+
+    def test_none_and_empty_string_differ(self):
+        """Test that None and "" produce different keys."""
+        assert self._key(1, None) != self._key(1, "")
+
+    def test_separators_in_values_are_escaped(self):
+        """Test that values containing separators do not collide."""
+        def func(a: str, b: str, ids: list = ()):
+            pass
+
+        def key(*args):
+            return build_cache_key("test", inspect.signature(func), args, {})
+
+        assert key("a:b", "c") != key("a", "b:c")
+        assert key("a", "b", ["x,y"]) != key("a", "b", ["x", "y"])
+        assert key("a", "b", [["x", "y"]]) != key("a", "b", ["x", "y"])
+        assert key("~", "b") != key(None, "b")
+        assert key("a:b", "c") == "test:a%3Ab:c:"
+
+
 @pytest.mark.unit
 @pytest.mark.cache
 class TestCachedDecorator:
@@ -148,7 +398,7 @@ class TestCachedDecorator:
     @pytest.fixture
     def mock_cache(self):
         """Create a mock cache manager."""
-        with patch('app.utils.cache.cache_manager') as mock:
+        with patch('app.utils.cache_decorator.cache_manager') as mock:
             mock.get = AsyncMock()
             mock.set = AsyncMock()
             yield mock
@@ -196,6 +446,20 @@ async def test_function(arg1, arg2):
         cache_key = call_args[0][0]
         assert cache_key.startswith("test:")
 
+    async def test_cached_decorator_tags_and_namespace(self, mock_cache):
+        """Test that tags are formatted from arguments and namespaces versioned."""
+        mock_cache.get.return_value = None
+        mock_cache.namespace_generation = AsyncMock(return_value=3)
+
+        @cached(key_prefix="test", ttl=300, tags=["employee:{emp_no}"], namespace="analytics")
+        async def test_function(emp_no):
+            return {"result": "data"}
+
+        await test_function(emp_no=7)
+
+        assert mock_cache.get.call_args[0][0].endswith("@analytics.3")
+        assert mock_cache.set.call_args[1]["tags"] == ["employee:7"]
+
     async def test_cached_decorator_with_ttl(self, mock_cache):
         """Test cached decorator respects TTL."""
         mock_cache.get.return_value = None
@@ -221,3 +485,1109 @@ async def test_function():
         # Should still return function result even if cache fails
         result = await test_function()
         assert result == {"result": "data"}
+
+
+@pytest.mark.unit
+@pytest.mark.cache
+class TestStampedeProtection:
+    """Test single-flight and lock-based recomputation in @cached."""
+
+    @pytest.fixture
+    def mock_cache(self):
+        """Create a mock cache manager."""
+        with patch('app.utils.cache_decorator.cache_manager') as mock:
+            mock.get = AsyncMock(return_value=None)
+            mock.set = AsyncMock()
+            mock.acquire_lock = AsyncMock(return_value="token")
+            mock.release_lock = AsyncMock()
+            yield mock
+
+    async def test_concurrent_misses_share_one_call(self, mock_cache):
+        """Test that concurrent misses for one key compute once."""
+        calls = 0
+
+        @cached(key_prefix="test", ttl=300)
+        async def test_function(arg):
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return {"result": arg}
+
+        results = await asyncio.gather(*(test_function(1) for _ in range(10)))
+
+        assert calls == 1
+        assert all(result == {"result": 1} for result in results)
+        mock_cache.set.assert_called_once()
+
+    async def test_exceptions_are_shared(self, mock_cache):
+        """Test that waiters receive the leader's exception."""
+        @cached(key_prefix="test", ttl=300)
+        async def test_function():
+            await asyncio.sleep(0.01)
+            raise ValueError("boom")
+
+        results = await asyncio.gather(
+            test_function(), test_function(), return_exceptions=True
+        )
+
+        assert all(isinstance(result, ValueError) for result in results)
+
+    async def test_lock_held_elsewhere_serves_stale(self, mock_cache):
+        """Test that stale values are served while another worker recomputes."""
+        mock_cache.get.return_value = {"value": {"result": "stale"}, "fresh_until": 0}
+        mock_cache.acquire_lock.return_value = None
+
+        @cached(key_prefix="test", ttl=300, lock=True, stale_ttl=60)
+        async def test_function():
+            return {"result": "fresh"}
+
+        assert await test_function() == {"result": "stale"}
+        mock_cache.set.assert_not_called()
+
+    async def test_lock_holder_recomputes_and_releases(self, mock_cache):
+        """Test that the lock holder stores a wrapped entry and releases the lock."""
+        @cached(key_prefix="test", ttl=300, lock=True, stale_ttl=60)
+        async def test_function():
+            return {"result": "fresh"}
+
+        assert await test_function() == {"result": "fresh"}
+
+        stored = mock_cache.set.call_args
+        assert stored[0][1]["value"] == {"result": "fresh"}
+        assert stored[1]["ttl"] == 360
+        mock_cache.release_lock.assert_called_once_with("test", "token")
+
+    async def test_lock_held_elsewhere_waits_for_value(self, mock_cache):
+        """Test that workers without the lock wait for the computed value."""
+        mock_cache.acquire_lock.return_value = None
+        mock_cache.get.side_effect = [None, None, {"result": "computed elsewhere"}]
+
+        @cached(key_prefix="test", ttl=300, lock=True)
+        async def test_function():
+            return {"result": "fresh"}
+
+        assert await test_function() == {"result": "computed elsewhere"}
+        mock_cache.set.assert_not_called()
+
+
+@pytest.mark.unit
+@pytest.mark.cache
+class TestStaleWhileRevalidate:
+    """Test stale-while-revalidate mode of @cached."""
+
+    @pytest.fixture
+    def mock_cache(self):
+        """Create a mock cache manager."""
+        with patch('app.utils.cache_decorator.cache_manager') as mock:
+            mock.get = AsyncMock(return_value={"value": {"result": "stale"}, "fresh_until": 0})
+            mock.set = AsyncMock()
+            mock.acquire_lock = AsyncMock(return_value="token")
+            mock.release_lock = AsyncMock()
+            mock.namespace_generation = AsyncMock(return_value=0)
+            yield mock
+
+    @pytest.fixture(autouse=True)
+    def mock_session(self):
+        """Avoid opening real database sessions for background refreshes."""
+        session = MagicMock()
+        session.__aenter__ = AsyncMock(return_value=session)
+        session.__aexit__ = AsyncMock(return_value=False)
+        with patch('app.utils.cache_decorator._new_session', return_value=session) as new_session:
+            session.new_session = new_session
+            yield session
+
+    async def test_requires_stale_ttl(self):
+        """Test that swr mode needs a hard TTL."""
+        with pytest.raises(ValueError):
+            cached(key_prefix="test", ttl=300, swr=True)
+
+    async def test_stale_value_returned_and_refreshed(self, mock_cache):
+        """Test that stale values are served while a refresh runs."""
+        @cached(key_prefix="test", ttl=300, stale_ttl=600, swr=True)
+        async def test_function():
+            return {"result": "fresh"}
+
+        assert await test_function() == {"result": "stale"}
+        await asyncio.sleep(0.01)
+
+        stored = mock_cache.set.call_args
+        assert stored[0][1]["value"] == {"result": "fresh"}
+        assert stored[1]["ttl"] == 900
+        mock_cache.release_lock.assert_called_once()
+
+    async def test_refresh_gets_route_budget(self, mock_cache, mock_session):
+        """Test that a refresh has the whole budget of the route that scheduled it."""
+        @cached(key_prefix="test", ttl=300, stale_ttl=600, swr=True)
+        async def test_function():
+            return {"result": "fresh"}
+
+        async def request():
+            begin_deadline(30)
+            await query_timeout(120000)()
+            return await test_function()
+
+        await asyncio.create_task(request())
+        await asyncio.sleep(0.01)
+
+        mock_session.new_session.assert_called_once_with(120)
+
+    async def test_refresh_failure_extends_stale_window(self, mock_cache):
+        """Test that failed refreshes keep the stale value instead of raising."""
+        @cached(key_prefix="test", ttl=300, stale_ttl=600, swr=True)
+        async def test_function():
+            raise RuntimeError("database unavailable")
+
+        assert await test_function() == {"result": "stale"}
+        await asyncio.sleep(0.01)
+
+        stored = mock_cache.set.call_args
+        assert stored[0][1]["value"] == {"result": "stale"}
+        assert stored[0][1]["fresh_until"] > 0
+
+    @staticmethod
+    def _stored_generations(last: int):
+        """Serve an entry for generation last, and the pointer to it."""
+        previous = {"value": {"result": "previous"}, "fresh_until": 1e12}
+
+        def get(key, **kwargs):
+            if key.endswith("@ns"):
+                return last
+            return previous if key.endswith(f"@ns.{last}") else None
+
+        return get
+
+    async def test_previous_generation_served_after_bump(self, mock_cache):
+        """Test that a namespace bump still serves the previous value."""
+        mock_cache.namespace_generation.return_value = 2
+        mock_cache.get.side_effect = self._stored_generations(1)
+
+        @cached(key_prefix="test", ttl=300, stale_ttl=600, namespace="ns", swr=True)
+        async def test_function():
+            return {"result": "fresh"}
+
+        assert await test_function() == {"result": "previous"}
+        await asyncio.sleep(0.01)
+
+        entry, pointer = mock_cache.set.call_args_list
+        assert entry[0][0].endswith("@ns.2")
+        assert pointer[0][0].endswith("@ns")
+        assert pointer[0][1] == 2
+
+    async def test_last_stored_generation_served_after_bumps(self, mock_cache):
+        """Test that the last stored value is served however many bumps ago it was."""
+        mock_cache.namespace_generation.return_value = 5
+        mock_cache.get.side_effect = self._stored_generations(2)
+        calls = []
+
+        @cached(key_prefix="test", ttl=300, stale_ttl=600, namespace="ns", swr=True)
+        async def test_function():
+            calls.append(1)
+            return {"result": "fresh"}
+
+        assert await test_function() == {"result": "previous"}
+        await asyncio.sleep(0.01)
+
+        assert len(calls) == 1
+        assert mock_cache.set.call_args_list[0][0][0].endswith("@ns.5")
+
+
+def _request(accept_encoding: str = "") -> Request:
+    """Build a bare request with the given Accept-Encoding header."""
+    headers = [(b"accept-encoding", accept_encoding.encode())] if accept_encoding else []
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": headers})
+
+
+@pytest.mark.unit
+@pytest.mark.cache
+class TestResponseCache:
+    """Test caching of encoded responses."""
+
+    @pytest.fixture
+    def mock_cache(self):
+        """Create a mock cache manager."""
+        with patch('app.utils.cache_decorator.cache_manager') as mock:
+            mock.get_raw = AsyncMock(return_value=None)
+            mock.set_raw = AsyncMock()
+            mock.namespace_generation = AsyncMock(return_value=0)
+            yield mock
+
+    def test_pack_round_trip(self):
+        """Test that entries survive packing."""
+        entry = CachedResponse.from_content({"emp_no": 1, "hire_date": date(2020, 1, 1)})
+        unpacked = CachedResponse.unpack(entry.pack())
+
+        assert unpacked == entry
+        assert unpacked.body == b'{"emp_no":1,"hire_date":"2020-01-01"}'
+        assert unpacked.etag.startswith('"')
+
+    def test_large_bodies_are_gzipped(self):
+        """Test that large bodies are stored compressed."""
+        entry = CachedResponse.from_content({"names": ["x" * 50] * 100})
+        assert entry.encoding == "gzip"
+
+        compressed = entry.to_response(_request("gzip, deflate"))
+        assert compressed.headers["content-encoding"] == "gzip"
+        assert compressed.body == entry.body
+
+        plain = entry.to_response(_request())
+        assert "content-encoding" not in plain.headers
+        assert plain.body.startswith(b'{"names"')
+        assert plain.headers["etag"] == entry.etag
+
+    async def test_miss_stores_encoded_body(self, mock_cache):
+        """Test that a miss stores the body and returns a response."""
+        @cached(key_prefix="test", ttl=60, response=True)
+        async def test_function(request: Request, item_id: int):
+            return {"item_id": item_id}
+
+        result = await test_function(_request(), 5)
+
+        assert isinstance(result, Response)
+        assert result.body == b'{"item_id":5}'
+        key, data = mock_cache.set_raw.call_args[0]
+        assert key == "test:5"
+        assert CachedResponse.unpack(data).body == result.body
+
+    async def test_hit_skips_function(self, mock_cache):
+        """Test that hits are served from the stored bytes."""
+        mock_cache.get_raw.return_value = CachedResponse.from_content({"item_id": 5}).pack()
+        calls = 0
+
+        @cached(key_prefix="test", ttl=60, response=True)
+        async def test_function(request: Request, item_id: int):
+            nonlocal calls
+            calls += 1
+            return {"item_id": item_id}
+
+        result = await test_function(_request(), 5)
+
+        assert calls == 0
+        assert result.body == b'{"item_id":5}'
+        mock_cache.set_raw.assert_not_called()
+
+    async def test_conditional_hit_returns_304(self, mock_cache):
+        """Test that a matching If-None-Match is answered from the cache entry."""
+        entry = CachedResponse.from_content({"item_id": 5}, etag='"abc-2"')
+        mock_cache.get_raw.return_value = entry.pack()
+
+        @cached(key_prefix="test", ttl=60, response=True)
+        async def test_function(request: Request, item_id: int):
+            return {"item_id": item_id}
+
+        request = Request({
+            "type": "http",
+            "method": "GET",
+            "path": "/",
+            "headers": [(b"if-none-match", b'"abc-2"')],
+        })
+        result = await test_function(request, 5)
+
+        assert result.status_code == 304
+        assert result.headers["etag"] == '"abc-2"'
+
+    async def test_etag_from_result(self, mock_cache):
+        """Test that etag/last_modified callables set the validators."""
+        @cached(
+            key_prefix="test",
+            ttl=60,
+            response=True,
+            etag=lambda result: f'"{result["uuid"]}-{result["version"]}"',
+            last_modified=lambda result: result["updated_at"],
+        )
+        async def test_function(request: Request):
+            return {"uuid": "u", "version": 4, "updated_at": "2024-01-01T12:00:00"}
+
+        result = await test_function(_request())
+
+        assert result.headers["etag"] == '"u-4"'
+        assert result.headers["last-modified"] == "Mon, 01 Jan 2024 12:00:00 GMT"
+
+
+@pytest.mark.unit
+@pytest.mark.cache
+class TestNegativeCaching:
+    """Test caching of not-found lookups."""
+
+    @pytest.fixture
+    def mock_cache(self):
+        """Create a mock cache manager."""
+        with patch('app.utils.cache_decorator.cache_manager') as mock:
+            mock.get = AsyncMock(return_value=None)
+            mock.set = AsyncMock()
+            mock.get_raw = AsyncMock(return_value=None)
+            mock.set_raw = AsyncMock()
+            yield mock
+
+    async def test_not_found_is_cached(self, mock_cache):
+        """Test that a 404 is stored with the entry's tags."""
+        @cached(key_prefix="test", ttl=300, tags=["item:{item_id}"], negative_ttl=30)
+        async def test_function(item_id: int):
+            raise HTTPException(status_code=404, detail=f"Item {item_id} not found")
+
+        with pytest.raises(HTTPException):
+            await test_function(7)
+
+        key, value = mock_cache.set.call_args[0]
+        assert key == "test:7"
+        assert mock_cache.set.call_args[1] == {"ttl": 30, "tags": ["item:7"], "version": None}
+
+        mock_cache.get.return_value = value
+        with pytest.raises(HTTPException) as exc_info:
+            await test_function(7)
+        assert exc_info.value.status_code == 404
+        assert exc_info.value.detail == "Item 7 not found"
+        assert mock_cache.set.call_count == 1
+
+    async def test_versioned_not_found_is_fenced(self, mock_cache):
+        """Test that a versioned 404 is stored below the first row version."""
+        @cached(key_prefix="test", ttl=300, negative_ttl=30, version=lambda r: r["v"])
+        async def test_function(item_id: int):
+            raise HTTPException(status_code=404, detail=f"Item {item_id} not found")
+
+        with pytest.raises(HTTPException):
+            await test_function(7)
+
+        assert mock_cache.set.call_args[1]["version"] == 0
+
+    async def test_not_found_response_entry(self, mock_cache):
+        """Test negative entries in response mode."""
+        calls = 0
+
+        @cached(key_prefix="test", ttl=300, response=True, negative_ttl=30)
+        async def test_function(item_id: int):
+            nonlocal calls
+            calls += 1
+            raise HTTPException(status_code=404, detail="missing")
+
+        with pytest.raises(HTTPException):
+            await test_function(7)
+        mock_cache.get_raw.return_value = mock_cache.set_raw.call_args[0][1]
+        with pytest.raises(HTTPException):
+            await test_function(7)
+
+        assert calls == 1
+
+    async def test_other_errors_not_cached(self, mock_cache):
+        """Test that only 404s are cached."""
+        @cached(key_prefix="test", ttl=300, negative_ttl=30)
+        async def test_function():
+            raise HTTPException(status_code=409, detail="conflict")
+
+        with pytest.raises(HTTPException):
+            await test_function()
+        mock_cache.set.assert_not_called()
+
+
+@pytest.mark.unit
+@pytest.mark.cache
+class TestMembershipFilter:
+    """Test Bloom filter integration."""
+
+    @pytest.fixture
+    def cache_manager(self):
+        """Create a subscribed cache manager with an employee filter."""
+        manager = CacheManager()
+        manager.redis = MagicMock()
+        manager.redis.publish = AsyncMock()
+        manager.enabled = True
+        manager._subscribed = True
+        manager._filter_loaders["employee"] = AsyncMock(return_value=[1, 2])
+        manager._filters["employee"] = BloomFilter.from_items([1, 2], capacity=1024)
+        return manager
+
+    async def test_might_contain(self, cache_manager):
+        """Test that only filtered-out IDs are rejected."""
+        assert cache_manager.might_contain("employee", 1)
+        assert not cache_manager.might_contain("employee", 999999)
+        # Unknown filters and unsubscribed workers never reject
+        assert cache_manager.might_contain("department", "d999")
+        cache_manager._subscribed = False
+        assert cache_manager.might_contain("employee", 999999)
+
+    async def test_add_to_filter_is_broadcast(self, cache_manager):
+        """Test that new IDs reach other workers' filters."""
+        await cache_manager.add_to_filter("employee", 3)
+        assert cache_manager.might_contain("employee", 3)
+
+        message = json.loads(cache_manager.redis.publish.call_args[0][1])
+        other = CacheManager()
+        other._subscribed = True
+        other._filters["employee"] = BloomFilter.from_items([1, 2], capacity=1024)
+        other._apply_invalidation(message)
+        assert other.might_contain("employee", 3)
+
+    async def test_reject_unknown(self, cache_manager):
+        """Test that filtered-out IDs raise 404 without calling through."""
+        inner = AsyncMock(return_value={"emp_no": 1})
+
+        @reject_unknown("employee", "emp_no", "Employee {emp_no} not found")
+        async def get_employee(emp_no: int):
+            return await inner(emp_no)
+
+        with patch('app.utils.cache_decorator.cache_manager', cache_manager):
+            assert await get_employee(1) == {"emp_no": 1}
+            with pytest.raises(HTTPException) as exc_info:
+                await get_employee(999999)
+
+        assert exc_info.value.detail == "Employee 999999 not found"
+        inner.assert_awaited_once_with(1)
+
+
+@pytest.mark.unit
+@pytest.mark.cache
+class TestWriteThrough:
+    """Test version-guarded writes and write-through."""
+
+    @pytest.fixture
+    def cache_manager(self):
+        """Create a cache manager instance."""
+        manager = CacheManager()
+        manager.redis = AsyncMock()
+        return manager
+
+    async def test_versioned_set_is_guarded(self, cache_manager):
+        """Test that versioned writes go through the guard script."""
+        cache_manager.redis.eval = AsyncMock(return_value=1)
+
+        written = await cache_manager.set(
+            "employee:1", {"v": 3}, ttl=60, tags=["employee:1"], version=3
+        )
+
+        assert written
+
+        args = cache_manager.redis.eval.call_args[0]
+        assert args[1:5] == (3, "employee:1", "ver:employee:1", "tag:employee:1")
+        assert args[6:8] == (60, 3)
+        cache_manager.redis.setex.assert_not_called()
+
+    async def test_older_version_is_skipped(self, cache_manager):
+        """Test that a write older than the cached version is dropped."""
+        cache_manager.local = LocalCache()
+        cache_manager._subscribed = True
+        cache_manager.local.set("employee:1", {"v": 2}, 60)
+        cache_manager.redis.eval = AsyncMock(return_value=0)
+
+        assert not await cache_manager.set("employee:1", {"v": 2}, ttl=60, version=2)
+        assert cache_manager.local.get("employee:1") is None
+
+    async def test_set_many_guards_versions(self, cache_manager):
+        """Test that batched writes with versions skip keys holding newer ones."""
+        cache_manager.local = LocalCache()
+        cache_manager._subscribed = True
+        cache_manager.local.set("employee:1", b"v3", 60)
+        pipe = MagicMock()
+        pipe.execute = AsyncMock(return_value=[0])
+        cache_manager.redis.pipeline = MagicMock(return_value=pipe)
+
+        written = await cache_manager.set_many_raw(
+            {"employee:1": b"v2"},
+            ttl=60,
+            tags={"employee:1": ["employee:1"]},
+            versions={"employee:1": 2},
+        )
+
+        assert not written
+        args = pipe.eval.call_args[0]
+        assert args[1:5] == (3, "employee:1", "ver:employee:1", "tag:employee:1")
+        assert args[5:8] == (b"v2", 60, 2)
+        pipe.setex.assert_not_called()
+        assert cache_manager.local.get("employee:1") is None
+
+    async def test_invalidate_with_versions(self, cache_manager):
+        """Test that committed versions are passed per cache key with their watermarks."""
+        cache_manager.redis.eval = AsyncMock(return_value=[1, [b"employee_salaries:1"]])
+
+        await cache_manager.invalidate(
+            tags=["employee:1", "salary:5"], versions={"employee:1": 4}
+        )
+
+        args = cache_manager.redis.eval.call_args[0]
+        assert args[1:5] == (3, "tag:employee:1", "tag:salary:5", "ver:employee:1")
+        assert args[5:7] == (2, 0)
+        assert args[-3:] == (settings.CACHE_VERSION_TTL, "employee:1", 4)
+
+    async def test_fill_started_before_write_is_fenced(self, cache_manager):
+        """Test that a fill reading the row before a commit cannot store it after."""
+        watermarks = {}
+
+        async def run(script, numkeys, *args):
+            # Keeps the version keys the way both scripts do
+            keys, argv = args[:numkeys], args[numkeys:]
+            if script == INVALIDATE_SCRIPT:
+                for key, version in zip(keys[argv[0] + argv[1]:], argv[6::2]):
+                    watermarks[key] = max(watermarks.get(key, 0), version)
+                return [0, []]
+            if watermarks.get(keys[1], 0) > argv[2]:
+                return 0
+            watermarks[keys[1]] = argv[2]
+            return 1
+
+        cache_manager.redis.eval = AsyncMock(side_effect=run)
+
+        # The fill reads version 1; the update commits version 2 and
+        # invalidates while nothing is cached yet; then the fill stores
+        row = {"emp_no": 1, "version": 1}
+        await cache_manager.invalidate(tags=["employee:1"], versions={"employee:1": 2})
+        written = await cache_manager.set("employee:1", row, ttl=60, tags=["employee:1"], version=1)
+
+        assert not written
+        assert watermarks == {"ver:employee:1": 2}
+
+    async def test_write_through(self):
+        """Test that a result is stored under the key and tags of the call."""
+        with patch('app.utils.cache_decorator.cache_manager') as mock_cache:
+            mock_cache.set = AsyncMock(return_value=True)
+
+            @cached(key_prefix="test", ttl=300, tags=["item:{item_id}"], version=lambda r: r["v"])
+            async def test_function(item_id: int, db: AsyncSession = Depends(lambda: None)):
+                return {"id": item_id, "v": 1}
+
+            await test_function.write_through({"id": 7, "v": 5}, item_id=7)
+
+        key, value = mock_cache.set.call_args[0]
+        assert key == "test:7"
+        assert value == {"id": 7, "v": 5}
+        assert mock_cache.set.call_args[1] == {
+            "ttl": 300,
+            "tags": ["item:7"],
+            "version": 5,
+            "admission": False,
+            "disk": False,
+        }
+
+    async def test_batch_shares_entries(self):
+        """Test that get_many/write_through_many use the keys of single calls."""
+        entry = CachedResponse.from_content({"id": 1, "v": 1})
+        missing = CachedResponse(body=b'{"detail": "gone"}', etag="", status_code=404)
+        with patch('app.utils.cache_decorator.cache_manager') as mock_cache:
+            mock_cache.get_many_raw = AsyncMock(
+                return_value={"test:1": entry.pack(), "test:2": missing.pack()}
+            )
+            mock_cache.set_many_raw = AsyncMock(return_value=True)
+
+            @cached(
+                key_prefix="test",
+                ttl=300,
+                tags=["item:{item_id}"],
+                response=True,
+                version=lambda r: r["v"],
+            )
+            async def test_function(request: Request, item_id: int):
+                return {"id": item_id, "v": 1}
+
+            found = await test_function.get_many({"item_id": n} for n in (1, 2, 3))
+            await test_function.write_through_many([({"id": 3, "v": 4}, {"item_id": 3})])
+
+        assert found == {0: {"id": 1, "v": 1}, 1: None}
+        mock_cache.get_many_raw.assert_awaited_once_with(["test:1", "test:2", "test:3"])
+        (items,) = mock_cache.set_many_raw.call_args[0]
+        assert CachedResponse.unpack(items["test:3"]).content() == {"id": 3, "v": 4}
+        assert mock_cache.set_many_raw.call_args[1] == {
+            "ttl": 300,
+            "tags": {"test:3": ["item:3"]},
+            "versions": {"test:3": 4},
+        }
+
+    async def test_misses_are_version_guarded(self):
+        """Test that results computed on a miss carry their version."""
+        with patch('app.utils.cache_decorator.cache_manager') as mock_cache:
+            mock_cache.get_raw = AsyncMock(return_value=None)
+            mock_cache.set_raw = AsyncMock(return_value=True)
+
+            @cached(key_prefix="test", ttl=300, response=True, version=lambda r: r["v"])
+            async def test_function(item_id: int):
+                return {"id": item_id, "v": 2}
+
+            await test_function(7)
+
+        assert mock_cache.set_raw.call_args[1]["version"] == 2
+
+
+@pytest.mark.unit
+@pytest.mark.cache
+class TestRedisResilience:
+    """Test timeouts and the circuit breaker around Redis."""
+
+    @pytest.fixture
+    def cache_manager(self):
+        """Create a cache manager instance."""
+        manager = CacheManager()
+        manager.redis = AsyncMock()
+        return manager
+
+    async def test_failures_open_breaker(self, cache_manager):
+        """Test that repeated timeouts make operations skip Redis."""
+        cache_manager.redis.get = AsyncMock(side_effect=RedisTimeoutError("slow"))
+        with patch.object(cache_manager, "_probe_until_healthy", AsyncMock()):
+            for _ in range(cache_manager.breaker.failure_threshold):
+                assert await cache_manager.get("employee:1") is None
+
+        assert cache_manager.breaker.is_open
+        assert not cache_manager.available
+        cache_manager.redis.get.reset_mock()
+        assert await cache_manager.get("employee:1") is None
+        assert not await cache_manager.set("employee:1", {"emp_no": 1})
+        cache_manager.redis.get.assert_not_called()
+
+    async def test_bad_data_does_not_open_breaker(self, cache_manager):
+        """Test that only connection problems count as failures."""
+        cache_manager.redis.get.return_value = b"invalid json"
+        for _ in range(cache_manager.breaker.failure_threshold):
+            await cache_manager.get("employee:1")
+        assert cache_manager.available
+
+    async def test_invalidate_reports_failures(self, cache_manager):
+        """Test that raise_errors=True surfaces invalidations that were not applied."""
+        cache_manager.redis.eval = AsyncMock(side_effect=RedisConnectionError("down"))
+        assert await cache_manager.invalidate(tags=["employee:1"]) == 0
+        with pytest.raises(RedisConnectionError):
+            await cache_manager.invalidate(tags=["employee:1"], raise_errors=True)
+
+        with patch.object(cache_manager, "_probe_until_healthy", AsyncMock()):
+            cache_manager._open_breaker()
+        with pytest.raises(CacheUnavailable):
+            await cache_manager.invalidate(namespaces=["analytics"], raise_errors=True)
+
+    async def test_probe_reenables(self, cache_manager):
+        """Test that a successful probe closes the breaker."""
+        cache_manager.redis.ping = AsyncMock(side_effect=[RedisConnectionError("down"), True])
+        with patch("app.utils.cache.settings.CACHE_BREAKER_PROBE_INTERVAL", 0):
+            cache_manager._open_breaker()
+            assert not cache_manager.available
+            await cache_manager._probe_task
+
+        assert cache_manager.available
+        assert cache_manager.redis.ping.await_count == 2
+
+    async def test_connect_failure_is_not_permanent(self):
+        """Test that a startup failure bypasses the cache until Redis is up."""
+        manager = CacheManager()
+        manager.local = None
+        client = AsyncMock()
+        client.ping = AsyncMock(side_effect=[RedisConnectionError("refused"), True])
+        with patch("app.utils.cache.aioredis.Redis.from_pool", return_value=client), patch(
+            "app.utils.cache.settings.CACHE_BREAKER_PROBE_INTERVAL", 0
+        ):
+            await manager.connect()
+            assert manager.enabled and not manager.available
+            await manager._probe_task
+
+        assert manager.available
+
+    async def test_lock_wait_skipped_while_bypassed(self):
+        """Test that lock=True does not wait for other workers without Redis."""
+        calls = 0
+
+        @cached(key_prefix="test", ttl=300, lock=True)
+        async def test_function():
+            nonlocal calls
+            calls += 1
+            return {"ok": True}
+
+        with patch('app.utils.cache_decorator.cache_manager') as mock_cache, patch(
+            'app.utils.cache.settings.CACHE_LOCK_WAIT', 5
+        ):
+            mock_cache.available = False
+            mock_cache.get = AsyncMock(return_value=None)
+            mock_cache.set = AsyncMock(return_value=False)
+            mock_cache.acquire_lock = AsyncMock(return_value=None)
+            result = await asyncio.wait_for(test_function(), timeout=1)
+
+        assert result == {"ok": True}
+        assert calls == 1
+
+
+@pytest.mark.unit
+@pytest.mark.cache
+class TestAdmissionAndBudgets:
+    """Test the admission policy and per-prefix byte budgets."""
+
+    @pytest.fixture
+    def cache_manager(self):
+        """Create a cache manager instance."""
+        manager = CacheManager()
+        manager.redis = AsyncMock()
+        manager.redis.get = AsyncMock(return_value=None)
+        manager.local = None
+        return manager
+
+    @pytest.fixture
+    def pipeline(self, cache_manager):
+        """Mock the Redis pipeline."""
+        pipe = MagicMock()
+        pipe.__len__.side_effect = lambda: len(pipe.method_calls)
+        pipe.execute = AsyncMock(return_value=[True, []])
+        cache_manager.redis.pipeline = MagicMock(return_value=pipe)
+        return pipe
+
+    async def test_one_off_key_not_admitted(self, cache_manager):
+        """Test that a key read once is not stored with admission."""
+        await cache_manager.get("test:1")
+
+        assert not await cache_manager.set("test:1", {"a": 1}, ttl=60, admission=True)
+        cache_manager.redis.setex.assert_not_called()
+
+    async def test_repeated_key_admitted(self, cache_manager):
+        """Test that a key read repeatedly is stored."""
+        await cache_manager.get("test:1")
+        await cache_manager.get("test:1")
+
+        assert await cache_manager.set("test:1", {"a": 1}, ttl=60, admission=True)
+        cache_manager.redis.setex.assert_called_once()
+
+    async def test_writes_without_admission_are_stored(self, cache_manager):
+        """Test that admission only applies when requested."""
+        assert await cache_manager.set("test:1", {"a": 1}, ttl=60)
+        cache_manager.redis.setex.assert_called_once()
+
+    async def test_first_not_found_is_stored(self, cache_manager):
+        """Test that a 404 is cached on the first lookup of a key despite admission."""
+        @cached(key_prefix="test", ttl=300, negative_ttl=30, admission=True)
+        async def test_function(item_id: int):
+            raise HTTPException(status_code=404, detail="missing")
+
+        with patch("app.utils.cache_decorator.cache_manager", cache_manager), pytest.raises(HTTPException):
+            await test_function(7)
+
+        key, ttl, _ = cache_manager.redis.setex.call_args[0]
+        assert (key, ttl) == ("test:7", 30)
+
+    async def test_budgeted_write_is_charged(self, cache_manager, pipeline):
+        """Test that writes under a budgeted prefix are accounted."""
+        with patch.dict("app.utils.cache.settings.CACHE_PREFIX_BUDGETS", {"test": 1000}):
+            assert await cache_manager.set("test:1", {"a": 1}, ttl=60)
+
+        pipeline.setex.assert_called_once()
+        args = pipeline.eval.call_args[0]
+        assert args[1:5] == (3, "budget:test", "budget:test:size", "budget:test:rank")
+        assert args[5] == "test:1"
+        assert args[7] == 1000
+
+    async def test_budget_evictions_are_broadcast(self, cache_manager, pipeline):
+        """Test that evicted keys are dropped from every worker's L1."""
+        cache_manager.local = LocalCache()
+        cache_manager._subscribed = True
+        cache_manager.local.set("test:0", {"a": 0}, 60)
+        pipeline.execute.return_value = [True, [b"test:0"]]
+
+        with patch.dict("app.utils.cache.settings.CACHE_PREFIX_BUDGETS", {"test": 1000}):
+            await cache_manager.set("test:1", {"a": 1}, ttl=60)
+
+        assert cache_manager.local.get("test:0") is None
+        assert cache_manager.local.get("test:1") == {"a": 1}
+        message = json.loads(cache_manager.redis.publish.call_args[0][1])
+        assert message["keys"] == ["test:0"]
+
+    async def test_budgeted_read_refreshes_rank(self, cache_manager, pipeline):
+        """Test that reads of budgeted keys move them up."""
+        pipeline.execute.return_value = [b'{"a": 1}', 0]
+
+        with patch.dict("app.utils.cache.settings.CACHE_PREFIX_BUDGETS", {"test": 1000}):
+            assert await cache_manager.get("test:1") == {"a": 1}
+
+        assert pipeline.eval.call_args[0][-1] == "test:1"
+
+    async def test_stored_bytes_from_budgets(self, cache_manager):
+        """Test that stored bytes are read from the budget totals of every node."""
+        other = AsyncMock()
+        other.hget = AsyncMock(return_value=b"300")
+        cache_manager.redis.hget = AsyncMock(return_value=b"700")
+        cache_manager.shards = {"a": cache_manager.redis, "b": other}
+        cache_manager.ring = HashRing(cache_manager.shards)
+
+        with patch.dict(
+            "app.utils.cache.settings.CACHE_PREFIX_BUDGETS", {"test": 1000}, clear=True
+        ):
+            assert await cache_manager.stored_bytes() == {"test": 1000}
+
+        cache_manager.redis.hget.assert_awaited_once_with("budget:test", "total")
+
+    async def test_decorator_stores_first_call_by_default(self):
+        """Test that @cached without admission stores a result on the first call."""
+        manager = CacheManager()
+        manager.redis = AsyncMock()
+        manager.redis.get = AsyncMock(return_value=None)
+        manager.local = None
+
+        @cached(key_prefix="test", ttl=300)
+        async def test_function(item_id: int):
+            return {"id": item_id}
+
+        with patch('app.utils.cache_decorator.cache_manager', manager):
+            await test_function(1)
+
+        manager.redis.setex.assert_called_once()
+
+    async def test_decorator_admits_repeated_calls(self):
+        """Test that @cached(admission=True) stores a result on the second call."""
+        manager = CacheManager()
+        manager.redis = AsyncMock()
+        manager.redis.get = AsyncMock(return_value=None)
+        manager.local = None
+
+        @cached(key_prefix="test", ttl=300, admission=True)
+        async def test_function(item_id: int):
+            return {"id": item_id}
+
+        with patch('app.utils.cache_decorator.cache_manager', manager):
+            await test_function(1)
+            manager.redis.setex.assert_not_called()
+            await test_function(1)
+
+        manager.redis.setex.assert_called_once()
+
+
+@pytest.mark.unit
+@pytest.mark.cache
+class TestSharding:
+    """Test client-side sharding across Redis nodes."""
+
+    @pytest.fixture
+    def cache_manager(self):
+        """Create a cache manager with three mocked nodes."""
+        manager = CacheManager()
+        manager.local = None
+        manager.shards = {name: AsyncMock() for name in ("a", "b", "c")}
+        manager.redis = manager.shards["a"]
+        manager.ring = HashRing(manager.shards)
+        return manager
+
+    async def test_keys_routed_to_owner(self, cache_manager):
+        """Test that single-key operations go to the owning node."""
+        owner = cache_manager.shards[cache_manager.ring.node_for("test:1")]
+        owner.get.return_value = b'{"a": 1}'
+
+        assert await cache_manager.get("test:1") == {"a": 1}
+
+        for client in cache_manager.shards.values():
+            assert client.get.await_count == (1 if client is owner else 0)
+
+    async def test_get_many_fans_out(self, cache_manager):
+        """Test that multi-key reads use one pipeline per node."""
+        keys = [f"test:{i}" for i in range(30)]
+        pipes = {}
+        for name, client in cache_manager.shards.items():
+            pipe = pipes[name] = MagicMock()
+            owned = [key for key in keys if cache_manager.ring.node_for(key) == name]
+            pipe.execute = AsyncMock(return_value=[[b"1"] * len(owned)])
+            client.pipeline = MagicMock(return_value=pipe)
+
+        result = await cache_manager.get_many(keys)
+
+        assert result == {key: 1 for key in keys}
+        for name, pipe in pipes.items():
+            (batch,) = pipe.mget.call_args[0]
+            assert batch and all(cache_manager.ring.node_for(key) == name for key in batch)
+
+    async def test_invalidate_runs_on_every_node(self, cache_manager):
+        """Test that tags are invalidated on all nodes and namespaces on their owner."""
+        for client in cache_manager.shards.values():
+            client.eval = AsyncMock(return_value=[1, [b"test:1"]])
+        owner = cache_manager.ring.node_for("ns:analytics")
+
+        deleted = await cache_manager.invalidate(tags=["employee:1"], namespaces=["analytics"])
+
+        assert deleted == 3
+        for name, client in cache_manager.shards.items():
+            args = client.eval.call_args[0]
+            expected = ["tag:employee:1"] + (["ns:analytics"] if name == owner else [])
+            assert list(args[2 : 2 + args[1]]) == expected
+
+    async def test_version_watermark_set_on_owner(self, cache_manager):
+        """Test that a version watermark is raised on the node owning its key."""
+        for client in cache_manager.shards.values():
+            client.eval = AsyncMock(return_value=[0, []])
+        owner = cache_manager.ring.node_for("employee:1")
+
+        await cache_manager.invalidate(versions={"employee:1": 2})
+
+        for name, client in cache_manager.shards.items():
+            if name == owner:
+                args = client.eval.call_args[0]
+                assert args[1:3] == (1, "ver:employee:1")
+                assert args[-2:] == ("employee:1", 2)
+            else:
+                client.eval.assert_not_called()
+
+
+@pytest.mark.unit
+@pytest.mark.cache
+class TestDiskTier:
+    """Test the on-disk cache tier behind Redis."""
+
+    @pytest.fixture
+    def cache_manager(self, tmp_path):
+        """Create a cache manager with a disk tier."""
+        manager = CacheManager()
+        manager.redis = AsyncMock()
+        manager.redis.get = AsyncMock(return_value=None)
+        manager.local = None
+        manager.sketch = None
+        manager.disk = DiskCache(str(tmp_path / "cache.sqlite3"), max_bytes=1 << 20)
+        yield manager
+        manager.disk.close()
+
+    async def test_write_reaches_disk(self, cache_manager):
+        """Test that disk=True writes go to Redis and disk."""
+        assert await cache_manager.set("test:1", {"a": 1}, ttl=60, disk=True)
+
+        cache_manager.redis.setex.assert_called_once()
+        assert cache_manager.disk.get("test:1") is not None
+
+    async def test_redis_miss_is_served_from_disk(self, cache_manager):
+        """Test that a value lost by Redis is served but not copied back untagged."""
+        await cache_manager.set("test:1", {"a": 1}, ttl=60, disk=True)
+        cache_manager.redis.reset_mock()
+
+        assert await cache_manager.get("test:1", disk=True) == {"a": 1}
+
+        cache_manager.redis.setex.assert_not_called()
+        assert await cache_manager.get("test:1") is None
+
+    async def test_invalidations_published_without_l1(self, cache_manager):
+        """Test that other hosts are told to drop their disk copies when L1 is off."""
+        cache_manager.redis.eval = AsyncMock(return_value=[1, [b"test:1"]])
+
+        await cache_manager.delete("test:1")
+        await cache_manager.invalidate(tags=["employee:1"])
+
+        message = json.loads(cache_manager.redis.publish.call_args[0][1])
+        assert message["keys"] == ["test:1"]
+        assert cache_manager.redis.eval.call_args[0][-3] == settings.CACHE_INVALIDATION_CHANNEL
+
+    async def test_subscribes_without_l1(self, cache_manager):
+        """Test that a disk tier alone subscribes to invalidations."""
+        with patch.object(cache_manager, "_start_listener") as start, patch(
+            "app.utils.cache.aioredis"
+        ) as redis, patch("app.utils.cache.settings.CACHE_DISK_ENABLED", False):
+            redis.Redis.from_pool.return_value.ping = AsyncMock()
+            cache_manager.enabled = True
+            await cache_manager.connect()
+
+        start.assert_called_once()
+
+    async def test_disk_serves_while_bypassed(self, cache_manager):
+        """Test that the disk tier is read and written without Redis."""
+        with patch.object(cache_manager, "_probe_until_healthy", AsyncMock()):
+            cache_manager._open_breaker()
+
+        assert not await cache_manager.set("test:1", {"a": 1}, ttl=60, disk=True)
+        assert await cache_manager.get("test:1", disk=True) == {"a": 1}
+        cache_manager.redis.get.assert_not_called()
+        cache_manager.redis.setex.assert_not_called()
+
+    async def test_delete_reaches_disk(self, cache_manager):
+        """Test that invalidation also removes disk entries."""
+        await cache_manager.set("test:1", {"a": 1}, ttl=60, disk=True)
+
+        await cache_manager.delete("test:1")
+
+        assert cache_manager.disk.get("test:1") is None
+
+    async def test_namespace_generation_restored_after_flush(self, cache_manager):
+        """Test that a generation lost by Redis is restored from disk."""
+        cache_manager.redis.get = AsyncMock(return_value=b"3")
+        assert await cache_manager.namespace_generation("analytics") == 3
+
+        cache_manager.redis.get = AsyncMock(side_effect=[None, b"3"])
+        assert await cache_manager.namespace_generation("analytics") == 3
+        cache_manager.redis.set.assert_called_once_with("ns:analytics", 3, nx=True)
+
+        with patch.object(cache_manager, "_probe_until_healthy", AsyncMock()):
+            cache_manager._open_breaker()
+        assert await cache_manager.namespace_generation("analytics") == 3
+
+
+@pytest.mark.unit
+@pytest.mark.cache
+class TestAdaptiveTTL:
+    """Test TTLs following the invalidation rate of a key family."""
+
+    @pytest.fixture
+    def cache_manager(self):
+        """Create a cache manager instance."""
+        manager = CacheManager()
+        manager.redis = AsyncMock()
+        manager.redis.get = AsyncMock(return_value=None)
+        manager.redis.eval = AsyncMock(return_value=[0, []])
+        # Nothing counted in Redis yet
+        manager.redis.hmget = AsyncMock(return_value=[None, None])
+        manager.local = None
+        manager.sketch = None
+        return manager
+
+    async def test_invalidations_shorten_ttl(self, cache_manager):
+        """Test that a frequently invalidated tag family gets the minimum TTL."""
+        cache_manager.register_ttl_family("employee_salaries", ["employee:{emp_no}"])
+
+        for emp_no in range(50):
+            await cache_manager.invalidate(tags=[f"employee:{emp_no}"], record=True)
+
+        assert await cache_manager.ttl_for("employee_salaries", 300) == 60
+        assert await cache_manager.ttl_for("department", 300) == 300
+
+    async def test_one_count_per_family_and_call(self, cache_manager):
+        """Test that a batch of tags counts as one invalidation of its family."""
+        with patch.object(cache_manager.ttl_policy, "record") as record:
+            await cache_manager.invalidate(
+                tags=["employee:1", "employee:2", "department:d001"],
+                namespaces=["analytics"],
+                record=True,
+            )
+            await cache_manager.bump_namespace("analytics", record=True)
+
+        sources = sorted(call.args[0] for call in record.call_args_list)
+        assert sources == ["ns:analytics", "ns:analytics", "tag:department", "tag:employee"]
+
+    async def test_counts_are_shared_in_redis(self, cache_manager):
+        """Test that counts go to Redis and TTLs follow the counts of all workers."""
+        cache_manager.register_ttl_family("employee_salaries", ["employee:{emp_no}"])
+        await cache_manager.invalidate(tags=["employee:1"], record=True)
+
+        script, _, key, _, lifetime, source = cache_manager.redis.eval.await_args_list[0].args
+        assert "HSETNX" in script
+        assert (key, source) == ("ttl_rates", "tag:employee")
+        assert lifetime == cache_manager.ttl_policy.lifetime
+
+        # Other workers invalidated every 10 s over the last two days
+        now = time.time()
+        cache_manager.redis.hmget = AsyncMock(
+            return_value=[str(now - 48 * 3600), f"{3 * 24 * 360} {now}"]
+        )
+        assert await cache_manager.ttl_for("employee_salaries", 300) == 60
+        cache_manager.redis.hmget.assert_awaited_once_with(
+            "ttl_rates", "started", "tag:employee"
+        )
+
+    async def test_change_feed_counts_row_changes(self, cache_manager):
+        """Test that API invalidations and flushes are not counted while the feed counts."""
+        cache_manager.redis.scan = AsyncMock(return_value=(0, [b"tag:employee:1"]))
+        with patch.object(cache_manager.ttl_policy, "record") as record:
+            with patch.object(settings, "CACHE_CHANGE_FEED_ENABLED", True):
+                await cache_manager.invalidate(tags=["employee:1"], namespaces=["analytics"])
+                await cache_manager.bump_namespace("analytics")
+                await cache_manager.invalidate_tag_pattern("*")
+            assert not record.called
+
+            with patch.object(settings, "CACHE_CHANGE_FEED_ENABLED", False):
+                await cache_manager.invalidate(tags=["employee:1"])
+                await cache_manager.invalidate_tag_pattern("*")
+            record.assert_called_once_with("tag:employee")
+
+    async def test_decorator_uses_adapted_ttl(self, cache_manager):
+        """Test that @cached(adaptive_ttl=True) stores entries with the chosen TTL."""
+        with patch('app.utils.cache_decorator.cache_manager', cache_manager):
+
+            @cached(
+                key_prefix="adaptive", ttl=300, stale_ttl=100, namespace="ns", adaptive_ttl=True
+            )
+            async def test_function():
+                return {"ok": True}
+
+            for _ in range(20):
+                await cache_manager.bump_namespace("ns", record=True)
+            await test_function()
+
+        key, ttl, _ = cache_manager.redis.setex.call_args[0]
+        assert key.startswith("adaptive@ns.")
+        assert ttl == 60 + 100
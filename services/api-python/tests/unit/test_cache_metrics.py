@@ -0,0 +1,65 @@
+"""
+Unit Tests for Cache Metrics
+Tests key prefix labels and per-prefix summaries
+"""
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from app.utils.cache import CacheManager
+from app.utils.cache_metrics import key_prefix, prefix_stats
+from app.utils.local_cache import LocalCache
+
+
+@pytest.mark.unit
+@pytest.mark.cache
+class TestCacheMetrics:
+    """Test cache metrics."""
+
+    @pytest.fixture
+    def cache_manager(self):
+        """Create a cache manager with a mocked Redis client."""
+        manager = CacheManager()
+        manager.redis = MagicMock()
+        manager.enabled = True
+        manager.local = None
+        return manager
+
+    def test_key_prefix(self):
+        """Test that labels stop at the first key separator."""
+        assert key_prefix("employee:10001") == "employee"
+        assert key_prefix("salary_stats@analytics.3") == "salary_stats"
+        assert key_prefix("department_stats#ab12") == "department_stats"
+        assert key_prefix(b"dashboard") == "dashboard"
+
+    async def test_hits_and_misses_counted(self, cache_manager):
+        """Test that reads are counted under their prefix."""
+        before = prefix_stats().get("metrics_test", {"hits": 0, "misses": 0})
+        cache_manager.redis.get = AsyncMock(side_effect=[b'{"a": 1}', None])
+
+        await cache_manager.get("metrics_test:1")
+        await cache_manager.get("metrics_test:2")
+
+        after = prefix_stats()["metrics_test"]
+        assert after["hits"] == before["hits"] + 1
+        assert after["misses"] == before["misses"] + 1
+
+    async def test_sets_and_bytes_counted(self, cache_manager):
+        """Test that writes record their size."""
+        cache_manager.redis.setex = AsyncMock()
+
+        await cache_manager.set("metrics_size:1", {"a": 1}, ttl=60)
+
+        stats = prefix_stats()["metrics_size"]
+        assert stats["sets"] >= 1
+        assert stats["bytes_written"] > 0
+
+    def test_local_evictions_reported(self):
+        """Test that the L1 eviction hook receives evicted keys."""
+        evicted = []
+        local = LocalCache(max_entries=1, on_evict=evicted.append)
+
+        local.set("a", 1, 60)
+        local.set("b", 2, 60)
+
+        assert evicted == ["a"]
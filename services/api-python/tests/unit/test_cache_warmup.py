@@ -0,0 +1,114 @@
+"""
+Unit tests for the startup cache warm-up
+"""
+
+import asyncio
+import pytest
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from app.services import cache_warmup
+from app.services.cache_warmup import WARMUP_LOCK, CacheWarmup
+
+
+@asynccontextmanager
+async def _session():
+    yield MagicMock()
+
+
+@pytest.fixture
+def mock_cache():
+    """Mock the cache manager with a free warm-up lock."""
+    with patch("app.services.cache_warmup.cache_manager") as cache, patch(
+        "app.services.cache_warmup.ReadSessionLocal", _session
+    ):
+        cache.available = True
+        cache.acquire_lock = AsyncMock(return_value="token")
+        cache.release_lock = AsyncMock(return_value=True)
+        yield cache
+
+
+@pytest.mark.unit
+@pytest.mark.cache
+class TestCacheWarmup:
+    """Test CacheWarmup class."""
+
+    async def test_warms_every_target_under_lock(self, mock_cache):
+        """Test that targets run while holding the lock, which is then released."""
+        warmed = []
+        targets = {
+            name: (lambda db, name=name: asyncio.sleep(0, warmed.append(name)))
+            for name in ("a", "b")
+        }
+        warmup = CacheWarmup(targets)
+
+        warmup.start()
+        await asyncio.wait_for(warmup.done.wait(), 1)
+
+        assert warmed == ["a", "b"]
+        mock_cache.acquire_lock.assert_awaited_once()
+        assert mock_cache.acquire_lock.call_args[0][0] == WARMUP_LOCK
+        mock_cache.release_lock.assert_awaited_once_with(WARMUP_LOCK, "token")
+
+    async def test_waits_for_other_worker(self, mock_cache):
+        """Test that a worker runs its targets only after the lock holder."""
+        mock_cache.acquire_lock = AsyncMock(side_effect=[None, None, "token"])
+        target = AsyncMock()
+        warmup = CacheWarmup({"a": target})
+
+        with patch("app.services.cache_warmup._LOCK_RETRY_INTERVAL", 0):
+            warmup.start()
+            await asyncio.wait_for(warmup.done.wait(), 1)
+
+        assert mock_cache.acquire_lock.await_count == 3
+        target.assert_awaited_once()
+
+    async def test_failing_target_does_not_block(self, mock_cache):
+        """Test that one failing target neither stops the others nor readiness."""
+        second = AsyncMock()
+        warmup = CacheWarmup({"a": AsyncMock(side_effect=RuntimeError("boom")), "b": second})
+
+        warmup.start()
+        await asyncio.wait_for(warmup.done.wait(), 1)
+
+        second.assert_awaited_once()
+        mock_cache.release_lock.assert_awaited_once()
+
+    async def test_skipped_without_redis(self, mock_cache):
+        """Test that workers do not all hit the database while Redis is down."""
+        mock_cache.available = False
+        target = AsyncMock()
+        warmup = CacheWarmup({"a": target})
+
+        warmup.start()
+        await asyncio.wait_for(warmup.done.wait(), 1)
+
+        target.assert_not_awaited()
+
+    async def test_timeout_reports_ready(self, mock_cache):
+        """Test that a stuck warm-up still ends in readiness."""
+        warmup = CacheWarmup({"a": lambda db: asyncio.sleep(10)})
+
+        with patch("app.services.cache_warmup.settings.CACHE_WARMUP_TIMEOUT", 0.01):
+            warmup.start()
+            await asyncio.wait_for(warmup.done.wait(), 1)
+
+        mock_cache.release_lock.assert_awaited_once()
+
+    async def test_readiness_follows_warmup(self, mock_cache):
+        """Test that warmup_complete() is false until the warm-up ends."""
+        release = asyncio.Event()
+        targets = {"a": lambda db: release.wait()}
+        with patch.dict(cache_warmup.WARMUP_TARGETS, targets, clear=True), patch(
+            "app.services.cache_warmup.settings.CACHE_WARMUP_TARGETS", ["a"]
+        ):
+            await cache_warmup.start_cache_warmup()
+            try:
+                await asyncio.sleep(0)
+                assert not cache_warmup.warmup_complete()
+
+                release.set()
+                await asyncio.wait_for(cache_warmup._warmup.done.wait(), 1)
+                assert cache_warmup.warmup_complete()
+            finally:
+                await cache_warmup.stop_cache_warmup()
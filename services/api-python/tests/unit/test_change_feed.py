@@ -0,0 +1,345 @@
+"""
+Unit tests for the Postgres change feed
+"""
+
+import asyncio
+import json
+import pytest
+from unittest.mock import AsyncMock, patch
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from app.services.change_feed import ChangeFeedListener, tags_for_change, versions_for_change
+from app.utils.cache import CacheManager, CacheUnavailable
+
+
+@pytest.mark.unit
+@pytest.mark.cache
+class TestTagsForChange:
+    """Test mapping row changes to cache tags."""
+
+    def test_employee_update(self):
+        """Test an employee update maps to its employee tag."""
+        change = {
+            "table": "employees",
+            "op": "UPDATE",
+            "old": {"emp_no": 10001, "version": 1},
+            "new": {"emp_no": 10001, "version": 2},
+        }
+        assert tags_for_change(change) == {"employee:10001"}
+
+    def test_moved_row_invalidates_old_and_new_keys(self):
+        """Test a dept_emp row moving departments invalidates both departments."""
+        change = {
+            "table": "dept_emp",
+            "op": "UPDATE",
+            "old": {"emp_no": 10001, "dept_no": "d001"},
+            "new": {"emp_no": 10001, "dept_no": "d002"},
+        }
+        assert tags_for_change(change) == {
+            "employee:10001",
+            "department:d001",
+            "department:d002",
+        }
+
+    def test_delete_uses_old_row(self):
+        """Test a delete maps from the old row."""
+        change = {"table": "salaries", "op": "DELETE", "old": {"id": 5, "emp_no": 7}, "new": None}
+        assert tags_for_change(change) == {"salary:5", "employee:7"}
+
+    def test_department_change_drops_lists(self):
+        """Test a department change also invalidates the cached department lists."""
+        change = {"table": "departments", "op": "INSERT", "old": None, "new": {"dept_no": "d010"}}
+        assert tags_for_change(change) == {"department:d010", "departments"}
+
+    def test_unknown_table(self):
+        """Test changes to untracked tables map to no tags."""
+        assert tags_for_change({"table": "audit_log", "op": "INSERT", "new": {"id": 1}}) == set()
+
+    def test_versions_for_changes(self):
+        """Test the versions committed by changes of versioned tables."""
+        insert = {"table": "salaries", "op": "INSERT", "new": {"id": 5, "emp_no": 7, "version": 1}}
+        update = {"table": "salaries", "op": "UPDATE", "new": {"id": 5, "emp_no": 7, "version": 2}}
+        delete = {"table": "salaries", "op": "DELETE", "old": {"id": 5, "version": 2}}
+        titles = {"table": "titles", "op": "UPDATE", "new": {"emp_no": 7, "version": 2}}
+        assert versions_for_change(insert) == {"salary:5": 1}
+        assert versions_for_change(update) == {"salary:5": 2}
+        assert versions_for_change(delete) == {"salary:5": 3}
+        assert versions_for_change(titles) == {}
+
+
+@pytest.mark.unit
+@pytest.mark.cache
+class TestChangeFeedListener:
+    """Test batching notifications into invalidations."""
+
+    @pytest.mark.asyncio
+    async def test_notifications_batched_into_one_invalidation(self):
+        """Test notifications within the batch window share one invalidate call."""
+        listener = ChangeFeedListener("postgresql://localhost/test", "cache_invalidation")
+        for emp_no in (1, 2, 3):
+            payload = {
+                "table": "employees",
+                "op": "UPDATE",
+                "old": {"emp_no": emp_no},
+                "new": {"emp_no": emp_no},
+            }
+            listener._on_notification(None, 0, "cache_invalidation", json.dumps(payload))
+        listener._on_notification(None, 0, "cache_invalidation", "not json")
+
+        with patch("app.services.change_feed.cache_manager") as manager, patch(
+            "app.services.change_feed.expire_cached_queries", AsyncMock()
+        ):
+            manager.invalidate = AsyncMock(return_value=3)
+            task = asyncio.create_task(listener._apply_changes())
+            await asyncio.sleep(0.2)
+            task.cancel()
+
+        manager.invalidate.assert_awaited_once()
+        kwargs = manager.invalidate.await_args.kwargs
+        assert kwargs["tags"] == {"employee:1", "employee:2", "employee:3"}
+        assert kwargs["namespaces"] == ("analytics",)
+        assert kwargs["record"] is True
+
+    @pytest.mark.asyncio
+    async def test_insert_adds_to_employee_filter(self):
+        """Test new employees are added to the membership filter."""
+        listener = ChangeFeedListener("postgresql://localhost/test", "cache_invalidation")
+        payload = {"table": "employees", "op": "INSERT", "old": None, "new": {"emp_no": 42}}
+        listener._on_notification(None, 0, "cache_invalidation", json.dumps(payload))
+
+        with patch("app.services.change_feed.cache_manager") as manager, patch(
+            "app.services.change_feed.expire_cached_queries", AsyncMock()
+        ):
+            manager.invalidate = AsyncMock(return_value=0)
+            manager.add_to_filter = AsyncMock()
+            task = asyncio.create_task(listener._apply_changes())
+            await asyncio.sleep(0.2)
+            task.cancel()
+
+        manager.add_to_filter.assert_awaited_once_with("employee", 42)
+
+    @pytest.mark.asyncio
+    async def test_updates_pass_row_versions(self):
+        """Test updates raise row versions and keep entries written through at them."""
+        listener = ChangeFeedListener("postgresql://localhost/test", "cache_invalidation")
+        changes = [
+            {"table": "employees", "op": "UPDATE", "new": {"emp_no": 1, "version": 3}},
+            {"table": "employees", "op": "UPDATE", "new": {"emp_no": 1, "version": 4}},
+            {"table": "employees", "op": "UPDATE", "new": {"emp_no": 2, "version": 7}},
+            {"table": "titles", "op": "INSERT", "new": {"emp_no": 2}},
+        ]
+        for change in changes:
+            listener._on_notification(None, 0, "cache_invalidation", json.dumps(change))
+
+        with patch("app.services.change_feed.cache_manager") as manager, patch(
+            "app.services.change_feed.expire_cached_queries", AsyncMock()
+        ):
+            manager.invalidate = AsyncMock(return_value=0)
+            task = asyncio.create_task(listener._apply_changes())
+            await asyncio.sleep(0.2)
+            task.cancel()
+
+        versioned, dropped = manager.invalidate.await_args_list
+        assert versioned.kwargs["tags"] == {"employee:1", "employee:2"}
+        assert versioned.kwargs["versions"] == {"employee:1": 4, "employee:2": 7}
+        # employee:2 also changed through titles, so its entry goes regardless
+        assert dropped.kwargs["tags"] == {"employee:2"}
+
+
+@pytest.mark.unit
+@pytest.mark.cache
+class TestChangeFeedLeadership:
+    """Test that one worker at a time applies the feed."""
+
+    @pytest.fixture
+    def lock(self):
+        """Back the cache manager's locks with a dict."""
+        holders = {}
+
+        async def acquire(name, ttl):
+            if name in holders:
+                return None
+            holders[name] = object()
+            return holders[name]
+
+        async def renew(name, token, ttl):
+            return holders.get(name) == token
+
+        async def release(name, token):
+            if holders.get(name) == token:
+                del holders[name]
+
+        with patch("app.services.change_feed.cache_manager") as manager, patch(
+            "app.services.change_feed.settings.CACHE_CHANGE_FEED_LOCK_TTL", 0.03
+        ):
+            manager.acquire_lock = AsyncMock(side_effect=acquire)
+            manager.renew_lock = AsyncMock(side_effect=renew)
+            manager.release_lock = AsyncMock(side_effect=release)
+            yield holders
+
+    @pytest.fixture
+    def listening(self):
+        """Record which listeners listen instead of connecting to Postgres."""
+        listeners = []
+
+        async def listen(listener):
+            listeners.append(listener)
+            try:
+                await asyncio.Event().wait()
+            finally:
+                listeners.remove(listener)
+
+        with patch.object(ChangeFeedListener, "_listen", listen):
+            yield listeners
+
+    @pytest.mark.asyncio
+    async def test_only_lock_holder_listens(self, lock, listening):
+        """Test that a second worker waits and takes over when the leader stops."""
+        first = ChangeFeedListener("postgresql://localhost/test", "cache_invalidation")
+        second = ChangeFeedListener("postgresql://localhost/test", "cache_invalidation")
+
+        await first.start()
+        await asyncio.sleep(0.01)
+        await second.start()
+        await asyncio.sleep(0.05)
+        assert listening == [first]
+
+        await first.stop()
+        await asyncio.sleep(0.05)
+        assert listening == [second]
+
+        await second.stop()
+        assert listening == [] and lock == {}
+
+    @pytest.mark.asyncio
+    async def test_lost_lock_stops_listening(self, lock, listening):
+        """Test that a leader whose lock expired stops applying changes."""
+        listener = ChangeFeedListener("postgresql://localhost/test", "cache_invalidation")
+        await listener.start()
+        await asyncio.sleep(0.01)
+
+        lock["change_feed"] = "taken over"
+        await asyncio.sleep(0.05)
+
+        assert listening == []
+        assert lock == {"change_feed": "taken over"}
+        await listener.stop()
+
+
+def _connection(xmin=100, rows=()):
+    """Create a mock listener connection."""
+    connection = AsyncMock()
+    connection.fetchval = AsyncMock(return_value=str(xmin))
+    connection.fetch = AsyncMock(return_value=[{"change": json.dumps(row)} for row in rows])
+    return connection
+
+
+@pytest.mark.unit
+@pytest.mark.cache
+class TestChangeFeedReplay:
+    """Test replaying logged changes instead of invalidating everything."""
+
+    @pytest.fixture
+    def listener(self):
+        return ChangeFeedListener("postgresql://localhost/test", "cache_invalidation")
+
+    @pytest.fixture
+    def manager(self):
+        with patch("app.services.change_feed.cache_manager") as manager, patch(
+            "app.services.change_feed.expire_cached_queries", AsyncMock()
+        ):
+            manager.get = AsyncMock(return_value=None)
+            manager.set = AsyncMock(return_value=True)
+            manager.invalidate = AsyncMock(return_value=0)
+            manager.invalidate_tag_pattern = AsyncMock(return_value=0)
+            yield manager
+
+    @pytest.mark.asyncio
+    async def test_replays_since_checkpoint(self, listener, manager):
+        """Test that only changes after the checkpoint are applied again."""
+        manager.get.return_value = 90
+        change = {"table": "employees", "op": "UPDATE", "new": {"emp_no": 1}}
+        connection = _connection(rows=[change])
+
+        await listener._catch_up(connection)
+
+        assert connection.fetch.await_args[0][1:] == ("90", 10001)
+        assert listener._queue.get_nowait() == change
+        manager.invalidate_tag_pattern.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_resync_without_checkpoint(self, listener, manager):
+        """Test that everything is invalidated when there is nothing to replay from."""
+        connection = _connection()
+
+        await listener._catch_up(connection)
+
+        connection.fetch.assert_not_awaited()
+        manager.invalidate_tag_pattern.assert_awaited_once_with("*", raise_errors=True)
+        assert manager.invalidate.await_args.kwargs["record"] is False
+
+    @pytest.mark.asyncio
+    async def test_resync_when_too_far_behind(self, listener, manager):
+        """Test that too many missed changes invalidate everything instead."""
+        manager.get.return_value = 90
+        rows = [{"table": "titles", "op": "INSERT", "new": {"emp_no": 1}}] * 3
+
+        with patch("app.services.change_feed.settings.CACHE_CHANGE_FEED_REPLAY_LIMIT", 2):
+            await listener._catch_up(_connection(rows=rows))
+
+        assert listener._queue.empty()
+        manager.invalidate_tag_pattern.assert_awaited_once_with("*", raise_errors=True)
+
+    @pytest.mark.asyncio
+    async def test_checkpoint_waits_for_queued_changes(self, listener, manager):
+        """Test that the checkpoint only advances once queued changes were applied."""
+        listener._on_notification(None, 0, "cache_invalidation", json.dumps({"table": "x"}))
+
+        assert await listener._checkpoint(_connection(xmin=120), 100) == 120
+        manager.set.assert_not_awaited()
+
+        listener._queue.get_nowait()
+        listener._pending = 0
+        await listener._checkpoint(_connection(xmin=130), 120)
+        manager.set.assert_awaited_once_with("change_feed:checkpoint", 120, ttl=86400)
+
+    @pytest.fixture
+    def failing_manager(self):
+        """Use a real cache manager whose Redis client fails."""
+        manager = CacheManager()
+        manager.redis = AsyncMock()
+        manager.redis.eval = AsyncMock(side_effect=RedisConnectionError("down"))
+        manager.local = None
+        with patch("app.services.change_feed.cache_manager", manager), patch(
+            "app.services.change_feed.expire_cached_queries", AsyncMock()
+        ), patch.object(manager, "_probe_until_healthy", AsyncMock()):
+            yield manager
+
+    async def _apply_one(self, listener):
+        """Apply one queued change and return once its batch was handled."""
+        listener._on_notification(None, 0, "cache_invalidation", json.dumps({"table": "x"}))
+        task = asyncio.create_task(listener._apply_changes())
+        await asyncio.sleep(0.2)
+        task.cancel()
+
+    @pytest.mark.asyncio
+    async def test_failed_batch_replayed(self, listener, failing_manager):
+        """Test that a batch Redis failed to apply keeps the checkpoint back."""
+        await self._apply_one(listener)
+
+        assert listener._pending == 0
+        failing_manager.redis.eval.assert_awaited()
+        with pytest.raises(RuntimeError):
+            await listener._checkpoint(_connection(), 100)
+
+    @pytest.mark.asyncio
+    async def test_bypassed_cache_replayed(self, listener, failing_manager):
+        """Test that changes are not checkpointed while Redis is bypassed."""
+        failing_manager._open_breaker()
+        await self._apply_one(listener)
+
+        failing_manager.redis.eval.assert_not_awaited()
+        with pytest.raises(RuntimeError):
+            await listener._checkpoint(_connection(), 100)
+        with pytest.raises(CacheUnavailable):
+            await listener._catch_up(_connection())
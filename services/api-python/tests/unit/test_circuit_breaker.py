@@ -0,0 +1,54 @@
+"""
+Unit tests for the circuit breaker
+"""
+
+import pytest
+
+from app.utils.circuit_breaker import CircuitBreaker
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.mark.unit
+@pytest.mark.cache
+class TestCircuitBreaker:
+    """Test CircuitBreaker."""
+
+    def test_opens_at_threshold(self):
+        """Test that the breaker opens on the threshold-th failure."""
+        breaker = CircuitBreaker(3, window=10, clock=_Clock())
+        assert not breaker.record_failure()
+        assert not breaker.record_failure()
+        assert breaker.record_failure()
+        assert breaker.is_open
+        # Further failures do not re-open it
+        assert not breaker.record_failure()
+
+    def test_old_failures_expire(self):
+        """Test that only failures within the window count."""
+        clock = _Clock()
+        breaker = CircuitBreaker(2, window=10, clock=clock)
+        breaker.record_failure()
+        clock.now = 11
+        assert not breaker.record_failure()
+        assert not breaker.is_open
+
+    def test_close_resets(self):
+        """Test that closing forgets earlier failures."""
+        breaker = CircuitBreaker(2, window=10, clock=_Clock())
+        breaker.record_failure()
+        breaker.record_failure()
+        breaker.close()
+        assert not breaker.is_open
+        assert not breaker.record_failure()
+
+    def test_invalid_threshold(self):
+        """Test that the threshold must be positive."""
+        with pytest.raises(ValueError):
+            CircuitBreaker(0, window=10)
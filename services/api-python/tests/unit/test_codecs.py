@@ -0,0 +1,62 @@
+"""
+Unit Tests for Cache Codecs
+Tests serialization, compression and entry headers
+"""
+
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from unittest.mock import patch
+
+import pytest
+
+from app.utils import codecs
+
+
+@pytest.mark.unit
+@pytest.mark.cache
+class TestCodecs:
+    """Test cache value encoding."""
+
+    def test_orjson_round_trip(self):
+        """Test that values round-trip through orjson."""
+        value = {"emp_no": 1, "names": ["a", "b"], "salary": Decimal("1234.50")}
+        data = codecs.encode(value, codec="orjson", compression=None)
+
+        assert data[:3] == codecs.MAGIC + b"j-"
+        assert codecs.decode(data) == {"emp_no": 1, "names": ["a", "b"], "salary": "1234.50"}
+
+    def test_large_values_are_compressed(self):
+        """Test that values over the threshold are compressed."""
+        value = [{"dept_name": "Development", "count": i} for i in range(200)]
+        data = codecs.encode(value, codec="orjson", compression="zlib", min_size=1024)
+
+        assert data[:3] == codecs.MAGIC + b"jd"
+        assert len(data) < len(json.dumps(value))
+        assert codecs.decode(data) == value
+
+    def test_small_values_are_not_compressed(self):
+        """Test that values under the threshold are stored plain."""
+        data = codecs.encode({"a": 1}, codec="orjson", compression="zlib", min_size=1024)
+        assert data[2:3] == codecs.NO_COMPRESSION
+
+    def test_legacy_json_entries(self):
+        """Test that entries written before codecs can still be read."""
+        assert codecs.decode(b'{"key": "value"}') == {"key": "value"}
+
+    def test_unavailable_compression_falls_back(self):
+        """Test that a missing compression library disables compression."""
+        with patch.dict(codecs._COMPRESSORS, {"zstd": (b"z", None, None, False)}):
+            data = codecs.encode("x" * 4096, codec="orjson", compression="zstd", min_size=0)
+        assert data[2:3] == codecs.NO_COMPRESSION
+
+    def test_unencodable_value(self):
+        """Test that unencodable values raise CodecError."""
+        with pytest.raises(codecs.CodecError):
+            codecs.encode(object(), codec="orjson")
+
+    def test_msgpack_preserves_types(self):
+        """Test that msgpack keeps Decimals and dates."""
+        pytest.importorskip("msgpack")
+        value = {"salary": Decimal("1.10"), "from": date(2020, 1, 1), "at": datetime(2020, 1, 1, 8)}
+        assert codecs.decode(codecs.encode(value, codec="msgpack", compression=None)) == value
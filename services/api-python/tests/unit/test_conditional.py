@@ -0,0 +1,73 @@
+"""
+Unit Tests for Conditional Requests
+Tests ETag and Last-Modified validation
+"""
+
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+from fastapi import Request
+
+from app.utils.conditional import (
+    entity_etag,
+    http_date,
+    is_not_modified,
+    not_modified,
+    watermark_etag,
+)
+
+
+def _request(**headers: str) -> Request:
+    """Build a bare request with the given headers."""
+    raw = [(name.replace("_", "-").encode(), value.encode()) for name, value in headers.items()]
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": raw})
+
+
+@pytest.mark.unit
+class TestConditionalRequests:
+    """Test conditional request helpers."""
+
+    def test_entity_etag(self):
+        """Test that entity ETags follow uuid and version."""
+        entity = SimpleNamespace(uuid="abc", version=3)
+
+        assert entity_etag(entity) == '"abc-3"'
+        assert entity_etag(entity, "2024-01-01") == '"abc-3-2024-01-01"'
+
+    def test_watermark_etag_is_weak_and_stable(self):
+        """Test that watermark ETags only change with their parts."""
+        assert watermark_etag(10, "2024-01-01", 1).startswith('W/"')
+        assert watermark_etag(10, "2024-01-01", 1) == watermark_etag(10, "2024-01-01", 1)
+        assert watermark_etag(10, "2024-01-01", 1) != watermark_etag(11, "2024-01-01", 1)
+
+    def test_if_none_match(self):
+        """Test weak comparison of If-None-Match."""
+        assert is_not_modified(_request(if_none_match='"a", W/"b"'), '"b"')
+        assert is_not_modified(_request(if_none_match="*"), '"a"')
+        assert not is_not_modified(_request(if_none_match='"a"'), '"b"')
+        assert not is_not_modified(_request(), '"a"')
+
+    def test_if_modified_since(self):
+        """Test If-Modified-Since against Last-Modified."""
+        last_modified = http_date(datetime(2024, 1, 1, 12, 0, 0))
+
+        assert last_modified == "Mon, 01 Jan 2024 12:00:00 GMT"
+        assert is_not_modified(_request(if_modified_since=last_modified), None, last_modified)
+        earlier = "Mon, 01 Jan 2024 11:00:00 GMT"
+        assert not is_not_modified(_request(if_modified_since=earlier), None, last_modified)
+
+    def test_if_none_match_takes_precedence(self):
+        """Test that If-Modified-Since is ignored when If-None-Match is sent."""
+        last_modified = http_date(datetime(2024, 1, 1))
+        request = _request(if_none_match='"other"', if_modified_since=last_modified)
+
+        assert not is_not_modified(request, '"a"', last_modified)
+
+    def test_not_modified_response(self):
+        """Test the 304 response carries the validators."""
+        response = not_modified('"a"', "Mon, 01 Jan 2024 12:00:00 GMT")
+
+        assert response.status_code == 304
+        assert response.headers["etag"] == '"a"'
+        assert response.headers["last-modified"] == "Mon, 01 Jan 2024 12:00:00 GMT"
@@ -0,0 +1,110 @@
+"""
+Unit Tests for Database Sessions
+Tests the read-only sessions of GET endpoints
+"""
+
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.pool import NullPool, QueuePool
+
+from app.core import database
+from app.core.database import (
+    ReadSessionLocal,
+    _create_replica,
+    _required_lsn,
+    get_read_db,
+    read_engine,
+)
+from app.utils.cache import cache_fill
+
+
+@pytest.mark.unit
+class TestReadSession:
+    """Test get_read_db() sessions."""
+
+    async def test_unused_session_never_connects(self):
+        """Test that a request answered from the cache checks out no connection."""
+        connects = []
+
+        def listener(*args):
+            connects.append(args)
+
+        event.listen(read_engine.sync_engine, "engine_connect", listener)
+        try:
+            async for session in get_read_db():
+                assert not session.in_transaction()
+        finally:
+            event.remove(read_engine.sync_engine, "engine_connect", listener)
+
+        assert connects == []
+
+    def test_transactions_are_read_only(self):
+        """Test that reads on the primary run in READ ONLY transactions."""
+        assert read_engine.get_execution_options()["postgresql_readonly"] is True
+
+    def test_binds_primary_without_replicas(self):
+        """Test that without replicas every read goes to the read-only primary pool."""
+        session = ReadSessionLocal()
+        with patch.object(database, "replica_router", None):
+            assert session.sync_session.get_bind() is read_engine.sync_engine
+
+    def test_bind_is_kept_for_the_session(self):
+        """Test that the engine is chosen once, by the first statement."""
+        router = MagicMock()
+        session = ReadSessionLocal()
+        with patch.object(database, "replica_router", router):
+            first = session.sync_session.get_bind()
+            second = session.sync_session.get_bind()
+
+        router.choose.assert_called_once()
+        assert first is second is router.choose.return_value.sync_engine
+
+    async def test_fill_sees_primary_position(self):
+        """Test that a cache fill must see every commit made before it started."""
+        router = MagicMock()
+        router.primary_lsn = AsyncMock(return_value=500)
+        with patch.object(database, "replica_router", router):
+            assert _required_lsn() == 0
+            async with cache_fill():
+                assert _required_lsn() == 500
+
+    async def test_fill_position_after_invalidation(self):
+        """Test that fills need a primary position sampled after the last invalidation."""
+        router = MagicMock()
+        router.primary_lsn = AsyncMock(return_value=500)
+        with patch.object(database, "replica_router", router), patch.object(
+            database.cache_manager, "last_invalidation", 123.0
+        ):
+            async with cache_fill():
+                pass
+
+        router.primary_lsn.assert_awaited_once_with(since=123.0)
+
+    async def test_fill_without_primary_position(self):
+        """Test that a fill whose position is unknown cannot use any replica."""
+        router = MagicMock()
+        router.primary_lsn = AsyncMock(side_effect=OSError("refused"))
+        with patch.object(database, "replica_router", router):
+            async with cache_fill():
+                assert _required_lsn() > 2**63
+
+
+@pytest.mark.unit
+class TestCreateReplica:
+    """Test _create_replica function."""
+
+    @pytest.mark.parametrize(
+        "environment, poolclass", [("development", NullPool), ("production", QueuePool)]
+    )
+    async def test_pool_per_environment(self, environment, poolclass):
+        """Test that pool sizes are only passed to pools that take them."""
+        with patch.object(database.settings, "ENVIRONMENT", environment):
+            replica = _create_replica("postgresql://reader@replica-1:5433/employees")
+
+        try:
+            assert replica.name == "replica-1:5433"
+            assert isinstance(replica.engine.sync_engine.pool, poolclass)
+        finally:
+            await replica.engine.dispose()
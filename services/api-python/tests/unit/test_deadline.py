@@ -0,0 +1,192 @@
+"""
+Unit Tests for Request Deadlines
+Tests statement timeouts and cancellation of abandoned requests
+"""
+
+import asyncio
+from unittest.mock import MagicMock, patch
+
+import pytest
+from sqlalchemy.exc import DBAPIError
+
+from app.core import database
+from app.core.database import (
+    Deadline,
+    _apply_deadline,
+    _forget_statement_timeout,
+    is_query_timeout,
+    query_timeout,
+)
+from app.middleware.deadline import DeadlineMiddleware
+
+
+def _connection():
+    conn = MagicMock()
+    conn.info = {}
+    return conn
+
+
+def _set_timeouts(cursor):
+    """Return the statement_timeout values set through cursor."""
+    return [int(call.args[1][0]) for call in cursor.execute.call_args_list]
+
+
+def _receive(*messages):
+    """Create a receive callable yielding messages, then blocking."""
+    queue = asyncio.Queue()
+    for message in messages:
+        queue.put_nowait(message)
+    return queue.get
+
+
+@pytest.fixture
+def deadline():
+    token = database._deadline.set(Deadline(10.0))
+    yield database._deadline.get()
+    database._deadline.reset(token)
+
+
+@pytest.mark.unit
+class TestStatementTimeout:
+    """Test statement_timeout from the request deadline."""
+
+    def test_no_deadline_outside_requests(self):
+        """Test that background statements keep the server's timeout."""
+        cursor = MagicMock()
+
+        _apply_deadline(_connection(), cursor, "SELECT 1", None, None, False)
+
+        cursor.execute.assert_not_called()
+
+    def test_sets_remaining_budget_once_per_transaction(self, deadline):
+        """Test that the timeout is only set again once the transaction ended."""
+        conn, cursor = _connection(), MagicMock()
+
+        _apply_deadline(conn, cursor, "SELECT 1", None, None, False)
+        _apply_deadline(conn, cursor, "SELECT 2", None, None, False)
+        _forget_statement_timeout(conn)
+        _apply_deadline(conn, cursor, "SELECT 3", None, None, False)
+
+        timeouts = _set_timeouts(cursor)
+        assert len(timeouts) == 2
+        assert 9000 < timeouts[0] <= 10000
+
+    def test_sets_shrunk_budget_again(self, deadline):
+        """Test that a budget that shrank past the slack is applied."""
+        conn, cursor = _connection(), MagicMock()
+        _apply_deadline(conn, cursor, "SELECT 1", None, None, False)
+
+        deadline.timeout -= 5
+        _apply_deadline(conn, cursor, "SELECT 2", None, None, False)
+
+        assert len(_set_timeouts(cursor)) == 2
+
+    def test_expired_deadline_still_times_out(self, deadline):
+        """Test that an expired budget is not sent as 0, which disables the timeout."""
+        deadline.timeout = -1
+        cursor = MagicMock()
+
+        _apply_deadline(_connection(), cursor, "SELECT 1", None, None, False)
+
+        assert _set_timeouts(cursor) == [1]
+
+    def test_one_statement_for_all_values(self, deadline):
+        """Test that the timeout is bound, so one prepared statement serves every value."""
+        cursor = MagicMock()
+        _apply_deadline(_connection(), cursor, "SELECT 1", None, None, False)
+        deadline.timeout = 2
+        _apply_deadline(_connection(), cursor, "SELECT 1", None, None, False)
+
+        first, second = cursor.execute.call_args_list
+        assert first.args[0] == second.args[0]
+        assert first.args[1] != second.args[1]
+
+    async def test_route_override(self, deadline):
+        """Test that query_timeout() replaces the default budget."""
+        await query_timeout(120000)()
+
+        assert deadline.timeout == 120
+
+    def test_is_query_timeout(self):
+        """Test recognizing cancelled statements."""
+        canceled = DBAPIError("SELECT 1", None, MagicMock(sqlstate="57014"))
+        failed = DBAPIError("SELECT 1", None, MagicMock(sqlstate="42P01"))
+
+        assert is_query_timeout(canceled)
+        assert not is_query_timeout(failed)
+
+
+@pytest.mark.unit
+class TestDeadlineMiddleware:
+    """Test DeadlineMiddleware class."""
+
+    async def test_starts_deadline(self):
+        """Test that the handler runs with the configured budget."""
+        seen = []
+
+        async def app(scope, receive, send):
+            seen.append(database._deadline.get())
+
+        middleware = DeadlineMiddleware(app)
+        with patch("app.middleware.deadline.settings.QUERY_TIMEOUT", 5000):
+            await middleware({"type": "http", "method": "POST", "path": "/"}, None, None)
+
+        assert seen[0].timeout == 5
+
+    async def test_disconnect_cancels_handler(self):
+        """Test that a GET whose client left stops running its query."""
+        cancelled = asyncio.Event()
+
+        async def app(scope, receive, send):
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        middleware = DeadlineMiddleware(app)
+        receive = _receive(
+            {"type": "http.request", "body": b"", "more_body": False},
+            {"type": "http.disconnect"},
+        )
+        scope = {"type": "http", "method": "GET", "path": "/analytics/summary"}
+
+        await asyncio.wait_for(middleware(scope, receive, None), 1)
+
+        assert cancelled.is_set()
+
+    async def test_disconnect_after_response_started(self):
+        """Test that handlers that already responded are left to finish."""
+        sent = []
+
+        async def app(scope, receive, send):
+            await send({"type": "http.response.start", "status": 200})
+            assert (await receive())["type"] == "http.request"
+            assert (await receive())["type"] == "http.disconnect"
+            await send({"type": "http.response.body", "body": b"done"})
+
+        async def send(message):
+            sent.append(message)
+
+        middleware = DeadlineMiddleware(app)
+        receive = _receive(
+            {"type": "http.request", "body": b"", "more_body": False},
+            {"type": "http.disconnect"},
+        )
+        scope = {"type": "http", "method": "GET", "path": "/"}
+
+        await asyncio.wait_for(middleware(scope, receive, send), 1)
+
+        assert sent[-1]["body"] == b"done"
+
+    async def test_handler_errors_propagate(self):
+        """Test that exceptions still reach the error handlers."""
+
+        async def app(scope, receive, send):
+            raise RuntimeError("boom")
+
+        middleware = DeadlineMiddleware(app)
+        scope = {"type": "http", "method": "GET", "path": "/"}
+
+        with pytest.raises(RuntimeError):
+            await middleware(scope, _receive(), None)
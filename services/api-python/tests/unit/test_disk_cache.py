@@ -0,0 +1,124 @@
+"""
+Unit Tests for Disk Cache
+Tests expiry, eviction and deletion of the SQLite cache tier
+"""
+
+import time
+from unittest.mock import patch
+
+import pytest
+
+from app.utils.disk_cache import DiskCache
+
+
+@pytest.fixture
+def disk(tmp_path):
+    cache = DiskCache(str(tmp_path / "cache.sqlite3"), max_bytes=100)
+    yield cache
+    cache.close()
+
+
+@pytest.mark.unit
+class TestDiskCache:
+    """Test DiskCache class."""
+
+    def test_set_and_get(self, disk):
+        """Test that values come back with their remaining TTL."""
+        disk.set("a", b"value", 60)
+
+        value, remaining = disk.get("a")
+
+        assert value == b"value"
+        assert 59 < remaining <= 60
+        assert disk.get("missing") is None
+
+    def test_expired_entries_are_misses(self, disk):
+        """Test that entries past their TTL are not returned."""
+        disk.set("a", b"value", 10)
+
+        with patch("app.utils.disk_cache.time.time", return_value=time.time() + 11):
+            assert disk.get("a") is None
+
+    def test_entries_survive_reopening(self, tmp_path):
+        """Test that a new process sees entries written by another."""
+        path = str(tmp_path / "cache.sqlite3")
+        first = DiskCache(path, max_bytes=100)
+        first.set("a", b"value", 60)
+        first.close()
+
+        second = DiskCache(path, max_bytes=100)
+        try:
+            assert second.get("a")[0] == b"value"
+        finally:
+            second.close()
+
+    def test_least_recently_read_entries_are_evicted(self, disk):
+        """Test that writes over max_bytes drop the coldest entries."""
+        for key in ("a", "b", "c"):
+            disk.set(key, b"x" * 30, 600)
+        with patch("app.utils.disk_cache.time.time", return_value=time.time() + 61):
+            disk.get("a")
+
+        disk.set("d", b"x" * 30, 600)
+
+        assert disk.get("a") is not None
+        assert disk.get("b") is None
+        assert disk.get("c") is not None
+        assert disk.get("d") is not None
+
+    def test_recent_reads_do_not_write(self, disk):
+        """Test that reads within access_resolution leave the read time alone."""
+        disk.set("a", b"value", 60)
+        (before,) = disk._db.execute("SELECT accessed_at FROM entries").fetchone()
+
+        disk.get("a")
+
+        (after,) = disk._db.execute("SELECT accessed_at FROM entries").fetchone()
+        assert after == before
+
+    def test_size_tracks_writes_and_deletes(self, disk):
+        """Test that the stored byte total follows inserts, overwrites and deletes."""
+        disk.set("a", b"x" * 10, 60)
+        disk.set("b", b"x" * 20, 60)
+        disk.set("a", b"x" * 5, 60)
+        assert disk.size() == 25
+
+        disk.delete_many(["b"])
+        assert disk.size() == 5
+
+        disk.delete_pattern("*")
+        assert disk.size() == 0
+
+    def test_size_counts_entries_of_older_files(self, tmp_path):
+        """Test that a file without the meta table starts from its stored entries."""
+        path = str(tmp_path / "cache.sqlite3")
+        first = DiskCache(path, max_bytes=100)
+        first.set("a", b"x" * 10, 60)
+        first._db.execute("DROP TABLE meta")
+        first._db.execute("DROP TRIGGER entries_bytes_insert")
+        first._db.execute("DROP TRIGGER entries_bytes_update")
+        first._db.execute("DROP TRIGGER entries_bytes_delete")
+        first.close()
+
+        second = DiskCache(path, max_bytes=100)
+        try:
+            assert second.size() == 10
+        finally:
+            second.close()
+
+    def test_delete_many_and_pattern(self, disk):
+        """Test deleting keys by name and by glob pattern."""
+        for key in ("employee:1", "employee:2", "department:d001"):
+            disk.set(key, b"x", 60)
+
+        disk.delete_many(["department:d001"])
+        disk.delete_pattern("employee:*")
+
+        assert disk.get("employee:1") is None
+        assert disk.get("employee:2") is None
+        assert disk.get("department:d001") is None
+
+    def test_rejects_non_positive_size(self, tmp_path):
+        """Test that max_bytes must be positive."""
+        with pytest.raises(ValueError):
+            DiskCache(str(tmp_path / "cache.sqlite3"), max_bytes=0)
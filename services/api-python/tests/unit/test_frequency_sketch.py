@@ -0,0 +1,52 @@
+"""
+Unit Tests for Frequency Sketch
+Tests access counting and aging
+"""
+
+import pytest
+
+from app.utils.frequency_sketch import MAX_COUNT, FrequencySketch
+
+
+@pytest.mark.unit
+class TestFrequencySketch:
+    """Test FrequencySketch class."""
+
+    def test_counts_accesses(self):
+        """Test that estimates never undercount."""
+        sketch = FrequencySketch(width=1024)
+        for item in range(100):
+            for _ in range(item % 5):
+                sketch.increment(item)
+
+        assert all(sketch.estimate(item) >= item % 5 for item in range(100))
+        assert sketch.estimate("never seen") <= 1
+
+    def test_counters_saturate(self):
+        """Test that counts stop at the maximum."""
+        sketch = FrequencySketch(width=64)
+        for _ in range(100):
+            sketch.increment("hot")
+
+        assert sketch.estimate("hot") == MAX_COUNT
+
+    def test_aging_halves_counts(self):
+        """Test that counts decay after sample_size increments."""
+        sketch = FrequencySketch(width=1024, sample_size=10)
+        for _ in range(8):
+            sketch.increment("a")
+        assert sketch.estimate("a") == 8
+
+        sketch.increment("b")
+        sketch.increment("b")
+
+        assert sketch.estimate("a") == 4
+        assert sketch.estimate("b") == 1
+        assert sketch.additions == 5
+
+    def test_invalid_arguments(self):
+        """Test that invalid sizes are rejected."""
+        with pytest.raises(ValueError):
+            FrequencySketch(0)
+        with pytest.raises(ValueError):
+            FrequencySketch(64, depth=0)
@@ -0,0 +1,55 @@
+"""
+Unit Tests for Consistent Hash Ring
+Tests key distribution and remapping on node changes
+"""
+
+from collections import Counter
+
+import pytest
+
+from app.utils.hash_ring import HashRing
+
+KEYS = [f"employee:{number}" for number in range(20000)]
+
+
+@pytest.mark.unit
+class TestHashRing:
+    """Test HashRing class."""
+
+    def test_keys_spread_over_nodes(self):
+        """Test that every node gets a fair share of keys."""
+        ring = HashRing(["a:6379/0", "b:6379/0", "c:6379/0"])
+
+        counts = Counter(ring.node_for(key) for key in KEYS)
+
+        assert set(counts) == {"a:6379/0", "b:6379/0", "c:6379/0"}
+        assert min(counts.values()) > len(KEYS) / 3 * 0.8
+
+    def test_removing_node_only_remaps_its_keys(self):
+        """Test that keys of the remaining nodes stay where they are."""
+        ring = HashRing(["a", "b", "c", "d"])
+        before = {key: ring.node_for(key) for key in KEYS}
+
+        ring.remove("c")
+
+        moved = [key for key in KEYS if ring.node_for(key) != before[key]]
+        assert moved
+        assert all(before[key] == "c" for key in moved)
+
+    def test_adding_node_only_takes_keys(self):
+        """Test that keys only move to the new node."""
+        ring = HashRing(["a", "b"])
+        before = {key: ring.node_for(key) for key in KEYS}
+
+        ring.add("c")
+
+        assert all(ring.node_for(key) in (before[key], "c") for key in KEYS)
+
+    def test_invalid_use(self):
+        """Test that misuse is rejected."""
+        with pytest.raises(ValueError):
+            HashRing(["a"], replicas=0)
+        with pytest.raises(ValueError):
+            HashRing(["a", "a"])
+        with pytest.raises(LookupError):
+            HashRing().node_for("employee:1")
@@ -0,0 +1,73 @@
+"""
+Unit Tests for Local Cache
+Tests in-process LRU bounds, TTL expiry and pattern deletion
+"""
+
+import pytest
+from unittest.mock import patch
+from app.utils.local_cache import LocalCache
+
+
+@pytest.mark.unit
+@pytest.mark.cache
+class TestLocalCache:
+    """Test LocalCache class."""
+
+    def test_set_and_get(self):
+        """Test storing and retrieving a value."""
+        cache = LocalCache()
+        cache.set("key", {"a": 1}, ttl=60)
+
+        assert cache.get("key") == {"a": 1}
+        assert cache.get("missing") is None
+
+    def test_ttl_expiry(self):
+        """Test that entries expire after their TTL."""
+        cache = LocalCache()
+        with patch("app.utils.local_cache.time.monotonic", return_value=100.0):
+            cache.set("key", "value", ttl=10)
+        with patch("app.utils.local_cache.time.monotonic", return_value=105.0):
+            assert cache.get("key") == "value"
+        with patch("app.utils.local_cache.time.monotonic", return_value=111.0):
+            assert cache.get("key") is None
+        assert len(cache) == 0
+
+    def test_max_entries_evicts_lru(self):
+        """Test that the least recently used entry is evicted first."""
+        cache = LocalCache(max_entries=2)
+        cache.set("a", 1, ttl=60)
+        cache.set("b", 2, ttl=60)
+        cache.get("a")
+        cache.set("c", 3, ttl=60)
+
+        assert cache.get("a") == 1
+        assert cache.get("b") is None
+        assert cache.get("c") == 3
+        assert cache.evictions == 1
+
+    def test_max_bytes(self):
+        """Test that the byte budget is enforced."""
+        cache = LocalCache(max_bytes=100)
+        cache.set("a", "x", ttl=60, size=60)
+        cache.set("b", "y", ttl=60, size=60)
+
+        assert cache.get("a") is None
+        assert cache.get("b") == "y"
+        assert cache.current_bytes == 60
+
+    def test_oversized_value_rejected(self):
+        """Test that values larger than the budget are not stored."""
+        cache = LocalCache(max_bytes=10)
+
+        assert cache.set("a", "x", ttl=60, size=11) is False
+        assert cache.get("a") is None
+
+    def test_delete_pattern(self):
+        """Test deletion by glob pattern."""
+        cache = LocalCache()
+        cache.set("employee:1", 1, ttl=60)
+        cache.set("employee:2", 2, ttl=60)
+        cache.set("department:d001", 3, ttl=60)
+
+        assert cache.delete_pattern("employee:*") == 2
+        assert cache.get("department:d001") == 3
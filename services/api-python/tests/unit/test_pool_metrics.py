@@ -0,0 +1,96 @@
+"""
+Unit Tests for Connection Pool Metrics
+Tests pool instrumentation against an in-memory SQLite pool
+"""
+
+import itertools
+
+import pytest
+from sqlalchemy import create_engine, exc, text
+from sqlalchemy.pool import QueuePool
+
+from app.core.pool_metrics import (
+    DB_POOL_CONNECTION_AGE,
+    instrument_engine,
+    instrumented_pool,
+    pool_stats,
+)
+
+_names = itertools.count()
+
+
+@pytest.fixture
+def pool():
+    """Create an instrumented pool of one connection under a fresh label."""
+    name = f"test-{next(_names)}"
+    engine = create_engine(
+        "sqlite://",
+        poolclass=instrumented_pool(QueuePool, name),
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=0.01,
+    )
+    instrument_engine(engine, name)
+    yield engine, name
+    engine.dispose()
+
+
+@pytest.mark.unit
+class TestPoolMetrics:
+    """Test pool instrumentation."""
+
+    def test_counts_checkouts_and_checkins(self, pool):
+        """Test that checkouts, waits and the connection opened are counted."""
+        engine, name = pool
+        for _ in range(3):
+            with engine.connect() as connection:
+                connection.execute(text("SELECT 1"))
+
+        stats = pool_stats(engine, name)
+
+        assert stats["checkouts"] == 3
+        assert stats["checkins"] == 3
+        assert stats["connects"] == 1
+        assert stats["avg_checkout_wait_ms"] >= 0
+        assert stats["checked_out"] == 0
+        assert stats["idle"] == 1
+
+    def test_counts_timeouts(self, pool):
+        """Test that checkouts giving up on an exhausted pool are counted."""
+        engine, name = pool
+        with engine.connect():
+            assert pool_stats(engine, name)["checked_out"] == 1
+            with pytest.raises(exc.TimeoutError):
+                engine.connect()
+
+        assert pool_stats(engine, name)["timeouts"] == 1
+
+    def test_counts_invalidations_and_ping_failures(self, pool):
+        """Test that failed pre-pings are told apart from other invalidations."""
+        engine, name = pool
+        with engine.connect() as connection:
+            connection.invalidate(RuntimeError("server closed the connection"))
+        with engine.connect() as connection:
+            connection.invalidate(exc.InvalidatePoolError())
+
+        stats = pool_stats(engine, name)
+
+        assert stats["invalidations"] == 2
+        assert stats["ping_failures"] == 1
+        assert stats["connects"] == 2
+
+    def test_observes_connection_age(self, pool):
+        """Test that closed connections report their age."""
+        engine, name = pool
+        with engine.connect():
+            pass
+
+        engine.dispose()
+
+        closed = [
+            sample.value
+            for metric in DB_POOL_CONNECTION_AGE.collect()
+            for sample in metric.samples
+            if sample.name.endswith("_count") and sample.labels["pool"] == name
+        ]
+        assert closed == [1]
@@ -0,0 +1,214 @@
+"""
+Unit tests for the query result cache
+"""
+
+import pytest
+from datetime import date
+from decimal import Decimal
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from sqlalchemy import column, func, select, table
+
+from app.core import database
+from app.core.database import cached_query, query_fingerprint
+from app.utils import codecs
+
+salaries = table("salaries", column("salary"), column("emp_no"))
+
+
+def _statement(emp_no: int = 1):
+    return select(func.avg(salaries.c.salary).label("avg_salary")).where(
+        salaries.c.emp_no == emp_no
+    )
+
+
+@pytest.fixture
+def mock_cache():
+    """Patch the Redis tier and the query_cache table."""
+    with patch("app.core.database.cache_manager") as cache, patch(
+        "app.core.database._load_cached_query", AsyncMock(return_value=None)
+    ) as load, patch("app.core.database._queue_cached_query") as save:
+        cache.namespace_generation = AsyncMock(return_value=3)
+        cache.get_raw = AsyncMock(return_value=None)
+        cache.set_raw = AsyncMock(return_value=True)
+        database._query_hits.clear()
+        yield cache, load, save
+
+
+def _session(rows, columns=("avg_salary",)):
+    result = MagicMock()
+    result.keys.return_value = list(columns)
+    result.__iter__.return_value = iter(rows)
+    session = MagicMock()
+    session.execute = AsyncMock(return_value=result)
+    return session
+
+
+@pytest.mark.unit
+@pytest.mark.cache
+class TestQueryFingerprint:
+    """Test hashing of compiled statements."""
+
+    def test_stable(self):
+        """Test that equal statements hash equally."""
+        assert query_fingerprint(_statement())[0] == query_fingerprint(_statement())[0]
+
+    def test_parameters_change_hash(self):
+        """Test that bound parameters are part of the hash."""
+        digest, sql, params = query_fingerprint(_statement(2))
+        assert digest != query_fingerprint(_statement(1))[0]
+        assert len(digest) == 64
+        assert "salaries" in sql
+        assert 2 in params.values()
+
+
+@pytest.mark.unit
+@pytest.mark.cache
+class TestCachedQuery:
+    """Test the Redis and table tiers of cached_query()."""
+
+    async def test_miss_executes_and_stores(self, mock_cache):
+        """Test that a miss runs the query and stores it in both tiers."""
+        cache, _, save = mock_cache
+        session = _session([(Decimal("5000.50"),)])
+
+        result = await cached_query(session, _statement())
+
+        assert result.scalar() == Decimal("5000.50")
+        session.execute.assert_awaited_once()
+        key, data = cache.set_raw.call_args[0]
+        assert key.startswith("query:") and key.endswith("@analytics.3")
+        assert codecs.decode(data) == {"columns": ["avg_salary"], "rows": [[Decimal("5000.50")]]}
+        assert save.call_args[0][3:] == (data, 1, save.call_args[0][5], "analytics", 3, 3600)
+
+    async def test_hit_returns_types_of_miss(self, mock_cache):
+        """Test that a cached result has the column types the query returned."""
+        cache, _, _ = mock_cache
+        rows = [(Decimal("5000.50"), date(1999, 1, 1), 3, None)]
+        columns = ("avg_salary", "since", "n", "note")
+
+        missed = (await cached_query(_session(rows, columns), _statement())).all()
+        cache.get_raw.return_value = cache.set_raw.call_args[0][1]
+        hit = (await cached_query(_session([], columns), _statement())).all()
+
+        assert hit == missed == rows
+        assert [type(value) for value in hit[0]] == [type(value) for value in rows[0]]
+
+    async def test_redis_hit(self, mock_cache):
+        """Test that Redis hits skip the database and are counted."""
+        cache, load, _ = mock_cache
+        cache.get_raw.return_value = codecs.encode(
+            {"columns": ["avg_salary"], "rows": [[42.0]]}, codec="msgpack"
+        )
+        session = _session([])
+
+        result = await cached_query(session, _statement())
+
+        assert result.one().avg_salary == 42.0
+        session.execute.assert_not_called()
+        load.assert_not_called()
+        assert sum(database._query_hits.values()) == 1
+
+    async def test_persisted_hit_refills_redis(self, mock_cache):
+        """Test that results survive Redis losing them."""
+        cache, load, save = mock_cache
+        data = codecs.encode({"columns": ["avg_salary"], "rows": [[42.0]]}, codec="msgpack")
+        load.return_value = (data, 120)
+        session = _session([])
+
+        result = await cached_query(session, _statement())
+
+        assert result.scalar() == 42.0
+        session.execute.assert_not_called()
+        save.assert_not_called()
+        assert cache.set_raw.call_args[0][1] == data
+        assert cache.set_raw.call_args[1] == {"ttl": 120}
+
+    async def test_disabled(self, mock_cache):
+        """Test that the cache can be turned off."""
+        cache, _, _ = mock_cache
+        session = _session([])
+        with patch.object(database.settings, "QUERY_CACHE_ENABLED", False):
+            await cached_query(session, _statement())
+
+        session.execute.assert_awaited_once()
+        cache.get_raw.assert_not_called()
+
+    @pytest.mark.parametrize("generation, available", [(0, True), (3, False)])
+    async def test_unknown_generation_skips_table(self, mock_cache, generation, available):
+        """Test that the table is not used while writes may not bump the generation."""
+        cache, load, save = mock_cache
+        cache.namespace_generation.return_value = generation
+        cache.available = available
+        session = _session([(Decimal("10"),)])
+
+        result = await cached_query(session, _statement())
+
+        assert result.scalar() == Decimal("10")
+        session.execute.assert_awaited_once()
+        load.assert_not_called()
+        save.assert_not_called()
+
+    async def test_table_read_without_primary(self):
+        """Test that persisted results are looked up through a read-only session."""
+        row = MagicMock(result_data=codecs.encode({"columns": ["n"], "rows": [[1]]}), ttl=60)
+        session = MagicMock()
+        session.execute = AsyncMock(return_value=MagicMock(first=MagicMock(return_value=row)))
+        read_sessions = MagicMock()
+        read_sessions.return_value.__aenter__.return_value = session
+        with patch("app.core.database.ReadSessionLocal", read_sessions), patch(
+            "app.core.database.AsyncSessionLocal"
+        ) as primary_sessions:
+            entry = await database._load_cached_query("abc", "analytics", 3)
+
+        assert entry == (row.result_data, 60)
+        primary_sessions.assert_not_called()
+
+
+@pytest.mark.unit
+@pytest.mark.cache
+class TestFlushQueryStats:
+    """Test writing queued results and hit counts to query_cache."""
+
+    @pytest.fixture
+    def primary(self):
+        """Patch the primary's sessions."""
+        session = MagicMock()
+        session.execute = AsyncMock()
+        session.commit = AsyncMock()
+        sessions = MagicMock()
+        sessions.return_value.__aenter__.return_value = session
+        database._pending_results.clear()
+        database._query_hits.clear()
+        with patch("app.core.database.AsyncSessionLocal", sessions):
+            yield session
+        database._pending_results.clear()
+        database._query_hits.clear()
+
+    def _queue(self, digest="abc", ttl=3600):
+        database._queue_cached_query(digest, "SELECT 1", {}, b"data", 1, 5, "analytics", 3, ttl)
+
+    async def test_results_written_by_flush(self, primary):
+        """Test that computed results are saved off the request path."""
+        self._queue()
+        primary.execute.assert_not_called()
+
+        await database.flush_query_stats()
+
+        statement, rows = primary.execute.await_args_list[0][0]
+        assert statement is database._SAVE_CACHED_QUERY
+        assert [row["query_hash"] for row in rows] == ["abc"]
+        assert 3590 < rows[0]["ttl"] <= 3600
+        primary.commit.assert_awaited_once()
+        assert not database._pending_results
+
+    async def test_failed_flush_requeues(self, primary):
+        """Test that results and hits are kept for the next flush."""
+        self._queue()
+        database._query_hits["abc"] += 2
+        primary.execute.side_effect = RuntimeError("primary down")
+
+        await database.flush_query_stats()
+
+        assert list(database._pending_results) == ["abc"]
+        assert database._query_hits["abc"] == 2
@@ -0,0 +1,169 @@
+"""
+Unit tests for the query cost gate
+"""
+
+from contextlib import asynccontextmanager
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from sqlalchemy import column, select, table
+from sqlalchemy.dialects import postgresql
+
+from app.core.database import (
+    QueryTooExpensive,
+    _Explain,
+    check_query_cost,
+    query_cost_key,
+)
+
+employees = table("employees", column("emp_no"), column("last_name"))
+
+
+def _page(offset: int = 0, search: str = "smith"):
+    return (
+        select(employees)
+        .where(employees.c.last_name.ilike(search))
+        .order_by(employees.c.emp_no)
+        .offset(offset)
+        .limit(20)
+    )
+
+
+def _session(plan):
+    result = MagicMock()
+    result.scalar_one.return_value = plan
+    session = MagicMock()
+    session.execute = AsyncMock(return_value=result)
+    session.begin_nested.return_value.__aenter__ = AsyncMock()
+    session.begin_nested.return_value.__aexit__ = AsyncMock(return_value=False)
+    return session
+
+
+class _AbortingSession:
+    """Session whose transaction fails like Postgres' after an error."""
+
+    def __init__(self):
+        self.aborted = False
+        self.savepoints = 0
+
+    async def execute(self, statement):
+        if self.aborted:
+            raise RuntimeError("current transaction is aborted")
+        if isinstance(statement, _Explain):
+            self.aborted = True
+            raise RuntimeError("permission denied for table employees")
+        return MagicMock()
+
+    @asynccontextmanager
+    async def begin_nested(self):
+        self.savepoints += 1
+        aborted = self.aborted
+        try:
+            yield
+        except Exception:
+            # ROLLBACK TO SAVEPOINT
+            self.aborted = aborted
+            raise
+
+
+@pytest.fixture
+def mock_cache():
+    """Enable the gate with an empty estimate cache."""
+    with patch("app.core.database.cache_manager") as cache, patch(
+        "app.core.database.settings.QUERY_COST_GATE_ENABLED", True
+    ), patch("app.core.database.settings.MAX_QUERY_COMPLEXITY", 1000):
+        cache.get_many = AsyncMock(return_value={})
+        cache.set_many = AsyncMock(return_value=True)
+        yield cache
+
+
+@pytest.mark.unit
+class TestQueryCostKey:
+    """Test query shapes."""
+
+    def test_explain_keeps_parameters(self):
+        """Test that EXPLAIN wraps the statement with its bound parameters."""
+        sql = str(_Explain(_page()).compile(dialect=postgresql.dialect()))
+
+        assert sql.startswith("EXPLAIN (FORMAT JSON) SELECT")
+        assert "%(last_name_1)s" in sql
+
+    def test_similar_offsets_share_estimate(self):
+        """Test that offsets of the same magnitude have one shape."""
+        assert query_cost_key(_page(offset=5000)) == query_cost_key(_page(offset=6000))
+        assert query_cost_key(_page(offset=40)) != query_cost_key(_page(offset=400000))
+
+    def test_leading_wildcard_changes_shape(self):
+        """Test that only a leading wildcard in a pattern changes the shape."""
+        assert query_cost_key(_page(search="smi%")) == query_cost_key(_page(search="jo%"))
+        assert query_cost_key(_page(search="smi%")) != query_cost_key(_page(search="%smi%"))
+
+
+@pytest.mark.unit
+class TestCheckQueryCost:
+    """Test check_query_cost function."""
+
+    async def test_disabled(self):
+        """Test that nothing is explained while the gate is off."""
+        session = _session([])
+
+        with patch("app.core.database.settings.QUERY_COST_GATE_ENABLED", False):
+            await check_query_cost(session, _page())
+
+        session.execute.assert_not_awaited()
+
+    async def test_estimates_and_caches(self, mock_cache):
+        """Test that a new shape is explained and its cost cached."""
+        session = _session([{"Plan": {"Total Cost": 42.5}}])
+
+        await check_query_cost(session, _page())
+
+        session.execute.assert_awaited_once()
+        estimated = mock_cache.set_many.call_args[0][0]
+        assert list(estimated.values()) == [42.5]
+
+    async def test_uses_cached_estimate(self, mock_cache):
+        """Test that a known shape needs no EXPLAIN."""
+        mock_cache.get_many = AsyncMock(return_value={query_cost_key(_page()): 10.0})
+        session = _session([])
+
+        await check_query_cost(session, _page())
+
+        session.execute.assert_not_awaited()
+
+    async def test_rejects_expensive_query(self, mock_cache):
+        """Test that the most expensive statement decides."""
+        mock_cache.get_many = AsyncMock(
+            return_value={query_cost_key(_page()): 10.0, query_cost_key(_page(10**6)): 5000.0}
+        )
+
+        with pytest.raises(QueryTooExpensive) as raised:
+            await check_query_cost(_session([]), _page(), _page(10**6))
+
+        assert raised.value.cost == 5000.0
+
+    async def test_plan_as_text(self, mock_cache):
+        """Test plans returned as undecoded JSON."""
+        session = _session('[{"Plan": {"Total Cost": 2000.0}}]')
+
+        with pytest.raises(QueryTooExpensive):
+            await check_query_cost(session, _page())
+
+    async def test_failed_estimate_admits(self, mock_cache):
+        """Test that queries are admitted when EXPLAIN fails."""
+        session = _session([])
+        session.execute = AsyncMock(side_effect=RuntimeError("connection lost"))
+
+        await check_query_cost(session, _page())
+
+        mock_cache.set_many.assert_not_awaited()
+
+    async def test_failed_estimate_keeps_transaction(self, mock_cache):
+        """Test that the real query still runs on the session after EXPLAIN failed."""
+        session = _AbortingSession()
+
+        await check_query_cost(session, _page())
+        await session.execute(_page())
+
+        assert session.savepoints == 1
@@ -0,0 +1,153 @@
+"""
+Unit Tests for Read Replica Routing
+Tests LSN handling, lag sampling and replica selection
+"""
+
+import math
+import time
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import pytest
+
+from app.core.replicas import Replica, ReplicaRouter, format_lsn, parse_lsn
+
+
+def _engine(row=None, error=None):
+    """Create a mock engine whose queries return row or raise error."""
+    engine = MagicMock()
+    engine.connects = 0
+
+    @asynccontextmanager
+    async def connect():
+        engine.connects += 1
+        if error is not None:
+            raise error
+        connection = MagicMock()
+
+        async def execute(statement):
+            result = MagicMock()
+            result.one.return_value = row
+            result.scalar_one.return_value = row
+            return result
+
+        connection.execute = execute
+        yield connection
+
+    engine.connect = connect
+    return engine
+
+
+@pytest.fixture
+def router():
+    replicas = [
+        Replica("fresh", MagicMock(), replay_lsn=200, lag=0.0),
+        Replica("behind", MagicMock(), replay_lsn=100, lag=2.0),
+        Replica("stale", MagicMock(), replay_lsn=300, lag=30.0),
+    ]
+    return ReplicaRouter(MagicMock(), replicas, max_lag=5.0, interval=1.0)
+
+
+@pytest.mark.unit
+class TestLSN:
+    """Test LSN parsing and formatting."""
+
+    def test_round_trip(self):
+        """Test that formatting reverses parsing."""
+        assert parse_lsn("16/B374D848") == (0x16 << 32) | 0xB374D848
+        assert format_lsn(parse_lsn("16/B374D848")) == "16/B374D848"
+
+    def test_invalid(self):
+        """Test that malformed tokens raise ValueError."""
+        for value in ("", "16", "xx/yy"):
+            with pytest.raises(ValueError):
+                parse_lsn(value)
+
+
+@pytest.mark.unit
+class TestReplicaRouter:
+    """Test ReplicaRouter class."""
+
+    def test_choose_skips_lagging_replicas(self, router):
+        """Test that replicas over max_lag get no reads."""
+        engines = {router.choose() for _ in range(50)}
+
+        assert engines == {router.replicas[0].engine, router.replicas[1].engine}
+
+    def test_choose_honours_min_lsn(self, router):
+        """Test that reads needing a commit go to replicas that replayed it."""
+        assert router.choose(min_lsn=150) is router.replicas[0].engine
+        assert router.choose(min_lsn=250) is router.primary
+
+    async def test_refresh_measures_lag(self):
+        """Test lag sampling against the primary's WAL position."""
+        caught_up = Replica(
+            "a", _engine(SimpleNamespace(replay_lsn="0/200", lag=120.0))
+        )
+        behind = Replica("b", _engine(SimpleNamespace(replay_lsn="0/100", lag=3.5)))
+        down = Replica("c", _engine(error=OSError("refused")), lag=0.0)
+        router = ReplicaRouter(_engine("0/200"), [caught_up, behind, down], 5.0, 1.0)
+
+        await router.refresh()
+
+        # An idle primary makes the replay timestamp age; it is not lag
+        assert caught_up.lag == 0.0
+        assert behind.lag == 3.5
+        assert behind.replay_lsn == 0x100
+        assert math.isinf(down.lag)
+
+    async def test_refresh_without_primary(self):
+        """Test that replicas get no reads while lag cannot be measured."""
+        replica = Replica("a", _engine(SimpleNamespace(replay_lsn="0/200", lag=0.0)))
+        router = ReplicaRouter(_engine(error=OSError("refused")), [replica], 5.0, 1.0)
+
+        await router.refresh()
+
+        assert math.isinf(replica.lag)
+        assert router.choose() is router.primary
+
+    async def test_refresh_rejects_non_replicas(self):
+        """Test that a server that is not in recovery gets no reads."""
+        replica = Replica("a", _engine(SimpleNamespace(replay_lsn=None, lag=None)), lag=0.0)
+        router = ReplicaRouter(_engine("0/200"), [replica], 5.0, 1.0)
+
+        await router.refresh()
+
+        assert math.isinf(replica.lag)
+
+    async def test_primary_lsn_reuses_sample(self):
+        """Test that a fresh sample is served without querying the primary."""
+        primary = _engine("0/200")
+        router = ReplicaRouter(primary, [], 5.0, 1.0)
+        await router.refresh()
+
+        assert await router.primary_lsn() == 0x200
+        assert primary.connects == 1
+
+    async def test_primary_lsn_resamples(self):
+        """Test that a sample older than since or the interval is not reused."""
+        primary = _engine("0/300")
+        router = ReplicaRouter(primary, [], 5.0, 1.0)
+        await router.refresh()
+
+        assert await router.primary_lsn(since=time.monotonic()) == 0x300
+        assert primary.connects == 2
+        router._sampled_at -= 10.0
+        assert await router.primary_lsn() == 0x300
+        assert primary.connects == 3
+        assert await router.primary_lsn() == 0x300
+        assert primary.connects == 3
+
+    async def test_primary_lsn_falls_back_to_sample(self):
+        """Test that an aged sample is used while the primary cannot be queried."""
+        primary = _engine("0/300")
+        router = ReplicaRouter(primary, [], 5.0, 1.0)
+        await router.refresh()
+        since = router._sampled_at
+        router._sampled_at -= 10.0
+        primary.connect = _engine(error=OSError("refused")).connect
+
+        assert await router.primary_lsn() == 0x300
+        with pytest.raises(OSError):
+            await router.primary_lsn(since=since)